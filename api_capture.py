@@ -0,0 +1,216 @@
+# api_capture.py
+
+import json
+import logging
+import random
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from assets import API_CAPTURE_SETTINGS, USER_AGENTS, TIMEOUT_SETTINGS
+from fetch_strategy import LISTING_KEYWORDS, get_http_session
+from page_cache import normalize_url
+from site_store import SiteStore
+
+logger = logging.getLogger(__name__)
+
+# Request headers worth replaying when calling a captured endpoint directly
+REPLAY_HEADERS = {'accept', 'content-type', 'x-requested-with', 'accept-language'}
+
+DATE_PATTERN = re.compile(
+    r'\b(\d{4}-\d{2}-\d{2}|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}|'
+    r'\d{1,2}\s+(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?,?\s+\d{4})',
+    re.IGNORECASE,
+)
+
+_endpoints = SiteStore(API_CAPTURE_SETTINGS["cache_file"])
+
+
+def enable_performance_logging(options):
+    """Ask Chrome to record DevTools network events in the performance log."""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+
+def discard_performance_log(driver):
+    """Drop events left over from the driver's previous page."""
+    try:
+        driver.get_log('performance')
+    except Exception as e:
+        logger.debug(f"Performance log not available: {e}")
+
+
+def find_listing_array(data: Any, path: Tuple = ()) -> Tuple[Optional[Tuple], List]:
+    """
+    Find the largest array of similar objects in a JSON document. Returns the
+    key path to it and the array, or (None, []) if nothing looks like a listing.
+    """
+    best_path, best_items = None, []
+    if isinstance(data, list):
+        objects = [item for item in data if isinstance(item, dict)]
+        if len(objects) >= API_CAPTURE_SETTINGS["min_items"] and len(objects) == len(data):
+            shared_keys = set.intersection(*(set(item) for item in objects))
+            if len(shared_keys) >= API_CAPTURE_SETTINGS["min_shared_keys"]:
+                best_path, best_items = path, data
+        # Listings nested inside array items are not searched
+        return best_path, best_items
+    if isinstance(data, dict):
+        for key, value in data.items():
+            child_path, child_items = find_listing_array(value, path + (key,))
+            if len(child_items) > len(best_items):
+                best_path, best_items = child_path, child_items
+    return best_path, best_items
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(str(text).split()).casefold()
+
+
+def matches_page_listing(items: List, page_text: str) -> bool:
+    """
+    Whether a JSON array is the page's listing rather than a menu, a cookie
+    vendor list or an analytics payload: most items either have a value that
+    also appears in the rendered page, or mention a tender keyword and a date.
+    """
+    sample = [item for item in items[:API_CAPTURE_SETTINGS["check_items"]] if isinstance(item, dict)]
+    if not sample:
+        return False
+    page_text = _normalize(page_text or '')
+    min_chars = API_CAPTURE_SETTINGS["min_value_chars"]
+    on_page = listing_like = 0
+    for item in sample:
+        values = [_normalize(value) for value in item.values() if isinstance(value, str)]
+        if page_text and any(len(value) >= min_chars and value in page_text for value in values):
+            on_page += 1
+        text = ' '.join([str(key).replace('_', ' ') for key in item] + values)
+        if LISTING_KEYWORDS.search(text) and DATE_PATTERN.search(text):
+            listing_like += 1
+    return max(on_page, listing_like) >= len(sample) * API_CAPTURE_SETTINGS["min_matching_share"]
+
+
+def _collect_requests(log_entries: List[Dict]) -> Dict[str, Dict]:
+    requests_by_id = {}
+    for entry in log_entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        params = message.get('params', {})
+        request_id = params.get('requestId')
+        if message.get('method') == 'Network.requestWillBeSent':
+            request = params.get('request', {})
+            requests_by_id[request_id] = {
+                'url': request.get('url'),
+                'method': request.get('method', 'GET'),
+                'post_data': request.get('postData'),
+                'headers': {k: v for k, v in request.get('headers', {}).items() if k.lower() in REPLAY_HEADERS},
+            }
+        elif message.get('method') == 'Network.responseReceived' and request_id in requests_by_id:
+            response = params.get('response', {})
+            requests_by_id[request_id].update({
+                'type': params.get('type'),
+                'status': response.get('status'),
+                'mime_type': response.get('mimeType', ''),
+            })
+    return requests_by_id
+
+
+def capture_listing_endpoint(driver) -> Optional[Dict]:
+    """
+    Inspect the XHR/fetch responses recorded while the page loaded and return
+    the JSON endpoint that carries the largest listing array, if any. Arrays
+    that do not match the rendered listing (see matches_page_listing) are skipped.
+    """
+    try:
+        log_entries = driver.get_log('performance')
+        page_text = driver.execute_script("return document.body ? document.body.innerText : '';")
+    except Exception as e:
+        logger.debug(f"Performance log not available: {e}")
+        return None
+
+    best = None
+    for request_id, request in _collect_requests(log_entries).items():
+        if (request.get('type') not in ('XHR', 'Fetch') or request.get('status') != 200
+                or 'json' not in request.get('mime_type', '')):
+            continue
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            data = json.loads(body.get('body', ''))
+        except Exception:
+            continue
+        path, items = find_listing_array(data)
+        if path is None or not matches_page_listing(items, page_text):
+            continue
+        if best is None or len(items) > best['item_count']:
+            best = dict(request, list_path=list(path), item_count=len(items))
+
+    if best:
+        for key in ('type', 'status', 'mime_type'):
+            best.pop(key, None)
+    return best
+
+
+def get_endpoint(page_url: str) -> Optional[Dict]:
+    entry = _endpoints.get(page_url, max_age=API_CAPTURE_SETTINGS["remember_days"] * 86400)
+    return (entry or {}).get('pages', {}).get(normalize_url(page_url))
+
+
+def _update_endpoints(page_url: str, endpoint: Optional[Dict]):
+    def change(entry):
+        pages = entry.get('pages', {})
+        if endpoint is None:
+            pages.pop(normalize_url(page_url), None)
+        else:
+            pages[normalize_url(page_url)] = endpoint
+        return {'pages': pages}
+
+    _endpoints.update(page_url, change)
+
+
+def remember_endpoint(page_url: str, endpoint: Dict):
+    """Store the listing endpoint discovered for a page."""
+    logger.info(f"Captured listing API for {page_url}: {endpoint['method']} {endpoint['url']} ({endpoint['item_count']} items)")
+    _update_endpoints(page_url, endpoint)
+
+
+def forget_endpoint(page_url: str):
+    _update_endpoints(page_url, None)
+
+
+def compact_listings(items: List) -> str:
+    """Serialize listing objects as compact JSON, dropping empty values."""
+    cleaned = [{k: v for k, v in item.items() if v not in (None, '', [], {})} if isinstance(item, dict) else item
+               for item in items]
+    return json.dumps(cleaned, ensure_ascii=False, separators=(',', ':'))
+
+
+def fetch_api_listings(page_url: str) -> Optional[str]:
+    """
+    Call the endpoint remembered for `page_url` directly with the HTTP client
+    and return its listings as compact JSON, or None if there is no endpoint
+    or it no longer returns a listing (the endpoint is then forgotten).
+    """
+    endpoint = get_endpoint(page_url)
+    if not endpoint:
+        return None
+
+    headers = {'User-Agent': random.choice(USER_AGENTS), 'Referer': page_url}
+    headers.update(endpoint.get('headers', {}))
+    try:
+        response = get_http_session().request(
+            endpoint['method'], endpoint['url'], data=endpoint.get('post_data'),
+            headers=headers, timeout=TIMEOUT_SETTINGS["page_load"],
+        )
+        response.raise_for_status()
+        data = response.json()
+        for key in endpoint['list_path']:
+            data = data[key]
+    except (requests.RequestException, ValueError, KeyError, IndexError, TypeError) as e:
+        logger.info(f"Captured API for {page_url} failed ({e}), falling back to the page")
+        forget_endpoint(page_url)
+        return None
+
+    if not isinstance(data, list):
+        forget_endpoint(page_url)
+        return None
+    return compact_listings(data)
@@ -62,24 +62,36 @@ USER_AGENTS  = [
 ]
 
 
-# Define the pricing for models without Batch API
+# Define the pricing for models; cached_input applies to prompt tokens served from the provider's cache,
+# batch_* prices apply to OpenAI Batch API runs (see batch_extraction.py)
 PRICING = {
     "gpt-4o-mini": {
         "input": 0.150 / 1_000_000,  # $0.150 per 1M input tokens
         "output": 0.600 / 1_000_000, # $0.600 per 1M output tokens
+        "cached_input": 0.075 / 1_000_000,  # $0.075 per 1M prompt tokens served from the prompt cache
+        "batch_input": 0.075 / 1_000_000,  # $0.075 per 1M input tokens
+        "batch_output": 0.300 / 1_000_000, # $0.300 per 1M output tokens
     },
     "gpt-4o-2024-08-06": {
         "input": 2.5 / 1_000_000,  # $2.5 per 1M input tokens
         "output": 10 / 1_000_000, # $10 per 1M output tokens
+        "cached_input": 1.25 / 1_000_000,  # $1.25 per 1M prompt tokens served from the prompt cache
+        "batch_input": 1.25 / 1_000_000,  # $1.25 per 1M input tokens
+        "batch_output": 5 / 1_000_000, # $5 per 1M output tokens
     },
     "gemini-1.5-flash": {
         "input": 0.075 / 1_000_000,  # $0.075 per 1M input tokens
         "output": 0.30 / 1_000_000, # $0.30 per 1M output tokens
+        "cached_input": 0.01875 / 1_000_000,  # $0.01875 per 1M cached content tokens
     },
     "Groq Llama3.1 70b": {
         "input": 0 ,  # Free
         "output": 0 , # Free
     },
+    "Llama3.1 8B (local)": {
+        "input": 0,  # Runs on our own OpenAI-compatible server (see local_llm.py)
+        "output": 0,
+    },
     # Add other models and their prices here if needed
 }
 
@@ -89,6 +101,43 @@ TIMEOUT_SETTINGS = {
     "script": 10
 }
             
+# Page readiness detection used instead of fixed sleeps (see page_readiness.py)
+READINESS_SETTINGS = {
+    "quiet_period_ms": 500,  # DOM and network must be idle this long before capture
+    "poll_interval_ms": 50,
+}
+
+# CSS selectors whose presence marks a fully rendered listing, keyed by host
+LISTING_SELECTORS = {
+    "pcms2.gld.gov.hk": "table tbody tr",
+}
+
+# Request blocking for Selenium fetches through Chrome DevTools (see resource_blocking.py)
+RESOURCE_BLOCKING_SETTINGS = {
+    "enabled": True,
+    "resource_types": ["image", "font", "media"],  # Keys of BLOCKED_RESOURCE_TYPES to block
+}
+
+# URL patterns (Chrome wildcard syntax) for each blockable resource type
+BLOCKED_RESOURCE_TYPES = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.bmp*", "*.avif*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.googleapis.com*", "*fonts.gstatic.com*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*", "*.wav*", "*.m3u8*", "*youtube.com/embed*", "*player.vimeo.com*"],
+    "stylesheet": ["*.css*"],
+}
+
+# Analytics, advertising and chat widgets that never carry listing content
+BLOCKED_URL_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*connect.facebook.net*", "*hotjar.com*", "*clarity.ms*", "*segment.io*", "*newrelic.com*",
+    "*nr-data.net*", "*addthis.com*", "*sharethis.com*", "*tawk.to*", "*intercom.io*", "*zopim.com*",
+]
+
+# Per-site exceptions: resource type names or exact patterns from the lists above to let through
+RESOURCE_BLOCKING_ALLOWLIST = {
+    # "example.gov": ["*googletagmanager.com*"],
+}
+
 # Other reusable constants or configuration settings
 HEADLESS_OPTIONS = ["--disable-gpu", "--disable-dev-shm-usage","--window-size=1920,1080","--disable-search-engine-choice-screen"]
 
@@ -98,6 +147,219 @@ HEADLESS_OPTIONS = ["--disable-gpu", "--disable-dev-shm-usage","--window-size=19
 #number of scrolls
 NUMBER_SCROLL=2
 
+# Infinite-scroll / "load more" harvesting in Selenium fetches (see scroll_harvester.py)
+HARVEST_SETTINGS = {
+    "max_rounds": NUMBER_SCROLL,  # Scroll or "load more" rounds per page
+    "min_fragment_chars": 40,     # Ignore added elements with less text than this
+    "load_more_texts": [
+        "load more", "show more", "more results", "view more", "see more", "next results",
+        "voir plus", "afficher plus", "ver más", "cargar más", "mehr laden", "mehr anzeigen",
+    ],
+}
+
+# Settings for the pool of reusable Selenium drivers (see driver_pool.py)
+DRIVER_POOL_SETTINGS = {
+    "size": 3,                    # Maximum number of Chrome sessions kept alive
+    "max_pages_per_driver": 25,   # Recycle a driver after serving this many pages
+    "acquire_timeout": 120,       # Seconds to wait for a free driver
+    "reset_between_sites": True,  # Clear cookies and storage when a driver changes site
+}
+
+# Concurrency limits for multi-URL scraping (see fetch_engine.py)
+CONCURRENCY_SETTINGS = {
+    "fetch_workers": 3,    # Pages fetched in parallel; keep in line with the driver pool size
+    "process_workers": 4,  # Pages converted and sent to the LLM in parallel
+    "per_domain": 1,       # Concurrent fetches allowed against one domain (or domain group)
+}
+
+# Process pool for CPU-bound HTML conversion and token counting (see cpu_stage.py)
+CPU_STAGE_SETTINGS = {
+    "workers": None,  # Worker processes; None sizes the pool from CONCURRENCY_SETTINGS and the cores, 0 disables it
+    "inline_below_chars": 50000,  # Smaller inputs are handled in the calling thread
+    "compression_level": 1,  # zlib level for payloads passed between processes
+    "start_method": "spawn",  # Avoids forking a process that runs Selenium and thread pools
+}
+
+# Plain-HTTP fast path and per-domain strategy memory (see fetch_strategy.py)
+FETCH_STRATEGY_SETTINGS = {
+    "cache_file": "cache/fetch_strategies.sqlite3",
+    "pool_connections": 20,   # Number of host connection pools kept by the HTTP client
+    "pool_maxsize": 10,       # Connections kept per host
+    "min_html_length": 5000,  # Pages smaller than this with JS-app markers need a browser
+    "min_text_length": 500,   # Minimum visible text for a page to count as rendered
+    "min_keyword_hits": 3,    # Minimum tender/bid/deadline keyword matches inside the listing rows
+    "min_repeated_rows": 5,   # Minimum rows in one repeated listing region, outside nav/header/footer
+    "reprobe_after_days": 7,  # Retry plain HTTP for Selenium-only domains after this many days
+}
+
+# Cookie consent dismissal (see click_accept_cookies in scraper.py)
+COOKIE_CONSENT_SETTINGS = {
+    "cache_file": "cache/cookie_consent.sqlite3",
+    "remember_days": 30,  # Re-detect a site's banner button after this many days; pages without a banner are not remembered
+    "min_score": 20,      # Candidates must match a text and sit in a consent banner or have a consent id/class
+    # Button texts in order of preference; exact matches score higher than partial ones
+    "accept_texts": [
+        "accept all", "accept all cookies", "allow all", "accept", "i agree", "agree", "allow",
+        "consent", "got it", "ok", "continue", "accepter", "tout accepter", "aceptar", "aceitar",
+        "akzeptieren", "alle akzeptieren", "accetta",
+    ],
+}
+
+# Discovery of JSON listing APIs through the Chrome performance log (see api_capture.py)
+API_CAPTURE_SETTINGS = {
+    "enabled": True,
+    "cache_file": "cache/api_endpoints.sqlite3",
+    "min_items": 3,        # Minimum array length for a JSON response to count as a listing
+    "min_shared_keys": 3,  # Minimum number of keys shared by every object in the array
+    "remember_days": 14,   # Re-capture endpoints after this many days
+    "check_items": 20,     # Array items compared with the rendered page
+    "min_value_chars": 8,  # Item values at least this long are looked up in the page text
+    "min_matching_share": 0.5,  # Share of checked items that must appear on the page or carry a tender keyword and date
+}
+
+# HTML-to-markdown conversion (see markdown_converter.py)
+MARKDOWN_SETTINGS = {
+    "converter": "lxml",  # "lxml" for the single-parse converter, "html2text" for the previous path
+    "stream_threshold_chars": 5_000_000,  # Larger pages are converted with the streaming converter
+    "stream_chunk_chars": 20000,  # Markdown yielded per chunk by the streaming converter
+    "stream_feed_chars": 65536,  # HTML fed to the incremental parser at a time
+}
+
+# Listing-region extraction: send the LLM only the repeated rows/cards of a page (see listing_region.py)
+LISTING_REGION_SETTINGS = {
+    "enabled": True,
+    "min_items": 3,  # Repeated siblings needed before a container counts as a listing
+    "min_avg_chars": 25,  # Average text per item; shorter items are menus or link bars
+    "min_region_chars": 200,  # Below this the whole page is converted instead
+    "secondary_region_ratio": 0.5,  # Other regions scoring at least this share of the best one are kept too
+}
+
+# Replace URLs in the LLM input with short IDs and expand them in the result (see url_compaction.py)
+URL_COMPACTION_SETTINGS = {
+    "enabled": True,
+}
+
+# Long-lived LLM provider clients shared across threads (see llm_clients.py)
+LLM_CLIENT_SETTINGS = {
+    "pool_size": 20,  # Keep-alive connections per provider; keep at or above CONCURRENCY_SETTINGS["process_workers"]
+    "timeout": 120,  # Seconds to wait for a completion
+    "connect_timeout": 10,
+    "max_retries": 0,  # Retries are done by llm_dispatcher.py, which also honours the rate limits
+}
+
+# Requests and tokens per minute allowed per model; match these to your account's tier (see llm_dispatcher.py)
+RATE_LIMITS = {
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200_000},
+    "gpt-4o-2024-08-06": {"rpm": 500, "tpm": 30_000},
+    "gemini-1.5-flash": {"rpm": 15, "tpm": 1_000_000},
+    "Groq Llama3.1 70b": {"rpm": 30, "tpm": 6_000},
+    "Llama3.1 8B (local)": {"rpm": 100_000, "tpm": 100_000_000},  # Only bounded by LOCAL_LLM_SETTINGS["parallel_requests"]
+    "default": {"rpm": 60, "tpm": 100_000},
+}
+
+# Retries and token reservation of the LLM dispatcher
+LLM_DISPATCH_SETTINGS = {
+    "max_attempts": 5,
+    "base_delay": 2,  # Seconds before the first retry, doubled for each further one (with jitter)
+    "max_delay": 60,
+    "output_token_allowance": 1000,  # Tokens reserved for the answer on top of the counted prompt
+    "log_wait_seconds": 1,  # Calls held back longer than this by the rate limits are logged with the queue depth
+}
+
+# Chunked extraction of pages over the token budget (see chunked_extraction.py)
+EXTRACTION_SETTINGS = {
+    "chunk_tokens": 12000,  # Input budget per LLM call; smaller chunks also keep each answer under the output limit
+    "chunk_workers": 4,  # Chunks of one page extracted in parallel
+    "model_chunk_tokens": {
+        "Llama3.1 8B (local)": 6000,  # Keep prompt plus answer inside the local server's context window
+        "Groq Llama3.1 70b": 4000,  # Chunk, system prompt and answer allowance must fit the 6000 TPM bucket
+    },
+}
+
+# On-disk cache of LLM extraction results (see llm_cache.py)
+LLM_CACHE_SETTINGS = {
+    "enabled": True,
+    "db_path": "cache/llm_cache.sqlite3",
+    "max_bytes": 200 * 1024 * 1024,  # Least recently used results are evicted beyond this size
+}
+
+# OpenAI Batch API sweeps (see batch_extraction.py)
+BATCH_SETTINGS = {
+    "output_folder": "output/batches",
+    "completion_window": "24h",
+    "poll_interval": 60,  # Seconds between batch status checks
+}
+
+# Per-site extraction rules learned from LLM results and tried before the LLM (see extraction_rules.py)
+EXTRACTION_RULES_SETTINGS = {
+    "enabled": True,
+    "cache_file": "cache/extraction_rules.sqlite3",
+    "remember_days": 30,  # Relearn a site's rule after this many days
+    "min_rows": 3,  # Pages with fewer listings are neither learned from nor trusted
+    "min_field_fill": 0.5,  # Fields the LLM filled in at least this share of listings must be located in the DOM
+    "min_agreement": 0.8,  # Share of the LLM listings the rule must reproduce on the page it was learned from
+    "max_replay_ratio": 1.25,  # ...while selecting at most this many rows per LLM listing
+    "min_coverage_ratio": 0.8,  # On later runs each field must be filled at least this share of its learned rate
+    "min_row_ratio": 0.2,  # ...and at least this share of the learned number of rows must be found
+    "max_value_chars": 500,  # Longer element texts are not considered as field values
+}
+
+# Diff-based extraction: only blocks that changed since the last run go to the LLM (see listing_snapshots.py)
+LISTING_DIFF_SETTINGS = {
+    "enabled": True,
+    "db_path": "cache/listing_snapshots.sqlite3",
+    "max_new_ratio": 0.5,  # Above this share of new blocks the whole page is extracted again
+    "min_value_chars": 8,  # Values at least this long map a listing to the blocks it was extracted from
+}
+
+# OpenAI-compatible local server used for the "Llama3.1 8B (local)" model (see local_llm.py);
+# LOCAL_LLM_BASE_URL / LOCAL_LLM_API_KEY in .env override these
+LOCAL_LLM_SETTINGS = {
+    "base_url": "http://localhost:1234/v1",  # LM Studio default; llama.cpp server uses :8080/v1, vLLM :8000/v1
+    "api_key": "lm-studio",  # Local servers accept any key
+    "parallel_requests": 4,  # Concurrent requests; match the server's parallel slots (llama.cpp --parallel)
+    "timeout": 600,  # Seconds; local generation is slower than the hosted APIs
+    "json_schema": True,  # Send the listing schema as response_format; disable for servers without structured output
+}
+
+# Relevance filter that drops clearly non-IT listing blocks before the LLM (see relevance_filter.py)
+RELEVANCE_FILTER_SETTINGS = {
+    "enabled": True,
+    "min_block_chars": 40,  # Shorter blocks (headings, table headers, links) are always kept
+    "classifier": True,  # Use a TF-IDF/logistic regression model trained on past outcomes when scikit-learn is installed
+    "history_file": "cache/relevance_history.jsonl",
+    "max_history": 20000,  # Most recent labelled blocks used for training
+    "min_examples": 50,  # Examples needed of each class before the classifier is trained
+    "retrain_seconds": 3600,  # Retrain, or retry training, after this long once the history has grown
+    "keep_probability": 0.2,  # Blocks without a keyword are kept when the classifier scores them at least this
+    "explore_share": 0.05,  # Share of low-scoring blocks sent anyway so the classifier keeps learning from them
+}
+
+# Persistent page cache used to skip unchanged pages (see page_cache.py)
+PAGE_CACHE_SETTINGS = {
+    "enabled": True,
+    "db_path": "cache/page_cache.sqlite3",
+}
+
+# Durable job queue for distributed sweeps (see job_queue.py)
+JOB_QUEUE_SETTINGS = {
+    "backend": "sqlite",          # "postgres" to share the queue between machines
+    "sqlite_path": "cache/job_queue.sqlite3",
+    "table": "scrape_jobs",
+    "workers": 2,                 # Worker processes started per machine
+    "lease_seconds": 600,         # A job is handed to another worker if not renewed within this time
+    "max_attempts": 3,            # Jobs are dead-lettered after this many failed attempts
+    "retry_backoff_seconds": 60,  # Base delay before a retry, doubled on every attempt
+    "poll_interval": 5,           # Seconds an idle worker waits before polling again
+}
+
+# Hosts that run on the same backend and should be throttled as one domain
+DOMAIN_GROUPS = {
+    "nic-gepnic": [
+        "eprocure.gov.in", "etenders.gov.in", "hptenders.gov.in", "mptenders.gov.in",
+    ],
+}
+
 
 LLAMA_MODEL_FULLNAME="lmstudio-community/Meta-Llama-3.1-8B-Instruct-GGUF"
 GROQ_LLAMA_MODEL_FULLNAME="llama-3.1-70b-versatile"
@@ -134,6 +396,85 @@ Additionally, look for procurement opportunities involving government and enterp
 
 Ensure to extract information that contains relevant keywords such as 'software', 'IT', 'cloud', 'data management', 'cybersecurity', and 'system integration'. If any content is not in English, translate it into English before extracting the relevant information. The output should be in pure JSON format, with no additional commentary or non-relevant details. Only include content that explicitly relates to these areas or mentions the specified keywords."""
 
+# Keywords marking IT/software procurement, used by the relevance filter and the Gemini result check
+IT_KEYWORDS = [
+    'software', 'IT', 'ICT', 'ERP', 'API', 'GIS', 'BPO', 'LAN', 'WAN', 'saas',
+    'information technology', 'information system', 'information security', 'cloud', 'cyber',
+    'computer', 'computing', 'laptop', 'desktop', 'server', 'printer', 'telecom', 'networking', 'wifi', 'wi-fi',
+    'database', 'data centre', 'data center', 'data management', 'data analytics', 'data protection', 'big data',
+    'website', 'web-based', 'web portal', 'web application', 'mobile application', 'mobile app', 'application development',
+    'system integrat', 'systems integrat', 'e-service', 'e-government', 'e-procurement', 'internet',
+    'digital transformation', 'digital skills', 'digital identity', 'digital platform', 'digitali', 'digitiz', 'digitis',
+    'biometric', 'identity management', 'national ID', 'financial management', 'treasury management',
+    'revenue collection', 'tax administration', 'debt recovery', 'robotic process', 'business process outsourcing',
+    # Spanish
+    'informática', 'tecnología de la información', 'tecnologías de la información', 'sistema de informaci',
+    'sistemas de informaci', 'en la nube', 'ordenador', 'computador',
+    # French
+    'informatique', "technologie de l'information", "technologies de l'information", "système d'information",
+    "systèmes d'information", 'logiciel', 'ordinateur', 'transformation numérique', 'infonuagique',
+    # German
+    'informatik', 'rechner', 'rechenzentrum',
+]
+
+# Keywords marking procurement that is clearly not IT; blocks with one of these and no IT keyword are dropped
+NON_IT_KEYWORDS = [
+    'construction', 'civil works', 'building works', 'rehabilitation', 'renovation', 'demolition', 'excavation',
+    'road', 'bridge', 'borehole', 'plumbing', 'roofing', 'painting', 'fencing', 'landscaping', 'sewer',
+    'catering', 'food', 'fuel', 'lubricant', 'furniture', 'uniform', 'stationery', 'laundry',
+    'cleaning', 'janitorial', 'fumigation', 'security guard', 'guarding', 'motor vehicle', 'vehicles',
+    'medical supplies', 'drugs', 'pharmaceutical', 'fertili', 'seeds', 'livestock', 'insurance', 'air ticket',
+    # Spanish
+    'construcción', 'obras', 'combustible', 'alimentos', 'limpieza', 'mobiliario', 'vehículos',
+    # French
+    'travaux', 'carburant', 'nettoyage', 'mobilier', 'véhicules', 'denrées',
+    # German
+    'bauarbeiten', 'reinigung', 'möbel', 'fahrzeug',
+]
+
+# Filtering and translation rules appended to the schema instructions for Gemini (see prompt_assembly.py)
+GEMINI_FILTER_MESSAGE = """IMPORTANT EXTRACTION AND TRANSLATION RULES:
+1. LANGUAGE HANDLING:
+   - Process content in ANY language
+   - Translate all extracted information to English
+   - Maintain the original meaning and technical terminology
+   - Include the original language version of the title in a new field 'original_title'
+   - If the listing is not in English, add a field 'source_language' specifying the original language
+
+2. ONLY extract information about opportunities that EXPLICITLY mention:
+   - Software development or IT solutions
+   - ERP systems (financial, HR, supply chain)
+   - IT consulting and advisory services
+   - Digital skills training
+   - Government technology solutions
+   - System integration
+   - Cloud solutions
+   - Data management
+   - Cybersecurity
+   - Digital transformation
+
+3. SKIP any opportunity that:
+   - Does not explicitly mention technology or IT services
+   - Is purely about physical goods or non-IT services
+   - Is ambiguous about IT involvement
+
+4. For each extracted opportunity, you MUST be able to point to specific text that confirms it's IT/software related.
+
+FORMAT: Provide output in pure JSON following the schema exactly. Do not include explanatory text.
+For non-English listings, include:
+- 'original_title': The title in original language
+- 'source_language': The language code (e.g., 'es', 'fr', 'de')
+
+BEFORE INCLUDING ANY LISTING, ASK:
+- Does it explicitly mention IT/software services?
+- Is it clearly a technology procurement?
+- Can I point to specific IT-related keywords in the text?
+- Have I accurately translated all relevant information to English?
+- Have I preserved the original title for non-English listings?
+
+Only include listings that pass these checks.
+"""
+
 PROMPT_PAGINATION = """
 You are an assistant that extracts pagination elements from markdown content of websites your goal as a universal pagination scrapper of urls from all websites no matter how different they are.
 
@@ -155,4 +496,171 @@ Provide the output as a JSON object with the following structure:
 
 Do not include any additional text or explanations.
 """
-    
\ No newline at end of file
+    
+
+# Mapping of website names to URLs
+WEBSITE_URLS = {
+    # "PPIP": "https://tenders.go.ke/tenders",
+    # "UNGM": "https://www.ungm.org/Public/Notice",
+    "IOM": "https://www.iom.int/procurement-opportunities",
+    #"Malawi": "https://www.ppda.mw/tenders",
+    "UNDP": "https://procurement-notices.undp.org/#:~:text=RFP/JSB-AC/2409/52%20Develop%20a%20national%20e-procurement",
+    "AFDB": "https://www.afdb.org/en/projects-and-operations/procurement#:~:text=Procurement%20procedures%20must%20offer%20equal%20opportunities%20to",
+    #"KRA": "https://www.kra.go.ke/tenders#:~:text=E%20-%20Procurement%20We%20are%20always%20working%20closely%20with%20our",
+    "Swaziland": "https://esppra.co.sz/sppra/tender.php",
+    #"Nigeria": "https://www.publicprocurement.ng/#:~:text=ministry%20for%20local%20government%20and%20chieftaincy%20affairs,%20yobe",
+    "Uganda": "https://gpp.ppda.go.ug/public/bid-invitations",
+    #"EC": "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/calls-for-tenders?keywords=software&isExactMatch=true&order=DESC&pageNumber=1&pageSize=50&sortBy=startDate",
+    #"Georgia": "https://ssl.doas.state.ga.us/gpr/",
+    #"EIB": "https://www.eib.org/en/about/procurement/all/index.htm?q=&sortColumn=configuration.contentStart&sortDir=desc&pageNumber=0&itemPerPage=25&pageable=true&la=EN&deLa=EN&yearTo=&orYearTo=true&yearFrom=&orYearFrom=true&procurementStatus=&or_g_procurementInformations_type=true",
+    "UN": "https://www.un.org/Depts/ptd/eoi",
+    "DepEd": "https://depedpines.com/procurement-notices/",
+    #"GeBiz": "https://www.gebiz.gov.sg/ptn/opportunity/BOListing.xhtml",
+    "Mauritius": "https://publicprocurement.govmu.org/publicprocurement/?page_id=720",
+    "Bermuda": "https://www.gov.bm/procurement-notices",
+    "Caribbean Bank": "https://www.caribank.org/work-with-us/procurement/general-procurement-notices",
+    "Hong Kong": "https://pcms2.gld.gov.hk/iprod/#/sta00305?lang-setting=en-US&results_pageNo=1",
+    "Aus Tender": "https://www.tenders.gov.au/atm",
+    "Sri Lanka": "https://www.slcgmel.org/procurement-notices/",
+    "ADB": "https://www.adb.org/projects/tenders/group/goods",
+    # "HANDS": "https://hands.ehawaii.gov/hands/opportunities",
+    "GoC": "https://canadabuys.canada.ca/en/tender-opportunities",
+    "Scotland": "https://www.publiccontractsscotland.gov.uk/Search/Search_MainPage.aspx",
+    "NRA": "https://www.nra.co.za/sanral-tenders/list/open-tenders",
+    # "IADB": "https://projectprocurement.iadb.org/en/procurement-notices",
+    "USAID": "https://www.usaid.gov/procurement-announcements",
+    #"AIIB": "https://www.aiib.org/en/opportunities/business/project-procurement/list.html",
+    "EEAS": "https://www.eeas.europa.eu/eeas/tenders_en",
+    "UNIDO": "https://www.unido.org/get-involved-procurement/procurement-opportunities",
+    #"CBK": "https://www.centralbank.go.ke/tenders/",
+    "DevAID": "https://www.developmentaid.org/tenders/search?sectors=70",
+    "Save the Children": "https://www.savethechildren.net/tenders",
+    "TradeMarkAfrica": "https://www.trademarkafrica.com/procurement/",
+    "IUCN": "https://iucn.org/procurement/currently-running-tenders",
+    "KRA": "https://krc.co.ke/tenders/",
+    "Enable": "https://www.enabel.be/fr/marches-publics/?in_category%5B%5D=all&in_country=all&is_status=0&_gl=1*arq3h4*_up*MQ..*_ga*NDM0NDQ0NTkxLjE2NzM1MzI2MzU.*_ga_9KW9PQQN9K*MTY3MzUzMjYzNC4xLjAuMTY3MzUzMjYzNC4wLjAuMA..#news",
+    "Toronto": "https://www.toronto.ca/business-economy/doing-business-with-the-city/searching-bidding-on-city-contracts/toronto-bids-portal/#all",
+    "India": "https://eprocure.gov.in/eprocure/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=SaNQkFYrq2Ejxc9TMUtutTtS0Fec7wUuNy1YFXyqSerE%3D",
+    "Arizona": "https://app.az.gov/page.aspx/en/rfp/request_browse_public",
+    "Texas": "https://www.txsmartbuy.gov/esbd?page=1&keyword=software",
+    "AU": "https://au.int/en/bids",
+    "West Bengal": "https://www.wbsedcl.in/irj/go/km/docs/internet/new_website/TenderBids.html",
+    "Gov-UK": "https://www.contractsfinder.service.gov.uk/Search/Results",
+    "PPRA": "https://www.ppra.org.pk/dad_tenders.asp",
+    "St. Vin": "https://procurement.gov.vc/eprocure/index.php/current-bids" ,
+    "OSCE": "https://procurement.osce.org/tenders",
+    "Bank of India": "https://bankofindia.co.in/tender",
+    "Canara Bank": "https://canarabank.com/tenders",
+    "E-Tender": "https://etenders.gov.in/eprocure/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=SpUU0rj42FI3UoCfR2Ztdaw%3D%3D",
+    "IICB": "https://iicb.res.in/tenders?status=active",
+    "NUS": "https://www.nus.edu.sg/suppliers/business-opportunities",
+    "Civic Info": "https://www.civicinfo.bc.ca/bids",
+    "UNHCR Syria": "https://www.unhcr.org/sy/tender-announcements",   
+    "Meghalaya" : "https://meghalaya.gov.in/tenders",
+    "Uganda2": "https://egpuganda.go.ug/bid-notices",
+    "H. Pradesh": "https://hptenders.gov.in/nicgep/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=Su%2Bzb384sa%2FwA6xudXbBwXNS0Fec7wUuNy1YFXyqSerE%3D",
+    "NGO-Proc": "https://procurement.ngojobsite.com/",
+    "TB": "https://www.tenderboard.gov.bh/tenders/public%20tenders/",
+    "KPPRA": "http://www.kppra.gov.pk/kppra/activetenders",
+    "New India": "https://www.newindia.co.in/tender-notice",
+    "Vic": "https://www.tenders.vic.gov.au/tender/search?preset=open",
+    "AIIMS": "https://www.aiims.edu/index.php/en/tenders/aiims-tender",
+    "Nepal": "https://bolpatra.gov.np/egp/searchOpportunity",
+    "PSHD": "https://pshealthpunjab.gov.pk/Home/Tenders",
+    "Mahapreit": "https://mahapreit.in/page/tender",
+    "Prasarb": "https://prasarbharati.gov.in/pbtenders/",
+    "Durban": "https://www.durban.gov.za/pages/business/procurement",
+    "NCCF": "https://nccf-india.com/tenders/",
+    "IOB": "https://www.iob.in/TenderDetails.aspx?Tendertype=Tender",
+    "Punjab": "https://pitb.gov.pk/tendernotices",
+    "Bangladesh": "https://cptu.gov.bd/advertisement-notices/advertisement-services.html",
+    "KSEB": "https://kseb.in/tenders",
+    "CPPP India": "https://eprocure.gov.in/cppp/latestactivetendersnew/cpppdata#",
+    "Madya Pradesh": "https://mptenders.gov.in/nicgep/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=S%2Bt7ylexecXeEINPR4PWtnw%3D%3D",
+    
+}
+
+UNIVERSAL_LABELS = [
+    "Title", "Description", "Date Posted", "Deadline", "Reference Number",
+    "Category", "Location", "Language", "Contact", "Budget", "Type"
+]
+
+# Predefined tags for each website (can include both universal and specific labels)
+PREDEFINED_TAGS = {
+    # "https://tenders.go.ke/tenders": ["Tender No", "Description", "Category", "Deadline", "Location"],
+    # "https://www.ungm.org/Public/Notice": ["Title", "Category", "Date Posted", "Deadline", "Type", "Location"],
+    "https://www.iom.int/procurement-opportunities": ["Title", "Category", "Date Posted", "Deadline", "Type", "Location"],
+    #"https://www.ppda.mw/tenders": ["Title", "Category", "Date Posted", "Deadline", "Reference Number"],
+    "https://procurement-notices.undp.org/#:~:text=RFP/JSB-AC/2409/52%20Develop%20a%20national%20e-procurement": ["Title", "Ref No", "Date Posted", "Deadline", "Type", "Location"],
+    "https://www.afdb.org/en/projects-and-operations/procurement#:~:text=Procurement%20procedures%20must%20offer%20equal%20opportunities%20to": ["Title", "Date Posted", "Type"],
+    #"https://www.kra.go.ke/tenders#:~:text=E%20-%20Procurement%20We%20are%20always%20working%20closely%20with%20our": ["Title", "Date Posted", "Deadline"],
+    "https://esppra.co.sz/sppra/tender.php": ["Title", "Ref No", "Deadline", "Date Posted"],
+    #"https://www.publicprocurement.ng/#:~:text=ministry%20for%20local%20government%20and%20chieftaincy%20affairs,%20yobe": ["Description", "Date Added", "Deadline", "Type"],
+    "https://gpp.ppda.go.ug/public/bid-invitations": ["Title", "Deadline", "Type"],
+    #"https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/calls-for-tenders?keywords=software&isExactMatch=true&order=DESC&pageNumber=1&pageSize=50&sortBy=startDate": ["Title", "Deadline", "Type", "Status", "Date Posted"],
+    #"https://ssl.doas.state.ga.us/gpr/": ["Title", "Ref No", "Status", "Deadline", "Date Posted"],
+    #"https://www.eib.org/en/about/procurement/all/index.htm?q=&sortColumn=configuration.contentStart&sortDir=desc&pageNumber=0&itemPerPage=25&pageable=true&la=EN&deLa=EN&yearTo=&orYearTo=true&yearFrom=&orYearFrom=true&procurementStatus=&or_g_procurementInformations_type=true": ["Title", "Type", "Status", "Date Posted"],
+    "https://www.un.org/Depts/ptd/eoi": ["Title", "Date Posted", "Deadline", "Reference Number"],
+    "https://depedpines.com/procurement-notices/": ["Title", "Date Posted", "Deadline"],
+    #"https://www.gebiz.gov.sg/ptn/opportunity/BOListing.xhtml?origin=menu": ["Ref No", "Title", "Date Posted", "Deadline", "Cartegory", "Status"],
+    "https://publicprocurement.govmu.org/publicprocurement/?page_id=720": ["Description", "Reference Number", "Deadline", "Cartegory"],
+    "https://www.gov.bm/procurement-notices": ["Title", "Date Posted", "Deadline", "Ref No"],
+    "https://www.caribank.org/work-with-us/procurement/general-procurement-notices": ["Title", "Cartegory", "Location"],
+    "https://pcms2.gld.gov.hk/iprod/#/sta00305?lang-setting=en-US&results_pageNo=1": ["Description", "Deadline", "Ref No", "Cartegory"],
+    "https://www.tenders.gov.au/atm": ["Description", "Deadline", "Cartegory", "Ref No"],
+    "https://www.slcgmel.org/procurement-notices/": ["Title", "Date Posted", "Type"],
+    "https://www.adb.org/projects/tenders/group/goods": ["Title", "Date Posted", "Deadline", "Type", "Ref No", "Status"],
+    # "https://hands.ehawaii.gov/hands/opportunities": ["Title", "Location", "Deadline", "Cartegory", "Ref No", "Status", "Date Posted"],
+    "https://canadabuys.canada.ca/en/tender-opportunities": ["Title", "Cartegory", "Deadline", "Date Posted"],
+    "https://www.publiccontractsscotland.gov.uk/Search/Search_MainPage.aspx": ["Title", "Ref No", "Deadline", "Date Posted", "Type"],
+    "https://www.nra.co.za/sanral-tenders/list/open-tenders": ["Description", "Ref No", "Deadline", "Location", "Type"],
+    # "https://projectprocurement.iadb.org/en/procurement-notices": ["Title", "Ref No", "Deadline", "Type", "Location", "Date Posted"],
+    "https://www.usaid.gov/procurement-announcements": ["Title", "Date Posted"],
+    #"https://www.aiib.org/en/opportunities/business/project-procurement/list.html": ["Cartegory", "Date Posted", "Title", "Type", "Location"],
+    "https://www.eeas.europa.eu/eeas/tenders_en": ["Title", "Deadline", "Budget", "Type"],
+    "https://www.unido.org/get-involved-procurement/procurement-opportunities": ["Title", "Deadline", "Type", "Location", "Ref No"],
+    #"https://www.centralbank.go.ke/tenders/": ["Title", "Date Posted", "Deadline", "Ref No", "Status"],
+    "https://www.developmentaid.org/tenders/search?sectors=70": ["Title", "Deadline", "Type", "Location", "Status", "Budget", "Cartegory"],
+    "https://www.savethechildren.net/tenders": ["Title", "Description", "Date Posted", "Location", "Deadline"],
+    "https://www.trademarkafrica.com/procurement/": ["Title", "Ref No", "Deadline"],
+    "https://iucn.org/procurement/currently-running-tenders": ["Title", "Deadline", "Location", "Budget"],
+    "https://krc.co.ke/tenders/": ["Title", "Deadline", "Ref No", "Status"],
+    "https://www.enabel.be/fr/marches-publics/?in_category%5B%5D=all&in_country=all&is_status=0&_gl=1*arq3h4*_up*MQ..*_ga*NDM0NDQ0NTkxLjE2NzM1MzI2MzU.*_ga_9KW9PQQN9K*MTY3MzUzMjYzNC4xLjAuMTY3MzUzMjYzNC4wLjAuMA..#news": ["Title", "Deadline", "Ref No", "Location"],
+    "https://www.toronto.ca/business-economy/doing-business-with-the-city/searching-bidding-on-city-contracts/toronto-bids-portal/#all":  ["Title", "Deadline", "Ref No", "Date Posted", "Cartegory", "Type"],
+    "https://eprocure.gov.in/eprocure/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=SaNQkFYrq2Ejxc9TMUtutTtS0Fec7wUuNy1YFXyqSerE%3D":  ["Title", "Deadline", "Ref No", "Date Posted"],
+    "https://app.az.gov/page.aspx/en/rfp/request_browse_public": ["Title", "Deadline", "Ref No", "Date Posted", "Cartegory", "Status"],
+    "https://www.txsmartbuy.gov/esbd?page=1&keyword=software": ["Title", "Deadline", "Ref No", "Date Posted", ],
+    "https://au.int/en/bids":  ["Title", "Deadline", "Ref No", "Type"],
+    "https://www.wbsedcl.in/irj/go/km/docs/internet/new_website/TenderBids.html": ["Title", "Deadline", "Ref No", "Date Posted", "Budget"],
+    "https://www.contractsfinder.service.gov.uk/Search/Results" : ["Title", "Deadline", "Budget", "Date Posted", "Cartegory", "Location"],
+    "https://www.ppra.org.pk/dad_tenders.asp": ["Title", "Deadline", "Ref No", "Date Posted",],
+    "https://procurement.gov.vc/eprocure/index.php/current-bids":  ["Description", "Ref No", "Deadline", "Type"],
+    "https://procurement.osce.org/tenders": ["Title", "Deadline", "Date Posted",],
+    "https://bankofindia.co.in/tender" : ["Title", "Deadline", "Ref No", "Date Posted"],
+    "https://etenders.gov.in/eprocure/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=SpUU0rj42FI3UoCfR2Ztdaw%3D%3D": ["Title", "Deadline", "Ref No", "Date Posted"],
+    "https://iicb.res.in/tenders?status=active": ["Description", "Deadline", "Ref No", "Date Posted"],
+    "https://www.nus.edu.sg/suppliers/business-opportunities": ["Description", "Deadline", "Ref No", "Date Posted", "Status"],
+    "https://www.civicinfo.bc.ca/bids": ["Title", "Deadline", "Type", "Date Posted", "Location"],
+    "https://www.unhcr.org/sy/tender-announcements": ["Title", "Date Posted"],
+    "https://meghalaya.gov.in/tenders":  ["Title", "Deadline", "Date Posted"],
+    "https://egpuganda.go.ug/bid-notices" : ["Title", "Deadline", "Date Posted", "Type", "Location", "Ref No"],
+    "https://hptenders.gov.in/nicgep/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=Su%2Bzb384sa%2FwA6xudXbBwXNS0Fec7wUuNy1YFXyqSerE%3D": ["Title", "Deadline", "Ref No", "Date Posted"],
+    "https://procurement.ngojobsite.com/": ["Title", "Date Posted", "Type",],
+    "https://www.tenderboard.gov.bh/tenders/public%20tenders/": ["Title", "Deadline", "Date Posted", "Type", "Cartegory"],
+    "http://www.kppra.gov.pk/kppra/activetenders": ["Description", "Deadline", "Date Posted", "Ref No"],
+    "https://www.newindia.co.in/tender-notice": ["Title", "Deadline", "Date Posted", "Location"],
+    "https://www.tenders.vic.gov.au/tender/search?preset=open": ["Title", "Deadline", "Date Posted", "Type", "Status", "Ref No"],
+    "https://www.aiims.edu/index.php/en/tenders/aiims-tender" : ["Title", "Deadline", "Date Posted", "Cartegory"],
+    "https://bolpatra.gov.np/egp/searchOpportunity": ["Title", "Deadline", "Date Posted", "Type", "Ref No"],
+    "https://pshealthpunjab.gov.pk/Home/Tenders": ["Title",  "Date Posted",],
+    "https://mahapreit.in/page/tender": ["Title", "Cartegory", "Date Posted", "Type", "Ref No"],
+    "https://www.durban.gov.za/pages/business/procurement": ["Title", "Deadline", "Cartegory", "Type", "Ref No"],
+    "https://nccf-india.com/tenders/": ["Title", "Date Posted"],
+    "https://www.iob.in/TenderDetails.aspx?Tendertype=Tender":  ["Description", "Deadline", "Date Posted",],
+    "https://pitb.gov.pk/tendernotices": ["Title", "Deadline", "Date Posted"],
+    "https://cptu.gov.bd/advertisement-notices/advertisement-services.html":  ["Title", "Ref No", "Deadline", "Date Posted", "Cartegory", "Location"],
+    "https://kseb.in/tenders": ["Title", "Date Posted", "Ref No"],
+    "https://eprocure.gov.in/cppp/latestactivetendersnew/cpppdata#": ["Title", "Deadline", "Date Posted", "Ref No"],
+    "https://mptenders.gov.in/nicgep/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=S%2Bt7ylexecXeEINPR4PWtnw%3D%3D": ["Title", "Deadline", "Ref No", "Date Posted"],
+    
+}
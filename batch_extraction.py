@@ -0,0 +1,264 @@
+# batch_extraction.py
+
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Dict, List
+
+from assets import BATCH_SETTINGS, EXTRACTION_SETTINGS, PRICING, SYSTEM_MESSAGE, USER_MESSAGE, WEBSITE_URLS, PREDEFINED_TAGS, UNIVERSAL_LABELS
+from chunked_extraction import merge_listings, split_into_chunks
+from fetch_engine import run_pipeline
+from llm_clients import providers
+import local_llm
+from url_compaction import LINK_ID_INSTRUCTION, compact_urls, expand_urls
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+
+
+def _response_format(fields: List[str]) -> Dict:
+    """JSON schema response format equivalent to the DynamicListingsContainer used by format_data."""
+    from scraper import create_dynamic_listing_model, create_listings_container_model
+
+    return local_llm.json_schema_format(create_listings_container_model(create_dynamic_listing_model(fields)))
+
+
+def build_requests(pages: List[Dict], model: str) -> List[Dict]:
+    """
+    Turn fetched pages into Batch API request lines, one per chunk, with the
+    same messages format_data sends. Chunk and URL-table details needed to
+    put the answers back together are stored on each page dict.
+    """
+    lines = []
+    for page_index, page in enumerate(pages):
+        data, url_table = compact_urls(page['markdown'])
+        instruction = LINK_ID_INSTRUCTION if url_table else ''
+        chunks = split_into_chunks(data, model, EXTRACTION_SETTINGS["model_chunk_tokens"].get(model))
+        page.update(url_table=url_table, chunk_count=len(chunks))
+        response_format = _response_format(page['fields'])
+        for chunk_index, chunk in enumerate(chunks):
+            lines.append({
+                "custom_id": f"{page_index}-{chunk_index}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "messages": [
+                        {"role": "system", "content": SYSTEM_MESSAGE},
+                        {"role": "user", "content": USER_MESSAGE + instruction + chunk},
+                    ],
+                    "response_format": response_format,
+                },
+            })
+    return lines
+
+
+def _fetch_sweep_pages(website_names: List[str] = None):
+    """Fetch the configured sites into a new sweep folder. Returns the folder and one dict per fetched page."""
+    from scraper import fetch_page_markdown, save_raw_data
+
+    sites = [(name, url) for name, url in WEBSITE_URLS.items() if not website_names or name in website_names]
+    batch_folder = os.path.join(BATCH_SETTINGS["output_folder"], f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}")
+    os.makedirs(batch_folder, exist_ok=True)
+
+    # Fetch concurrently; extraction happens in the batch, so processing only keeps the page
+    results = run_pipeline([url for _, url in sites], fetch_page_markdown, lambda index, url, page: page)
+
+    pages = []
+    for (website_name, url), item in zip(sites, results):
+        if item['result'] is None:
+            logger.error(f"Skipping {website_name}: fetch failed ({item['error']})")
+            continue
+        output_folder = os.path.join(batch_folder, f"site_{len(pages) + 1}")
+        raw_path = save_raw_data(item['result']['markdown'], output_folder, 'rawData_1.md')
+        pages.append({
+            'website_name': website_name,
+            'url': url,
+            'fields': PREDEFINED_TAGS.get(url, UNIVERSAL_LABELS[:5]),
+            'output_folder': output_folder,
+            'raw_path': raw_path,
+            'markdown': item['result']['markdown'],
+        })
+    return batch_folder, pages
+
+
+def _write_manifest(batch_folder: str, manifest: Dict):
+    for page in manifest['pages']:
+        page.pop('markdown', None)
+    with open(os.path.join(batch_folder, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4)
+
+
+def submit_sweep(model: str, website_names: List[str] = None) -> str:
+    """
+    Fetch every configured site, write their extraction requests to a JSONL
+    batch and submit it. Returns the local batch folder, which holds the
+    manifest used by `collect_batch`.
+    """
+    batch_folder, pages = _fetch_sweep_pages(website_names)
+    lines = build_requests(pages, model)
+    if not lines:
+        raise RuntimeError("No pages were fetched, nothing to submit")
+    requests_path = os.path.join(batch_folder, 'requests.jsonl')
+    with open(requests_path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + '\n')
+
+    client = providers.openai()
+    with open(requests_path, 'rb') as f:
+        input_file = client.files.create(file=f, purpose='batch')
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint='/v1/chat/completions',
+        completion_window=BATCH_SETTINGS["completion_window"],
+        metadata={'sweep': os.path.basename(batch_folder)},
+    )
+
+    _write_manifest(batch_folder, {'batch_id': batch.id, 'model': model, 'pages': pages})
+    logger.info(f"Submitted batch {batch.id} with {len(lines)} requests for {len(pages)} pages ({batch_folder})")
+    return batch_folder
+
+
+def wait_for_batch(batch_id: str):
+    """Poll a batch until it reaches a final status and return it."""
+    client = providers.openai()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in FINAL_STATUSES:
+            return batch
+        counts = batch.request_counts
+        logger.info(f"Batch {batch_id} {batch.status}: {counts.completed if counts else 0}/{counts.total if counts else '?'} done")
+        time.sleep(BATCH_SETTINGS["poll_interval"])
+
+
+def _read_results(client, file_id: str) -> Dict[str, Dict]:
+    if not file_id:
+        return {}
+    content = client.files.content(file_id).text
+    entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+    return {entry['custom_id']: entry for entry in entries}
+
+
+def calculate_batch_price(token_counts: Dict, model: str) -> float:
+    prices = PRICING[model]
+    return (token_counts.get("input_tokens", 0) * prices["batch_input"]
+            + token_counts.get("output_tokens", 0) * prices["batch_output"])
+
+
+def collect_batch(batch_folder: str, wait: bool = True, push_to_db: bool = True) -> Dict:
+    """
+    Fetch the results of a submitted batch, merge each page's chunks, and save
+    them with save_formatted_data and push_json_to_db like an interactive run.
+    Returns token totals and cost at batch prices.
+    """
+    with open(os.path.join(batch_folder, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    client = providers.openai()
+    batch = wait_for_batch(manifest['batch_id']) if wait else client.batches.retrieve(manifest['batch_id'])
+    if batch.status != 'completed':
+        raise RuntimeError(f"Batch {batch.id} is {batch.status}")
+
+    totals = _save_results(manifest, _read_results(client, batch.output_file_id), _read_results(client, batch.error_file_id), push_to_db)
+    cost = calculate_batch_price(totals, manifest['model'])
+    logger.info(f"Batch {batch.id}: {totals['input_tokens']} input / {totals['output_tokens']} output tokens, ${cost:.4f}")
+    return dict(totals, cost=cost)
+
+
+def run_local_sweep(website_names: List[str] = None, push_to_db: bool = True) -> Dict:
+    """
+    Sweep the configured sites with the local model: the same request lines as
+    a Batch API sweep, run concurrently against the local server and saved
+    like a collected batch. Returns token totals (at zero cost).
+    """
+    batch_folder, pages = _fetch_sweep_pages(website_names)
+    lines = build_requests(pages, local_llm.LOCAL_MODEL)
+    if not lines:
+        raise RuntimeError("No pages were fetched, nothing to extract")
+    logger.info(f"Running {len(lines)} requests for {len(pages)} pages on the local model server")
+    outputs = local_llm.run_requests(lines)
+
+    manifest = {'batch_id': None, 'model': local_llm.LOCAL_MODEL, 'pages': pages}
+    _write_manifest(batch_folder, manifest)
+    totals = _save_results(manifest, outputs, {}, push_to_db)
+    logger.info(f"Local sweep {batch_folder}: {totals['input_tokens']} input / {totals['output_tokens']} output tokens")
+    return dict(totals, cost=0.0, batch_folder=batch_folder)
+
+
+def _save_results(manifest: Dict, outputs: Dict[str, Dict], errors: Dict[str, Dict], push_to_db: bool) -> Dict:
+    """Merge each page's chunk answers, save them and push them to the database. Returns token totals."""
+    from scraper import save_formatted_data
+    from database_push import push_json_to_db
+
+    totals = {"input_tokens": 0, "output_tokens": 0}
+
+    for page_index, page in enumerate(manifest['pages']):
+        chunk_results = []
+        for chunk_index in range(page['chunk_count']):
+            custom_id = f"{page_index}-{chunk_index}"
+            entry = outputs.get(custom_id) or errors.get(custom_id) or {}
+            response = entry.get('response') or {}
+            if response.get('status_code') != 200:
+                logger.error(f"{page['website_name']} chunk {chunk_index + 1} failed: {entry.get('error') or response}")
+                continue
+            body = response['body']
+            totals["input_tokens"] += body.get('usage', {}).get('prompt_tokens', 0)
+            totals["output_tokens"] += body.get('usage', {}).get('completion_tokens', 0)
+            try:
+                chunk_results.append(json.loads(body['choices'][0]['message']['content']))
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error(f"{page['website_name']} chunk {chunk_index + 1} returned unusable content: {e}")
+
+        if not chunk_results:
+            logger.error(f"No results for {page['website_name']}, not saved")
+            continue
+        formatted_data = expand_urls(merge_listings(chunk_results), page['url_table'])
+        save_formatted_data(formatted_data, page['output_folder'], 'sorted_data_1.json', 'sorted_data_1.xlsx')
+
+        # Same layout as the Streamlit app: a JSON list with one entry per scraped URL
+        json_file_path = os.path.join(page['output_folder'], 'scraped_data.json')
+        with open(json_file_path, 'w', encoding='utf-8') as f:
+            json.dump([formatted_data], f, ensure_ascii=False, indent=4)
+        if push_to_db:
+            push_json_to_db(json_file_path, table_name='scraped_data', website_name=page['website_name'], website_url=page['url'])
+    return totals
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Bulk extraction through the OpenAI Batch API.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    submit_parser = subparsers.add_parser('submit', help='Fetch the configured websites and submit a batch.')
+    submit_parser.add_argument('--model', default='gpt-4o-mini', choices=[m for m in PRICING if 'batch_input' in PRICING[m]])
+    submit_parser.add_argument('--sites', nargs='*', help='Only include these website names.')
+
+    collect_parser = subparsers.add_parser('collect', help='Save and push the results of a submitted batch.')
+    collect_parser.add_argument('batch_folder', help='Folder printed by the submit command.')
+    collect_parser.add_argument('--no-wait', action='store_true', help='Fail instead of waiting if the batch is not done.')
+    collect_parser.add_argument('--no-db', action='store_true', help='Do not push the results to the database.')
+
+    run_parser = subparsers.add_parser('run', help='Submit, wait and collect in one go (e.g. for a nightly job).')
+    run_parser.add_argument('--model', default='gpt-4o-mini', choices=[m for m in PRICING if 'batch_input' in PRICING[m]])
+    run_parser.add_argument('--sites', nargs='*', help='Only include these website names.')
+
+    local_parser = subparsers.add_parser('local', help='Extract with the local model server instead of the Batch API.')
+    local_parser.add_argument('--sites', nargs='*', help='Only include these website names.')
+    local_parser.add_argument('--no-db', action='store_true', help='Do not push the results to the database.')
+
+    args = parser.parse_args()
+
+    if args.command == 'submit':
+        print(submit_sweep(args.model, args.sites))
+    elif args.command == 'collect':
+        print(json.dumps(collect_batch(args.batch_folder, wait=not args.no_wait, push_to_db=not args.no_db), indent=4))
+    elif args.command == 'run':
+        print(json.dumps(collect_batch(submit_sweep(args.model, args.sites)), indent=4))
+    elif args.command == 'local':
+        print(json.dumps(run_local_sweep(args.sites, push_to_db=not args.no_db), indent=4))
@@ -0,0 +1,181 @@
+# chunked_extraction.py
+
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from assets import EXTRACTION_SETTINGS
+from cpu_stage import count_tokens
+
+logger = logging.getLogger(__name__)
+
+TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$')
+LIST_ITEM = re.compile(r'^(\*|-|\+|\d+\.)\s')
+
+
+class ExtractedListings:
+    """Listings held as a plain dict (merged from chunks or read from a cache), with the interface of format_data's results."""
+
+    def __init__(self, data: Dict, failed_chunks: int = 0):
+        self.data = data
+        self.failed_chunks = failed_chunks
+
+    def to_dict(self):
+        return self.data
+
+    def dict(self):
+        return self.data
+
+
+def split_units(text: str) -> List[Tuple[str, str, Optional[str]]]:
+    """
+    Break markdown into the smallest pieces a chunk may end after: table rows,
+    top-level list items and other paragraphs. Returns (separator, text, header)
+    tuples, where header is the table header to repeat when a chunk starts
+    inside that table.
+    """
+    units = []
+    for block in re.split(r'\n\s*\n', text.strip()):
+        lines = block.split('\n')
+        if len(lines) > 2 and TABLE_SEPARATOR.match(lines[1]):
+            header = '\n'.join(lines[:2])
+            units.append(('\n\n', header, None))
+            units.extend(('\n', row, header) for row in lines[2:])
+        elif len(lines) > 1 and LIST_ITEM.match(lines[0]):
+            items = []
+            for line in lines:
+                if LIST_ITEM.match(line) or not items:
+                    items.append(line)
+                else:
+                    items[-1] += '\n' + line
+            units.append(('\n\n', items[0], None))
+            units.extend(('\n', item, None) for item in items[1:])
+        else:
+            units.append(('\n\n', block, None))
+    return units
+
+
+def _split_oversized(text: str, max_chars: int) -> List[str]:
+    """Split a single piece that exceeds the budget, preferring line breaks."""
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind('\n', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def _split_json_listings(text: str, max_chars: int) -> Optional[List[str]]:
+    """Split a JSON listing array (from a captured API) into smaller arrays."""
+    if not text.lstrip().startswith('['):
+        return None
+    try:
+        items = json.loads(text)
+    except ValueError:
+        return None
+    chunks, current, size = [], [], 0
+    for item in items:
+        serialized = json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+        if current and size + len(serialized) > max_chars:
+            chunks.append('[' + ','.join(current) + ']')
+            current, size = [], 0
+        current.append(serialized)
+        size += len(serialized) + 1
+    if current:
+        chunks.append('[' + ','.join(current) + ']')
+    return chunks
+
+
+def split_into_chunks(text: str, model: str, max_tokens: int = None) -> List[str]:
+    """
+    Split page markdown into chunks of at most `max_tokens` tokens, cutting only
+    between listings (table rows, list items, paragraphs). Table headers are
+    repeated at the top of chunks that continue a table. Text that fits the
+    budget is returned as a single chunk.
+    """
+    max_tokens = max_tokens or EXTRACTION_SETTINGS["chunk_tokens"]
+    total_tokens = count_tokens(text, model)
+    if total_tokens <= max_tokens:
+        return [text]
+
+    # Pieces are sized by characters using the page's own characters-per-token ratio
+    max_chars = max(int(len(text) * max_tokens / total_tokens), 1)
+
+    json_chunks = _split_json_listings(text, max_chars)
+    if json_chunks is not None:
+        return json_chunks
+
+    chunks, current, size = [], '', 0
+    for separator, unit, header in split_units(text):
+        for piece in _split_oversized(unit, max_chars):
+            if current and current != header and size + len(separator) + len(piece) > max_chars:
+                chunks.append(current)
+                current, size = '', 0
+                if header:
+                    current, size = header, len(header)
+            current = current + separator + piece if current else piece
+            size += len(separator) + len(piece)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _listing_key(listing) -> str:
+    if not isinstance(listing, dict):
+        return json.dumps(listing, sort_keys=True, default=str)
+    return json.dumps({key: ' '.join(str(value).lower().split()) for key, value in listing.items() if value not in (None, '')},
+                      sort_keys=True)
+
+
+def merge_listings(results: List) -> Dict:
+    """Merge the listings of several format_data results, dropping duplicates (e.g. rows near chunk edges)."""
+    merged, seen = [], set()
+    for result in results:
+        if result is None:
+            continue
+        data = result.to_dict() if hasattr(result, 'to_dict') else result
+        listings = data.get('listings', []) if isinstance(data, dict) else data
+        for listing in listings or []:
+            key = _listing_key(listing)
+            if key not in seen:
+                seen.add(key)
+                merged.append(listing)
+    return {"listings": merged}
+
+
+def extract_in_chunks(chunks: List[str], extract: Callable[[str], Tuple], workers: int = None) -> Tuple[Optional[ExtractedListings], Optional[Dict]]:
+    """
+    Run `extract` (returning the (formatted_data, token_counts) pair of
+    format_data) on every chunk in parallel and merge the results. Chunks that
+    fail are logged and skipped; (None, None) is returned only if all fail.
+    """
+    workers = workers or EXTRACTION_SETTINGS["chunk_workers"]
+
+    def run(index_chunk):
+        index, chunk = index_chunk
+        try:
+            return extract(chunk)
+        except Exception as e:
+            logger.error(f"Extraction of chunk {index + 1}/{len(chunks)} failed: {e}")
+            return None, None
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks)), thread_name_prefix='chunk') as pool:
+        outcomes = list(pool.map(run, enumerate(chunks)))
+
+    succeeded = [(data, counts) for data, counts in outcomes if data is not None]
+    if len(succeeded) < len(chunks):
+        logger.warning(f"{len(chunks) - len(succeeded)} of {len(chunks)} chunks failed to extract")
+    if not succeeded:
+        return None, None
+
+    token_counts = {"input_tokens": 0, "output_tokens": 0, "cached_input_tokens": 0}
+    for _, counts in succeeded:
+        for key in token_counts:
+            token_counts[key] += (counts or {}).get(key, 0)
+    return ExtractedListings(merge_listings([data for data, _ in succeeded]), len(chunks) - len(succeeded)), token_counts
@@ -0,0 +1,129 @@
+# cpu_stage.py
+
+import atexit
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import tiktoken
+
+from assets import CONCURRENCY_SETTINGS, CPU_STAGE_SETTINGS
+from markdown_converter import convert_html
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+# Processes on this host that each run their own pool (see share_cpu_with)
+_processes_per_host = 1
+
+
+def _pack(text: str) -> bytes:
+    """Compress text before it crosses the process boundary; HTML and markdown shrink 5-10x."""
+    return zlib.compress(text.encode('utf-8'), CPU_STAGE_SETTINGS["compression_level"])
+
+
+def _unpack(data: bytes) -> str:
+    return zlib.decompress(data).decode('utf-8')
+
+
+@functools.lru_cache(maxsize=None)
+def _encoder(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Non-OpenAI models: a close enough estimate
+        return tiktoken.get_encoding('o200k_base')
+
+
+def _count(text: str, model: str) -> int:
+    return len(_encoder(model).encode(text, disallowed_special=()))
+
+
+# Worker entry points; they take and return compressed payloads
+
+def _convert_worker(payload: bytes, base_url):
+    return _pack(convert_html(_unpack(payload), base_url))
+
+
+def _count_worker(payload: bytes, model: str) -> int:
+    return _count(_unpack(payload), model)
+
+
+def share_cpu_with(processes: int):
+    """
+    Declare that `processes` processes on this host each run a pool, e.g. the
+    job queue's worker processes, so that together they stay within the cores.
+    """
+    global _processes_per_host
+    _processes_per_host = max(1, processes)
+
+
+def pool_size() -> int:
+    """
+    The configured number of workers, or one per page processed in parallel
+    (CONCURRENCY_SETTINGS["process_workers"]) within this process's share of the cores.
+    """
+    if CPU_STAGE_SETTINGS["workers"]:
+        return CPU_STAGE_SETTINGS["workers"]
+    cores = max(1, (os.cpu_count() or 1) // _processes_per_host)
+    return max(1, min(CONCURRENCY_SETTINGS["process_workers"], cores))
+
+
+def get_cpu_pool():
+    """Return the process pool for CPU-bound work, creating it on first use. None when disabled."""
+    global _pool
+    if CPU_STAGE_SETTINGS["workers"] == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context(CPU_STAGE_SETTINGS["start_method"])
+            _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=context)
+            atexit.register(close_cpu_pool)
+        return _pool
+
+
+def close_cpu_pool():
+    """Shut down the worker processes, e.g. at the end of a batch sweep."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _submit(worker, text: str, *args):
+    """Run `worker` on compressed `text` in the pool; None when the pool is disabled or broke."""
+    pool = get_cpu_pool()
+    if pool is None:
+        return None
+    try:
+        return pool.submit(worker, _pack(text), *args).result()
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory); the caller finishes inline and the next call starts a fresh pool
+        logger.warning("CPU worker pool broke, running inline")
+        close_cpu_pool()
+        return None
+
+
+def convert_html_in_pool(html: str, base_url=None) -> str:
+    """Convert HTML to markdown in a worker process so large pages do not stall the calling thread."""
+    if len(html) >= CPU_STAGE_SETTINGS["inline_below_chars"]:
+        result = _submit(_convert_worker, html, base_url)
+        if result is not None:
+            return _unpack(result)
+    return convert_html(html, base_url)
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count tokens for `model` with tiktoken, in a worker process for large inputs."""
+    if len(text) >= CPU_STAGE_SETTINGS["inline_below_chars"]:
+        result = _submit(_count_worker, text, model)
+        if result is not None:
+            return result
+    return _count(text, model)
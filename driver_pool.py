@@ -0,0 +1,194 @@
+# driver_pool.py
+
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+from assets import DRIVER_POOL_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+class PooledDriver:
+    """A WebDriver together with the bookkeeping the pool needs to recycle it."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_served = 0
+        self.last_origin = None
+        self.created_at = time.time()
+
+
+class DriverPool:
+    """
+    Keeps a bounded set of live Chrome sessions so that each page fetch does not
+    pay for a browser cold start.
+
+    Drivers are created lazily up to `size`, health-checked when borrowed,
+    recycled after `max_pages_per_driver` pages and have their cookies and
+    storage cleared when they move to a different site.
+    """
+
+    def __init__(self, driver_factory: Callable, size: int = None, max_pages_per_driver: int = None,
+                 acquire_timeout: float = None, reset_between_sites: bool = None):
+        self.driver_factory = driver_factory
+        self.size = size or DRIVER_POOL_SETTINGS["size"]
+        self.max_pages_per_driver = max_pages_per_driver or DRIVER_POOL_SETTINGS["max_pages_per_driver"]
+        self.acquire_timeout = acquire_timeout or DRIVER_POOL_SETTINGS["acquire_timeout"]
+        self.reset_between_sites = (DRIVER_POOL_SETTINGS["reset_between_sites"]
+                                    if reset_between_sites is None else reset_between_sites)
+
+        # Idle drivers (most recently used last) and the live driver count, guarded by one condition
+        # that is notified whenever a driver is returned or capacity is freed
+        self._idle = []
+        self._available = threading.Condition()
+        self._created = 0
+        self._closed = False
+
+    def acquire(self, url: Optional[str] = None) -> PooledDriver:
+        """Borrow a healthy driver, starting a new one if the pool is not yet full."""
+        if self._closed:
+            raise RuntimeError("Driver pool has been closed")
+
+        deadline = time.time() + self.acquire_timeout
+        while True:
+            pooled = self._wait_for_driver(deadline)
+            if pooled is None:
+                pooled = self._create()
+
+            if not self._is_healthy(pooled):
+                logger.info("Discarding unhealthy WebDriver")
+                self._discard(pooled)
+                continue
+
+            if url and self.reset_between_sites:
+                self._reset_for_site(pooled, url)
+            return pooled
+
+    def release(self, pooled: PooledDriver, discard: bool = False):
+        """Return a driver to the pool, or quit it if it is broken or worn out."""
+        pooled.pages_served += 1
+        if not discard and pooled.pages_served < self.max_pages_per_driver:
+            with self._available:
+                if not self._closed:
+                    self._idle.append(pooled)
+                    self._available.notify()
+                    return
+        self._discard(pooled)
+
+    @contextmanager
+    def borrow(self, url: Optional[str] = None):
+        """Context manager yielding a raw WebDriver that is returned to the pool afterwards."""
+        pooled = self.acquire(url)
+        failed = False
+        try:
+            yield pooled.driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(pooled, discard=failed)
+
+    def close(self):
+        """Quit every idle driver and refuse further borrows."""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def _wait_for_driver(self, deadline: float) -> Optional[PooledDriver]:
+        """
+        Take an idle driver, or return None after reserving a slot for a new one.
+        Waits until either is possible, re-checking every time a driver is
+        returned or discarded.
+        """
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool has been closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    return None
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"No WebDriver became available within {self.acquire_timeout}s")
+                self._available.wait(remaining)
+
+    def _create(self) -> PooledDriver:
+        """Start a driver in a slot reserved by _wait_for_driver."""
+        try:
+            return PooledDriver(self.driver_factory())
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _discard(self, pooled: PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.debug(f"Error while quitting WebDriver: {e}")
+        self._free_slot()
+
+    @staticmethod
+    def _is_healthy(pooled: PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script("return 1;") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset_for_site(pooled: PooledDriver, url: str):
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if pooled.last_origin is None or pooled.last_origin == origin:
+            pooled.last_origin = origin
+            return
+
+        driver = pooled.driver
+        try:
+            driver.delete_all_cookies()
+            driver.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {
+                "origin": pooled.last_origin,
+                "storageTypes": "all",
+            })
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except Exception as e:
+            logger.debug(f"Could not fully reset WebDriver profile: {e}")
+        pooled.last_origin = origin
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool(driver_factory: Callable) -> DriverPool:
+    """Return the process-wide driver pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = DriverPool(driver_factory)
+            atexit.register(_pool.close)
+        return _pool
+
+
+def close_driver_pool():
+    """Quit all pooled drivers, e.g. at the end of a batch sweep."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
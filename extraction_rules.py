@@ -0,0 +1,263 @@
+# extraction_rules.py
+
+import logging
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+from assets import EXTRACTION_RULES_SETTINGS
+from relevance_filter import filter_listings
+from site_store import SiteStore
+
+logger = logging.getLogger(__name__)
+
+_rules = SiteStore(EXTRACTION_RULES_SETTINGS["cache_file"])
+
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'title', 'meta', 'link'}
+PATH_STEP = re.compile(r'^([^\[]+)(?:\[(\d+)\])?$')
+
+
+def _normalize(value) -> str:
+    return ' '.join(str(value).split()).casefold()
+
+
+def _is_url_field(name: str) -> bool:
+    name = name.lower()
+    return 'url' in name or 'link' in name
+
+
+def _parse(html: str):
+    try:
+        return lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError) as e:
+        logger.warning(f"Could not parse page for extraction rules: {e}")
+        return None
+
+
+def _index_page(root, base_url: Optional[str]):
+    """Map normalized element texts and absolute link targets to the elements that carry them."""
+    texts, links = {}, {}
+    max_chars = EXTRACTION_RULES_SETTINGS["max_value_chars"]
+    for element in root.iter():
+        if not isinstance(element.tag, str) or element.tag in SKIPPED_TAGS:
+            continue
+        if element.tag == 'a' and element.get('href'):
+            links.setdefault(urljoin(base_url or '', element.get('href').strip()), []).append(element)
+        text = _normalize(element.text_content())
+        if not text or len(text) > max_chars:
+            continue
+        # Only the innermost element holding a text is kept, so `<td><a>X</a></td>` maps to the link
+        if any(isinstance(child.tag, str) and _normalize(child.text_content()) == text for child in element):
+            continue
+        texts.setdefault(text, []).append(element)
+    return texts, links
+
+
+def _common_ancestor(elements):
+    common = [elements[0]] + list(elements[0].iterancestors())
+    for element in elements[1:]:
+        ancestors = set([element] + list(element.iterancestors()))
+        common = [candidate for candidate in common if candidate in ancestors]
+    return common[0] if common else None
+
+
+def _depth(element) -> int:
+    return sum(1 for _ in element.iterancestors())
+
+
+def _relative_path(row, node) -> str:
+    """XPath from a row down to one of its descendants, e.g. 'td[3]/a[1]'."""
+    steps = []
+    while node is not row:
+        parent = node.getparent()
+        siblings = [child for child in parent if child.tag == node.tag]
+        steps.append(f"{node.tag}[{siblings.index(node) + 1}]")
+        node = parent
+    return '/'.join(reversed(steps)) or '.'
+
+
+def _locate_listing(listing: Dict, columns: List[str], texts: Dict, links: Dict):
+    """
+    Find the DOM nodes holding a listing's values and the row element that
+    contains them. Values that occur several times are resolved by picking the
+    combination with the deepest (closest) common ancestor.
+    """
+    candidates = {}
+    for field in columns:
+        value = listing.get(field)
+        if value in (None, ''):
+            continue
+        nodes = links.get(str(value).strip()) if _is_url_field(field) else texts.get(_normalize(value))
+        if nodes:
+            candidates[field] = nodes
+    if len(candidates) < 2:
+        return None, {}
+
+    anchor_field = min(candidates, key=lambda field: len(candidates[field]))
+    best_row, best_nodes = None, {}
+    for anchor in candidates[anchor_field][:5]:
+        nodes = {anchor_field: anchor}
+        for field, options in candidates.items():
+            if field != anchor_field:
+                nodes[field] = max(options, key=lambda option: _depth(_common_ancestor([anchor, option])))
+        row = _common_ancestor(list(nodes.values()))
+        if row is not None and (best_row is None or _depth(row) > _depth(best_row)):
+            best_row, best_nodes = row, nodes
+    return best_row, best_nodes
+
+
+def _row_template(paths: List[str]) -> Optional[str]:
+    """
+    Generalize the absolute paths of matched rows into one XPath: positions
+    that differ between rows (always including the row itself) lose their index.
+    """
+    parsed = [[PATH_STEP.match(step).groups() for step in path.strip('/').split('/')] for path in paths]
+    shapes = Counter(tuple(tag for tag, _ in steps) for steps in parsed)
+    shape, _ = shapes.most_common(1)[0]
+    group = [steps for steps in parsed if tuple(tag for tag, _ in steps) == shape]
+    template = []
+    for position, tag in enumerate(shape):
+        indexes = {steps[position][1] for steps in group}
+        if position < len(shape) - 1 and len(indexes) == 1 and None not in indexes:
+            template.append(f"{tag}[{indexes.pop()}]")
+        else:
+            template.append(tag)
+    return '/' + '/'.join(template)
+
+
+def apply_rule(html: str, base_url: Optional[str], rule: Dict) -> Optional[List[Dict]]:
+    """Extract listings from a page with a learned rule. Rows holding less than half of the columns are dropped."""
+    root = _parse(html)
+    if root is None:
+        return None
+    columns = rule["columns"]
+    listings = []
+    for row in root.xpath(rule["row_xpath"]):
+        listing = {field: None for field in rule["fields"]}
+        for field, column in columns.items():
+            nodes = row.xpath(column["path"])
+            if not nodes or not isinstance(nodes[0].tag, str):
+                continue
+            if column["attr"] == 'href':
+                href = nodes[0].get('href')
+                listing[field] = urljoin(base_url or '', href.strip()) if href else None
+            else:
+                listing[field] = ' '.join(nodes[0].text_content().split()) or None
+        if sum(listing[field] is not None for field in columns) * 2 >= len(columns):
+            listings.append(listing)
+    return listings
+
+
+def _coverage(listings: List[Dict], fields) -> Dict[str, float]:
+    return {field: sum(listing.get(field) not in (None, '') for listing in listings) / len(listings) for field in fields}
+
+
+def learn_rule(url: str, html: str, base_url: Optional[str], fields: List[str], formatted_data: Dict) -> Optional[Dict]:
+    """
+    Align the listings the LLM extracted from a page with the page's DOM and
+    store a per-site rule: an XPath selecting the listing rows and, per field,
+    the path from a row to the element holding its value. The rule is only
+    kept if replaying it on the same page reproduces the LLM's listings and
+    selects about as many rows, as rows the LLM left out as not IT-related
+    would otherwise come back on every later run.
+    """
+    listings = [listing for listing in (formatted_data or {}).get('listings', []) if isinstance(listing, dict)]
+    if len(listings) < EXTRACTION_RULES_SETTINGS["min_rows"] or not html:
+        return None
+    root = _parse(html)
+    if root is None:
+        return None
+
+    columns = list(dict.fromkeys(list(fields) + ['direct_url']))
+    texts, links = _index_page(root, base_url)
+    tree = root.getroottree()
+
+    located = []
+    for listing in listings:
+        row, nodes = _locate_listing(listing, columns, texts, links)
+        if row is not None:
+            located.append((tree.getpath(row), row, nodes))
+    if len(located) < max(2, len(listings) * EXTRACTION_RULES_SETTINGS["min_field_fill"]):
+        logger.info(f"Extraction rules for {url}: only {len(located)} of {len(listings)} listings found in the page")
+        return None
+
+    row_xpath = _row_template([path for path, _, _ in located])
+    rows = set(root.xpath(row_xpath))
+    votes = {}
+    for _, row, nodes in located:
+        if row not in rows:
+            continue
+        for field, node in nodes.items():
+            votes.setdefault(field, Counter())[_relative_path(row, node)] += 1
+
+    rule_columns = {
+        field: {"path": counter.most_common(1)[0][0], "attr": 'href' if _is_url_field(field) else 'text'}
+        for field, counter in votes.items()
+    }
+    # A field the LLM usually fills but the rule cannot locate would be lost on every later run
+    llm_coverage = _coverage(listings, columns)
+    missing = [field for field in columns
+               if field not in rule_columns and llm_coverage[field] >= EXTRACTION_RULES_SETTINGS["min_field_fill"]]
+    if missing:
+        logger.info(f"Extraction rules for {url}: no stable location for {', '.join(missing)}")
+        return None
+
+    rule = {"fields": columns, "row_xpath": row_xpath, "columns": rule_columns}
+    replayed = apply_rule(html, base_url, rule) or []
+    if len(replayed) > len(listings) * EXTRACTION_RULES_SETTINGS["max_replay_ratio"]:
+        logger.info(f"Extraction rules for {url}: replay selects {len(replayed)} rows for {len(listings)} LLM listings")
+        return None
+    # Later runs only return the rows that pass the relevance check, so the agreement is measured on those
+    replayed_keys = {tuple(_normalize(item.get(field) or '') for field in rule_columns) for item in filter_listings(replayed)}
+    agreement = sum(tuple(_normalize(listing.get(field) or '') for field in rule_columns) in replayed_keys
+                    for listing in listings) / len(listings)
+    if agreement < EXTRACTION_RULES_SETTINGS["min_agreement"]:
+        logger.info(f"Extraction rules for {url}: replay matched only {agreement:.0%} of the LLM listings")
+        return None
+
+    varying = [field for field in rule_columns if len({item[field] for item in replayed if item.get(field)}) > 1]
+    rule.update(rows=len(replayed), coverage=_coverage(replayed, rule_columns), varying=varying)
+    _rules.set(url, **rule)
+    logger.info(f"Learned extraction rule for {url}: {row_xpath} ({len(rule_columns)} fields, {agreement:.0%} agreement)")
+    return rule
+
+
+def _validate(listings: List[Dict], rule: Dict) -> Optional[str]:
+    """Return why rule output looks wrong (layout changed), or None if it can be trusted."""
+    if len(listings) < max(EXTRACTION_RULES_SETTINGS["min_rows"], rule["rows"] * EXTRACTION_RULES_SETTINGS["min_row_ratio"]):
+        return f"{len(listings)} rows, learned on {rule['rows']}"
+    coverage = _coverage(listings, rule["columns"])
+    for field, learned in rule["coverage"].items():
+        if coverage.get(field, 0) < learned * EXTRACTION_RULES_SETTINGS["min_coverage_ratio"]:
+            return f"{field} filled in {coverage.get(field, 0):.0%} of rows, learned {learned:.0%}"
+    for field in rule["varying"]:
+        # A field that varied when learned but now repeats one value usually hits a label or header
+        if len({listing[field] for listing in listings if listing.get(field)}) == 1:
+            return f"{field} has the same value in every row"
+    return None
+
+
+def extract_with_rule(url: str, html: str, base_url: Optional[str], fields: List[str]) -> Optional[Dict]:
+    """
+    Extract listings with the site's learned rule. Returns the listings dict
+    format_data would produce, or None when there is no rule for these fields
+    or its output fails validation, in which case the LLM should be used.
+    Rows that do not look IT-related are dropped, as no LLM has filtered them.
+    """
+    rule = _rules.get(url, max_age=EXTRACTION_RULES_SETTINGS["remember_days"] * 86400)
+    if rule is None or rule.get("fields") != list(dict.fromkeys(list(fields) + ['direct_url'])) or not html:
+        return None
+    listings = apply_rule(html, base_url, rule)
+    if listings is None:
+        return None
+    problem = _validate(listings, rule)
+    if problem:
+        logger.info(f"Extraction rule for {url} rejected ({problem}), using the LLM")
+        return None
+    relevant = filter_listings(listings)
+    logger.info(f"Extraction rule for {url}: {len(relevant)} of {len(listings)} rows are IT-related")
+    return {"listings": relevant}
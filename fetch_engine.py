@@ -0,0 +1,115 @@
+# fetch_engine.py
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+from urllib.parse import urlparse
+
+from assets import CONCURRENCY_SETTINGS, DOMAIN_GROUPS
+
+logger = logging.getLogger(__name__)
+
+
+def domain_key(url: str) -> str:
+    """
+    Return the key used for per-domain throttling. Hosts listed together in
+    DOMAIN_GROUPS (e.g. the NIC eProcurement portals) share a single key.
+    """
+    host = urlparse(url).netloc.lower()
+    host = re.sub(r'^www\.', '', host.split(':')[0])
+    for group_name, hosts in DOMAIN_GROUPS.items():
+        if any(host == h or host.endswith('.' + h) for h in hosts):
+            return group_name
+    return host
+
+
+class DomainLimiter:
+    """Caps the number of in-flight requests per domain key."""
+
+    def __init__(self, per_domain: int):
+        self.per_domain = per_domain
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def limit(self, url: str):
+        key = domain_key(url)
+        with self._lock:
+            semaphore = self._semaphores.setdefault(key, threading.BoundedSemaphore(self.per_domain))
+        with semaphore:
+            yield
+
+
+def interleave_by_domain(urls: List[str]) -> List[int]:
+    """
+    Return the indices of `urls` ordered round-robin across domains so that
+    fetch workers are not left blocked behind one busy domain.
+    """
+    buckets = OrderedDict()
+    for index, url in enumerate(urls):
+        buckets.setdefault(domain_key(url), []).append(index)
+
+    order = []
+    while buckets:
+        for key in list(buckets):
+            order.append(buckets[key].pop(0))
+            if not buckets[key]:
+                del buckets[key]
+    return order
+
+
+def run_pipeline(urls: List[str], fetch: Callable[[str], Any], process: Callable[[int, str, Any], Any],
+                 fetch_workers: int = None, process_workers: int = None, per_domain: int = None) -> List[Dict]:
+    """
+    Fetch `urls` concurrently and hand each page to `process` as soon as it
+    arrives, so later pages are downloaded while earlier ones are in the LLM stage.
+
+    Args:
+        urls: URLs to scrape.
+        fetch: Called with a URL, returns whatever `process` needs (e.g. markdown).
+        process: Called with (index, url, fetched) and returns the final result.
+        fetch_workers: Global limit on concurrent fetches.
+        process_workers: Global limit on concurrent processing (LLM) calls.
+        per_domain: Limit on concurrent fetches against one domain key.
+
+    Returns:
+        One dict per URL, in input order, with 'url', 'fetched', 'result' and 'error' keys.
+    """
+    fetch_workers = fetch_workers or CONCURRENCY_SETTINGS["fetch_workers"]
+    process_workers = process_workers or CONCURRENCY_SETTINGS["process_workers"]
+    limiter = DomainLimiter(per_domain or CONCURRENCY_SETTINGS["per_domain"])
+
+    results = [{'url': url, 'fetched': None, 'result': None, 'error': None} for url in urls]
+
+    def _fetch(url):
+        with limiter.limit(url):
+            return fetch(url)
+
+    with ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='fetch') as fetch_pool, \
+            ThreadPoolExecutor(max_workers=process_workers, thread_name_prefix='process') as process_pool:
+        fetch_futures = {fetch_pool.submit(_fetch, urls[i]): i for i in interleave_by_domain(urls)}
+        process_futures = {}
+
+        for future in as_completed(fetch_futures):
+            index = fetch_futures[future]
+            try:
+                results[index]['fetched'] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to fetch {urls[index]}: {e}")
+                results[index]['error'] = e
+                continue
+            process_futures[process_pool.submit(process, index, urls[index], results[index]['fetched'])] = index
+
+        for future in as_completed(process_futures):
+            index = process_futures[future]
+            try:
+                results[index]['result'] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to process {urls[index]}: {e}")
+                results[index]['error'] = e
+
+    return results
@@ -0,0 +1,180 @@
+# fetch_strategy.py
+
+import logging
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, List
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from assets import USER_AGENTS, FETCH_STRATEGY_SETTINGS, TIMEOUT_SETTINGS
+from listing_region import find_listing_regions, listing_items
+from markdown_converter import parse_html
+from site_store import SiteStore
+
+logger = logging.getLogger(__name__)
+
+# Same patterns as the link collector that runs inside the browser in fetch_html_selenium
+PROCUREMENT_LINK_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in [r'tender', r'procurement', r'bid', r'rfp', r'proposal', r'notice', r'detail', r'view', r'more']
+]
+
+LISTING_KEYWORDS = re.compile(
+    r'\b(tender|bid|procurement|rfp|rfq|eoi|expression of interest|deadline|closing date|'
+    r'submission|reference|solicitation|contract|quotation)s?\b',
+    re.IGNORECASE,
+)
+
+# Markers of pages that only render their content with JavaScript
+JS_SHELL_MARKERS = re.compile(
+    r'enable javascript|javascript is (required|disabled)|<app-root|ng-app|id="(root|app|__next)"\s*>\s*</div>',
+    re.IGNORECASE,
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Return the shared HTTP session, whose connection pool is reused across fetches."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+            adapter = HTTPAdapter(
+                pool_connections=FETCH_STRATEGY_SETTINGS["pool_connections"],
+                pool_maxsize=FETCH_STRATEGY_SETTINGS["pool_maxsize"],
+                max_retries=retry,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def find_procurement_links(soup: BeautifulSoup, base_url: str) -> List[str]:
+    """Collect links that look like procurement notices, mirroring the in-browser collector."""
+    links = []
+    for link in soup.find_all('a'):
+        href = urljoin(base_url, link.get('href', ''))
+        candidates = [href, link.get_text(" ", strip=True).lower(), link.get('onclick') or '']
+        candidates.extend(str(value) for name, value in link.attrs.items() if name.startswith('data-'))
+        if any(pattern.search(candidate) for pattern in PROCUREMENT_LINK_PATTERNS for candidate in candidates):
+            links.append(href)
+    return links
+
+
+def has_listing_content(html: str) -> bool:
+    """
+    Heuristically decide whether static HTML already contains the tender listing,
+    or whether the page needs a browser to render it. Site chrome (navigation,
+    header, footer) is ignored: the page needs a repeated listing region, as
+    found by listing_region.py, whose rows hold enough procurement keywords.
+    """
+    if JS_SHELL_MARKERS.search(html[:50000]) and len(html) < FETCH_STRATEGY_SETTINGS["min_html_length"] * 4:
+        return False
+
+    root = parse_html(html)
+    if root is None:
+        return False
+    for element in list(root.iter('script', 'style', 'noscript', 'template', 'nav', 'header', 'footer', 'aside')):
+        element.drop_tree()
+    text = ' '.join(root.text_content().split())
+    if len(text) < FETCH_STRATEGY_SETTINGS["min_text_length"]:
+        return False
+
+    for region in find_listing_regions(root):
+        rows = listing_items(region)
+        keyword_hits = len(LISTING_KEYWORDS.findall(' '.join(row.text_content() for row in rows)))
+        if (len(rows) >= FETCH_STRATEGY_SETTINGS["min_repeated_rows"]
+                and keyword_hits >= FETCH_STRATEGY_SETTINGS["min_keyword_hits"]):
+            return True
+    return False
+
+
+def fetch_html_http(url: str) -> Dict:
+    """Fetch a page with the pooled HTTP client. Returns the same shape as fetch_html_selenium."""
+    return _fetch_http(url)
+
+
+def _fetch_http(url: str, extra_headers: Dict = None):
+    headers = {
+        "User-Agent": random.choice(USER_AGENTS),
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+    headers.update(extra_headers or {})
+    response = get_http_session().get(url, headers=headers, timeout=TIMEOUT_SETTINGS["page_load"])
+    if response.status_code == 304:
+        return {'html': None, 'base_url': url, 'procurement_links': [], 'not_modified': True}
+    response.raise_for_status()
+    if 'charset' not in response.headers.get('Content-Type', '').lower():
+        response.encoding = response.apparent_encoding
+    html = response.text
+    base_url = response.url
+
+    return {
+        'html': html,
+        'base_url': base_url,
+        'procurement_links': find_procurement_links(BeautifulSoup(html, 'html.parser'), base_url),
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+
+_strategies = SiteStore(FETCH_STRATEGY_SETTINGS["cache_file"])
+
+
+def get_strategy(url: str):
+    """Return the remembered fetch strategy ('http' or 'selenium') for the URL's domain, if any."""
+    entry = _strategies.get(url)
+    if not entry:
+        return None
+    # Periodically re-probe sites that needed a browser, in case they changed
+    max_age = FETCH_STRATEGY_SETTINGS["reprobe_after_days"] * 86400
+    if entry["strategy"] == "selenium" and time.time() - entry.get("updated_at", 0) > max_age:
+        return None
+    return entry["strategy"]
+
+
+def remember_strategy(url: str, strategy: str):
+    """Persist the winning fetch strategy for the URL's domain."""
+    _strategies.set(url, strategy=strategy)
+
+
+def fetch_with_strategy(url: str, selenium_fetch: Callable[[str], Dict], headers: Dict = None) -> Dict:
+    """
+    Try the plain HTTP fast path first and fall back to `selenium_fetch` when the
+    listing is not present in the static HTML. The strategy that worked is
+    remembered per domain so later runs go straight to it.
+
+    `headers` (e.g. conditional request validators) are sent on the HTTP path;
+    a 304 response is returned as a result with 'not_modified' set.
+    """
+    strategy = get_strategy(url)
+    if strategy == "selenium":
+        return selenium_fetch(url)
+
+    try:
+        result = _fetch_http(url, headers)
+        if result.get('not_modified'):
+            return result
+        if has_listing_content(result['html']):
+            if strategy != "http":
+                remember_strategy(url, "http")
+            return result
+        logger.info(f"Static HTML for {url} has no listing content, falling back to Selenium")
+    except requests.RequestException as e:
+        logger.info(f"HTTP fetch failed for {url} ({e}), falling back to Selenium")
+
+    result = selenium_fetch(url)
+    remember_strategy(url, "selenium")
+    return result
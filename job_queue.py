@@ -0,0 +1,407 @@
+# job_queue.py
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import closing
+from typing import Dict, List, Optional
+
+from assets import JOB_QUEUE_SETTINGS, WEBSITE_URLS, PREDEFINED_TAGS, UNIVERSAL_LABELS
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+JOB_COLUMNS = [
+    "id", "sweep_id", "website_name", "url", "fields", "model", "status", "attempts", "max_attempts",
+    "available_at", "lease_owner", "lease_expires_at", "last_error", "result_path", "created_at", "updated_at",
+]
+
+
+class JobQueue(ABC):
+    """
+    Durable queue of per-site scraping jobs.
+
+    Jobs move from 'pending' to 'leased' when a worker takes them, then to
+    'done', back to 'pending' (retry with backoff) or to 'dead' once
+    `max_attempts` is exhausted. A lease that is not completed or renewed
+    before it expires is handed to another worker.
+
+    Subclasses provide the connection and placeholder style; SQL is written
+    with '?' placeholders.
+    """
+
+    placeholder = '?'
+
+    def __init__(self, table_name: str = None):
+        self.table_name = table_name or JOB_QUEUE_SETTINGS["table"]
+
+    @abstractmethod
+    def _connect(self):
+        pass
+
+    def _sql(self, query: str) -> str:
+        return query.replace('?', self.placeholder)
+
+    def _row_to_job(self, row) -> Dict:
+        job = dict(zip(JOB_COLUMNS, row))
+        job["fields"] = json.loads(job["fields"])
+        return job
+
+    @abstractmethod
+    def create_table(self):
+        pass
+
+    def enqueue(self, sweep_id: str, website_name: str, url: str, fields: List[str], model: str,
+                max_attempts: int = None) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"""
+            INSERT INTO {self.table_name}
+            (sweep_id, website_name, url, fields, model, status, attempts, max_attempts, available_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, 'pending', 0, ?, ?, ?, ?)
+            """), (sweep_id, website_name, url, json.dumps(fields), model,
+                   max_attempts or JOB_QUEUE_SETTINGS["max_attempts"], now, now, now))
+            conn.commit()
+
+    @abstractmethod
+    def lease(self, worker_id: str, lease_seconds: int = None) -> Optional[Dict]:
+        pass
+
+    def renew(self, job_id: int, worker_id: str, lease_seconds: int = None) -> bool:
+        """Extend a lease held by `worker_id`. Returns False if the lease was lost."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"""
+            UPDATE {self.table_name} SET lease_expires_at = ?, updated_at = ?
+            WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """), (now + (lease_seconds or JOB_QUEUE_SETTINGS["lease_seconds"]), now, job_id, worker_id))
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: int, worker_id: str, result_path: str):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"""
+            UPDATE {self.table_name}
+            SET status = 'done', result_path = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+            """), (result_path, now, job_id, worker_id))
+            conn.commit()
+
+    def fail(self, job: Dict, worker_id: str, error: str):
+        """Schedule a retry with exponential backoff, or dead-letter the job when out of attempts."""
+        now = time.time()
+        if job["attempts"] >= job["max_attempts"]:
+            status, available_at = 'dead', now
+        else:
+            status = 'pending'
+            available_at = now + JOB_QUEUE_SETTINGS["retry_backoff_seconds"] * 2 ** (job["attempts"] - 1)
+        with closing(self._connect()) as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"""
+            UPDATE {self.table_name}
+            SET status = ?, available_at = ?, last_error = ?, lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+            """), (status, available_at, error[:2000], now, job["id"], worker_id))
+            conn.commit()
+        return status
+
+    def reap_expired(self):
+        """Dead-letter jobs whose lease expired on their final attempt (e.g. the worker crashed)."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(f"""
+            UPDATE {self.table_name}
+            SET status = 'dead', last_error = COALESCE(last_error, 'Lease expired on final attempt'),
+                lease_owner = NULL, lease_expires_at = NULL, updated_at = ?
+            WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= max_attempts
+            """), (now, now))
+            conn.commit()
+
+    def stats(self, sweep_id: str = None) -> Dict[str, int]:
+        query = f"SELECT status, COUNT(*) FROM {self.table_name}"
+        params = ()
+        if sweep_id:
+            query += " WHERE sweep_id = ?"
+            params = (sweep_id,)
+        query += " GROUP BY status"
+        with closing(self._connect()) as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._sql(query), params)
+            return {status: count for status, count in cursor.fetchall()}
+
+    def _lease_condition(self) -> str:
+        return ("((status = 'pending' AND available_at <= ?) "
+                "OR (status = 'leased' AND lease_expires_at < ?)) AND attempts < max_attempts")
+
+
+class SQLiteJobQueue(JobQueue):
+    """Local stand-in for the Postgres queue, for single-machine runs."""
+
+    def __init__(self, path: str = None, table_name: str = None):
+        super().__init__(table_name)
+        self.path = path or JOB_QUEUE_SETTINGS["sqlite_path"]
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+    def _connect(self):
+        # Autocommit mode; lease() opens its own explicit transaction
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def create_table(self):
+        with closing(self._connect()) as conn:
+            conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table_name} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sweep_id TEXT NOT NULL,
+                website_name TEXT,
+                url TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                model TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                last_error TEXT,
+                result_path TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table_name}_status_idx ON {self.table_name} (status, available_at)")
+            conn.commit()
+
+    def lease(self, worker_id: str, lease_seconds: int = None) -> Optional[Dict]:
+        self.reap_expired()
+        now = time.time()
+        with closing(self._connect()) as conn:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot pick the same row
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                f"SELECT id FROM {self.table_name} WHERE {self._lease_condition()} ORDER BY id LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            conn.execute(f"""
+            UPDATE {self.table_name}
+            SET status = 'leased', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ?
+            WHERE id = ?
+            """, (worker_id, now + (lease_seconds or JOB_QUEUE_SETTINGS["lease_seconds"]), now, row[0]))
+            job = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM {self.table_name} WHERE id = ?", (row[0],)).fetchone()
+            conn.commit()
+        return self._row_to_job(job)
+
+
+class PostgresJobQueue(JobQueue):
+    """Queue shared by workers on several machines, using SELECT ... FOR UPDATE SKIP LOCKED."""
+
+    placeholder = '%s'
+
+    def _connect(self):
+        from database_push import get_db_connection
+        return get_db_connection()
+
+    def create_table(self):
+        with closing(self._connect()) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
+                    id SERIAL PRIMARY KEY,
+                    sweep_id TEXT NOT NULL,
+                    website_name TEXT,
+                    url TEXT NOT NULL,
+                    fields TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at DOUBLE PRECISION NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires_at DOUBLE PRECISION,
+                    last_error TEXT,
+                    result_path TEXT,
+                    created_at DOUBLE PRECISION NOT NULL,
+                    updated_at DOUBLE PRECISION NOT NULL
+                );
+                """)
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {self.table_name}_status_idx ON {self.table_name} (status, available_at)")
+            conn.commit()
+
+    def lease(self, worker_id: str, lease_seconds: int = None) -> Optional[Dict]:
+        self.reap_expired()
+        now = time.time()
+        with closing(self._connect()) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(self._sql(f"""
+                UPDATE {self.table_name}
+                SET status = 'leased', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = (
+                    SELECT id FROM {self.table_name}
+                    WHERE {self._lease_condition()}
+                    ORDER BY id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING {', '.join(JOB_COLUMNS)}
+                """), (worker_id, now + (lease_seconds or JOB_QUEUE_SETTINGS["lease_seconds"]), now, now, now))
+                row = cursor.fetchone()
+            conn.commit()
+        return self._row_to_job(row) if row else None
+
+
+def get_job_queue(backend: str = None) -> JobQueue:
+    """Return the configured queue backend ('sqlite' or 'postgres') with its table created."""
+    backend = backend or JOB_QUEUE_SETTINGS["backend"]
+    if backend == 'postgres':
+        queue = PostgresJobQueue()
+    elif backend == 'sqlite':
+        queue = SQLiteJobQueue()
+    else:
+        raise ValueError(f"Unsupported job queue backend: {backend}")
+    queue.create_table()
+    return queue
+
+
+def enqueue_sweep(queue: JobQueue, model: str, website_names: List[str] = None) -> str:
+    """
+    Expand WEBSITE_URLS and PREDEFINED_TAGS into one job per site. Returns the sweep id.
+    """
+    sweep_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    for website_name, url in WEBSITE_URLS.items():
+        if website_names and website_name not in website_names:
+            continue
+        fields = PREDEFINED_TAGS.get(url, UNIVERSAL_LABELS[:5])
+        queue.enqueue(sweep_id, website_name, url, fields, model)
+    logger.info(f"Enqueued sweep {sweep_id}: {queue.stats(sweep_id)}")
+    return sweep_id
+
+
+def process_job(job: Dict) -> str:
+    """Run fetch -> markdown -> format_data -> push_json_to_db for one job. Returns the result path."""
+    from scraper import fetch_page_markdown, scrape_url
+    from database_push import push_json_to_db
+
+    output_folder = os.path.join('output', 'sweeps', job["sweep_id"], f"job_{job['id']}")
+    page = fetch_page_markdown(job["url"])
+    context = {'url': job["url"], 'procurement_links': page['procurement_links']}
+    _, _, _, formatted_data = scrape_url(context, job["fields"], job["model"], output_folder, 1, page['markdown'],
+                                         html=page.get('html'), base_url=page.get('base_url'))
+    if formatted_data is None:
+        raise RuntimeError("format_data returned no data")
+
+    # Same layout as the Streamlit app: a JSON list with one entry per scraped URL
+    json_file_path = os.path.join(output_folder, 'scraped_data.json')
+    with open(json_file_path, 'w', encoding='utf-8') as f:
+        json.dump([formatted_data], f, ensure_ascii=False, indent=4)
+    push_json_to_db(json_file_path, table_name='scraped_data', website_name=job["website_name"], website_url=job["url"])
+    return json_file_path
+
+
+def run_worker(backend: str = None, worker_id: str = None, stop_when_empty: bool = False, host_workers: int = 1):
+    """
+    Lease and process jobs until stopped, renewing the lease while a job runs.
+    `host_workers` is the number of workers on this machine, which split the
+    cores between their conversion pools.
+    """
+    from cpu_stage import share_cpu_with
+
+    # Spawned worker processes do not run the __main__ block, so they set up logging here
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    share_cpu_with(host_workers)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = get_job_queue(backend)
+    lease_seconds = JOB_QUEUE_SETTINGS["lease_seconds"]
+    logger.info(f"Worker {worker_id} started")
+
+    while True:
+        job = queue.lease(worker_id, lease_seconds)
+        if job is None:
+            if stop_when_empty:
+                break
+            time.sleep(JOB_QUEUE_SETTINGS["poll_interval"])
+            continue
+
+        logger.info(f"Worker {worker_id} processing job {job['id']} ({job['url']}), attempt {job['attempts']}")
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(lease_seconds / 3):
+                if not queue.renew(job["id"], worker_id, lease_seconds):
+                    logger.warning(f"Worker {worker_id} lost the lease on job {job['id']}")
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            result_path = process_job(job)
+            queue.complete(job["id"], worker_id, result_path)
+            logger.info(f"Job {job['id']} done")
+        except Exception as e:
+            status = queue.fail(job, worker_id, f"{type(e).__name__}: {e}")
+            logger.error(f"Job {job['id']} failed ({status}): {e}", exc_info=True)
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+    logger.info(f"Worker {worker_id} stopped")
+
+
+def start_workers(count: int = None, backend: str = None, stop_when_empty: bool = False):
+    """Start `count` worker processes on this machine and wait for them."""
+    count = count or JOB_QUEUE_SETTINGS["workers"]
+    processes = [
+        multiprocessing.Process(target=run_worker, kwargs={'backend': backend, 'stop_when_empty': stop_when_empty,
+                                                           'host_workers': count})
+        for _ in range(count)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    parser = argparse.ArgumentParser(description="Distributed scraping job queue.")
+    parser.add_argument('--backend', choices=['sqlite', 'postgres'], default=None, help='Queue backend.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sweep_parser = subparsers.add_parser('sweep', help='Enqueue one job per configured website.')
+    sweep_parser.add_argument('--model', default='gpt-4o-mini', help='Model used for extraction.')
+    sweep_parser.add_argument('--sites', nargs='*', help='Only enqueue these website names.')
+
+    work_parser = subparsers.add_parser('work', help='Run worker processes on this machine.')
+    work_parser.add_argument('--workers', type=int, default=None, help='Number of worker processes.')
+    work_parser.add_argument('--stop-when-empty', action='store_true', help='Exit once the queue is drained.')
+
+    stats_parser = subparsers.add_parser('stats', help='Show job counts by status.')
+    stats_parser.add_argument('--sweep', default=None, help='Limit to one sweep id.')
+
+    args = parser.parse_args()
+
+    if args.command == 'sweep':
+        print(enqueue_sweep(get_job_queue(args.backend), args.model, args.sites))
+    elif args.command == 'work':
+        start_workers(args.workers, args.backend, args.stop_when_empty)
+    elif args.command == 'stats':
+        print(json.dumps(get_job_queue(args.backend).stats(args.sweep), indent=4))
@@ -0,0 +1,153 @@
+# listing_region.py
+
+import re
+from collections import Counter
+from typing import List
+
+from assets import LISTING_REGION_SETTINGS
+
+# Regions inside these elements are site chrome, not listings
+CHROME_TAGS = {'nav', 'header', 'footer', 'aside', 'select', 'form', 'head'}
+
+LISTING_KEYWORDS = re.compile(
+    r'\b(tender|bid|procurement|rfp|rfq|eoi|deadline|closing|reference|ref\.? no|solicitation|'
+    r'contract|quotation|notice|submission)\b',
+    re.IGNORECASE,
+)
+PAGINATION_MARKER = re.compile(r'pag(e|ing|ination|er)\b|pagination|pager', re.IGNORECASE)
+
+
+def _signature(element) -> tuple:
+    """Structural signature used to decide whether sibling elements are repetitions of one item."""
+    classes = tuple(sorted(c for c in (element.get('class') or '').split() if not c[-1:].isdigit()))
+    return element.tag, classes
+
+
+def _in_chrome(element) -> bool:
+    for ancestor in element.iterancestors():
+        if isinstance(ancestor.tag, str) and ancestor.tag.lower() in CHROME_TAGS:
+            return True
+    return False
+
+
+def _text_length(element) -> int:
+    return len(' '.join(element.text_content().split()))
+
+
+def _link_text_length(element) -> int:
+    return sum(_text_length(link) for link in element.iter('a'))
+
+
+def _repeated_items(element) -> List:
+    """The largest group of structurally identical children of an element."""
+    children = [child for child in element if isinstance(child.tag, str)]
+    if not children:
+        return []
+    signature, _ = Counter(_signature(child) for child in children).most_common(1)[0]
+    return [child for child in children if _signature(child) == signature]
+
+
+def score_region(element) -> float:
+    """
+    Score an element as a listing container: the text held in its largest group
+    of structurally identical children, discounted for link-heavy menus and
+    boosted when it mentions procurement vocabulary. Returns 0 for non-candidates.
+    """
+    items = _repeated_items(element)
+    if len(items) < LISTING_REGION_SETTINGS["min_items"]:
+        return 0.0
+
+    text_lengths = [_text_length(item) for item in items]
+    total_text = sum(text_lengths)
+    if total_text / len(items) < LISTING_REGION_SETTINGS["min_avg_chars"]:
+        return 0.0
+
+    link_density = sum(_link_text_length(item) for item in items) / max(total_text, 1)
+    score = total_text * (1 - 0.5 * min(link_density, 1.0))
+    sample_text = ' '.join(item.text_content() for item in items[:10])
+    if LISTING_KEYWORDS.search(sample_text):
+        score *= 1.5
+    return score
+
+
+def _expand(element):
+    """Widen a table body to its table so the header row is kept."""
+    if element.tag == 'tbody' and element.getparent() is not None:
+        return element.getparent()
+    return element
+
+
+def find_listing_regions(root) -> List:
+    """
+    Return the repeated listing regions of a page in document order: the best
+    scoring container plus any others scoring at least `secondary_region_ratio`
+    of it. Returns an empty list when no region holds enough text.
+    """
+    scored = []
+    for element in root.iter():
+        if not isinstance(element.tag, str) or element.tag.lower() in CHROME_TAGS:
+            continue
+        score = score_region(element)
+        if score and not _in_chrome(element):
+            scored.append((score, element))
+    if not scored:
+        return []
+
+    scored.sort(key=lambda item: item[0], reverse=True)
+    best_score = scored[0][0]
+    if best_score < LISTING_REGION_SETTINGS["min_region_chars"]:
+        return []
+
+    regions = []
+    for score, element in scored:
+        if score < best_score * LISTING_REGION_SETTINGS["secondary_region_ratio"]:
+            break
+        element = _expand(element)
+        # Skip regions nested in, or containing, one already chosen
+        if any(element in chosen.iterancestors() or chosen in element.iterancestors() or element is chosen
+               for chosen in regions):
+            continue
+        regions.append(element)
+
+    # Content harvested by scrolling belongs to the listing as well
+    regions.extend(root.xpath('//section[@data-harvested="true"]'))
+
+    order = {element: index for index, element in enumerate(root.iter())}
+    return sorted(set(regions), key=lambda element: order.get(element, 0))
+
+
+def listing_items(region) -> List:
+    """The repeated items (rows, cards, list entries) of a region returned by find_listing_regions."""
+    if region.tag == 'table':
+        # Tables are widened to keep their header; the rows are in the largest body
+        bodies = [child for child in region if child.tag == 'tbody']
+        if bodies:
+            region = max(bodies, key=len)
+    return _repeated_items(region)
+
+
+def find_pagination_elements(root) -> List:
+    """Return elements that look like pagination controls, so page links survive region extraction."""
+    found = []
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+        marker = ' '.join(filter(None, [element.get('class'), element.get('id'), element.get('aria-label')]))
+        if marker and PAGINATION_MARKER.search(marker) and element.find('.//a') is not None:
+            if not any(ancestor in found for ancestor in element.iterancestors()):
+                found.append(element)
+    return found
+
+
+def context_header(root) -> List[str]:
+    """Page title and main heading, used to give the extracted regions some context."""
+    lines = []
+    title = root.findtext('.//title')
+    if title and title.strip():
+        lines.append(f"# {' '.join(title.split())}")
+    heading = root.find('.//h1')
+    if heading is not None:
+        text = ' '.join(heading.text_content().split())
+        if text and (not title or text not in title):
+            lines.append(f"## {text}")
+    return lines
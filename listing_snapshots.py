@@ -0,0 +1,164 @@
+# listing_snapshots.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+
+from assets import LISTING_DIFF_SETTINGS
+from chunked_extraction import merge_listings, split_units
+from page_cache import fields_key, normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(str(text).split()).casefold()
+
+
+def fingerprint(block: str) -> str:
+    return hashlib.sha1(_normalize(block).encode('utf-8')).hexdigest()
+
+
+def _connect() -> sqlite3.Connection:
+    path = LISTING_DIFF_SETTINGS["db_path"]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS listing_snapshots (
+        url_key TEXT PRIMARY KEY,
+        fields_key TEXT,
+        model TEXT,
+        blocks TEXT,
+        listings TEXT,
+        updated_at REAL,
+        sources TEXT
+    )
+    """)
+    try:
+        # Snapshots written before listings were mapped to their blocks
+        conn.execute("ALTER TABLE listing_snapshots ADD COLUMN sources TEXT")
+    except sqlite3.OperationalError:
+        pass
+    return conn
+
+
+def _load(url: str) -> Optional[Dict]:
+    with closing(_connect()) as conn, conn:
+        row = conn.execute("SELECT fields_key, model, blocks, listings, sources FROM listing_snapshots WHERE url_key = ?",
+                           (normalize_url(url),)).fetchone()
+    if row is None or row[4] is None:
+        return None
+    entries = [{'listing': listing, 'blocks': blocks} for listing, blocks in zip(json.loads(row[3]), json.loads(row[4]))]
+    return {'fields_key': row[0], 'model': row[1], 'blocks': set(json.loads(row[2])), 'entries': entries}
+
+
+def _source_blocks(listing: Dict, units: List[Tuple[str, str]]) -> Optional[List[str]]:
+    """
+    Fingerprints of the blocks a listing was extracted from: those holding the
+    most of its values (its URL, title, reference...). None when no block holds
+    any, e.g. when the LLM translated the values.
+    """
+    if not isinstance(listing, dict):
+        return None
+    min_chars = LISTING_DIFF_SETTINGS["min_value_chars"]
+    # Word boundaries keep "Tender 1" from matching inside "Tender 12" (and /t/1 inside /t/10)
+    patterns = [re.compile(r'(?<!\w)' + re.escape(_normalize(value)) + r'(?!\w)') for value in listing.values()
+                if isinstance(value, str) and len(value.strip()) >= min_chars]
+    scores = {}
+    for block_fingerprint, text in units:
+        score = sum(1 for pattern in patterns if pattern.search(text))
+        if score:
+            scores[block_fingerprint] = max(score, scores.get(block_fingerprint, 0))
+    if not scores:
+        return None
+    best = max(scores.values())
+    return sorted(block_fingerprint for block_fingerprint, score in scores.items() if score == best)
+
+
+def save_snapshot(url: str, markdown: str, fields: List[str], model: str, formatted_data: Dict):
+    """
+    Remember the block fingerprints of a page, the complete listings extracted
+    from it and, per listing, the blocks it came from.
+    """
+    units = [(fingerprint(unit), _normalize(unit)) for _, unit, _ in split_units(markdown)]
+    blocks = sorted({block_fingerprint for block_fingerprint, _ in units})
+    listings = (formatted_data or {}).get('listings', [])
+    sources = [_source_blocks(listing, units) for listing in listings]
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO listing_snapshots (url_key, fields_key, model, blocks, listings, updated_at, sources)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (normalize_url(url), fields_key(fields), model, json.dumps(blocks),
+             json.dumps(listings, ensure_ascii=False), time.time(), json.dumps(sources)),
+        )
+
+
+def diff_blocks(url: str, markdown: str, fields: List[str], model: str) -> Optional[Tuple[str, List[Dict]]]:
+    """
+    Compare a page's markdown blocks (table rows, list items, paragraphs) with
+    the last snapshot. Returns the markdown of the new or changed blocks (table
+    rows keep their header) and the previous listings with their source blocks,
+    or None when the whole page should be extracted: no usable snapshot, other
+    fields or model, so many new blocks that the layout has probably changed,
+    or blocks removed while some previous listings have no known source block.
+    """
+    snapshot = _load(url)
+    if (snapshot is None or not snapshot['entries'] or snapshot['fields_key'] != fields_key(fields)
+            or snapshot['model'] != model):
+        return None
+
+    units = split_units(markdown)
+    current = {fingerprint(unit) for _, unit, _ in units}
+    pieces, last_header, new_count = [], None, 0
+    for _, unit, header in units:
+        if fingerprint(unit) in snapshot['blocks']:
+            continue
+        new_count += 1
+        if header and header != last_header:
+            pieces.append(header + '\n' + unit)
+            last_header = header
+        elif header:
+            pieces[-1] += '\n' + unit
+        else:
+            pieces.append(unit)
+            last_header = None
+
+    if new_count > len(units) * LISTING_DIFF_SETTINGS["max_new_ratio"]:
+        logger.info(f"{new_count} of {len(units)} blocks of {url} changed, extracting the whole page")
+        return None
+    # A listing without a known source block cannot be told apart from one whose block was removed
+    if snapshot['blocks'] - current and any(entry['blocks'] is None for entry in snapshot['entries']):
+        logger.info(f"Blocks removed from {url} and some previous listings are unmapped, extracting the whole page")
+        return None
+    return '\n\n'.join(pieces), snapshot['entries']
+
+
+def _identity(listing: Dict, fields: List[str]) -> Optional[str]:
+    """Key telling which previous listing a newly extracted one replaces: its URL, else its first field."""
+    if not isinstance(listing, dict):
+        return None
+    for field in ('direct_url', fields[0] if fields else None):
+        if field and listing.get(field):
+            return _normalize(listing[field])
+    return None
+
+
+def merge_with_previous(previous: List[Dict], new_listings: List[Dict], markdown: str, fields: List[str]) -> Dict:
+    """
+    Combine listings extracted from the changed blocks with the previous ones
+    (entries returned by diff_blocks). Previous listings replaced by a new one
+    (same URL or first field) or whose source blocks are all gone are dropped.
+    """
+    replaced = {_identity(listing, fields) for listing in new_listings} - {None}
+    current = {fingerprint(unit) for _, unit, _ in split_units(markdown)}
+    kept = [entry['listing'] for entry in previous
+            if _identity(entry['listing'], fields) not in replaced
+            and (entry['blocks'] is None or current.intersection(entry['blocks']))]
+    logger.info(f"Merged {len(new_listings)} new listings with {len(kept)} of {len(previous)} previous ones")
+    return merge_listings([{"listings": new_listings}, {"listings": kept}])
@@ -0,0 +1,102 @@
+# llm_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Dict, Optional, Tuple
+
+from assets import LLM_CACHE_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def cache_key(markdown: str, schema: Dict, model: str, system_text: str) -> str:
+    """Hash everything that determines an extraction: page content, listing schema, model and prompt text."""
+    payload = json.dumps([' '.join(markdown.split()), schema, model, system_text], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _connect() -> sqlite3.Connection:
+    path = LLM_CACHE_SETTINGS["db_path"]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        model TEXT,
+        result TEXT,
+        input_tokens INTEGER,
+        output_tokens INTEGER,
+        size INTEGER,
+        created_at REAL,
+        last_used_at REAL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used_at)")
+    return conn
+
+
+def _count(outcome: str):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def count_hit():
+    """Record an LLM call avoided by another cache (e.g. the page cache reusing a previous result)."""
+    _count('hits')
+
+
+def get(key: str) -> Optional[Tuple[Dict, Dict]]:
+    """Return the stored (listings dict, token counts) for a key and mark it as recently used, or None."""
+    with closing(_connect()) as conn, conn:
+        row = conn.execute("SELECT result, input_tokens, output_tokens FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _count('misses')
+            return None
+        conn.execute("UPDATE llm_cache SET last_used_at = ? WHERE key = ?", (time.time(), key))
+    _count('hits')
+    return json.loads(row[0]), {"input_tokens": row[1], "output_tokens": row[2]}
+
+
+def put(key: str, model: str, result: Dict, token_counts: Dict):
+    """Store an extraction result, then evict least recently used entries beyond `max_bytes`."""
+    serialized = json.dumps(result, ensure_ascii=False)
+    now = time.time()
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, model, serialized, (token_counts or {}).get("input_tokens", 0),
+             (token_counts or {}).get("output_tokens", 0), len(serialized), now, now),
+        )
+        excess = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0] - LLM_CACHE_SETTINGS["max_bytes"]
+        if excess > 0:
+            evict = []
+            for old_key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used_at"):
+                if excess <= 0:
+                    break
+                evict.append((old_key,))
+                excess -= size
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", evict)
+            logger.info(f"Evicted {len(evict)} least recently used LLM cache entries")
+
+
+def cache_stats() -> Dict:
+    """Hits and misses since the last reset, with the hit rate (None before any lookup)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else None
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
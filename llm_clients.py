@@ -0,0 +1,91 @@
+# llm_clients.py
+
+import json
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+import google.generativeai as genai
+from groq import Groq
+
+from assets import LLM_CLIENT_SETTINGS, LOCAL_LLM_SETTINGS
+
+
+def _http_client(timeout: float = None) -> httpx.Client:
+    """HTTP client with a bounded keep-alive pool, so connections and TLS sessions are reused across calls."""
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=LLM_CLIENT_SETTINGS["pool_size"],
+            max_keepalive_connections=LLM_CLIENT_SETTINGS["pool_size"],
+        ),
+        timeout=httpx.Timeout(timeout or LLM_CLIENT_SETTINGS["timeout"], connect=LLM_CLIENT_SETTINGS["connect_timeout"]),
+        follow_redirects=True,
+    )
+
+
+class ProviderRegistry:
+    """
+    Owns one long-lived client per provider (and one Gemini model object per
+    model and generation config) for the whole process. The clients are
+    thread-safe, so scraping threads share them instead of building a new
+    client, connection pool and TLS session for every page.
+    """
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._gemini_configured = False
+
+    def _get(self, key, factory):
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = factory()
+        return client
+
+    def openai(self) -> OpenAI:
+        return self._get('openai', lambda: OpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            max_retries=LLM_CLIENT_SETTINGS["max_retries"],
+            http_client=_http_client(),
+        ))
+
+    def groq(self) -> Groq:
+        return self._get('groq', lambda: Groq(
+            api_key=os.environ.get("GROQ_API_KEY"),
+            max_retries=LLM_CLIENT_SETTINGS["max_retries"],
+            http_client=_http_client(),
+        ))
+
+    def local(self) -> OpenAI:
+        """Client for the OpenAI-compatible local server (LM Studio, llama.cpp server, vLLM)."""
+        return self._get('local', lambda: OpenAI(
+            base_url=os.getenv('LOCAL_LLM_BASE_URL', LOCAL_LLM_SETTINGS["base_url"]),
+            api_key=os.getenv('LOCAL_LLM_API_KEY', LOCAL_LLM_SETTINGS["api_key"]),
+            max_retries=LLM_CLIENT_SETTINGS["max_retries"],
+            http_client=_http_client(LOCAL_LLM_SETTINGS["timeout"]),
+        ))
+
+    def gemini(self, model_name: str, generation_config: dict = None, system_instruction: str = None) -> genai.GenerativeModel:
+        def create():
+            if not self._gemini_configured:
+                genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+                self._gemini_configured = True
+            return genai.GenerativeModel(model_name, generation_config=generation_config, system_instruction=system_instruction)
+
+        # Response schemas are classes, so fall back to their names for the cache key
+        config_key = json.dumps(generation_config or {}, sort_keys=True, default=lambda value: getattr(value, '__name__', str(value)))
+        return self._get(('gemini', model_name, config_key, system_instruction), create)
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                if hasattr(client, 'close'):
+                    client.close()
+            self._clients.clear()
+
+
+providers = ProviderRegistry()
@@ -0,0 +1,162 @@
+# llm_dispatcher.py
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from assets import LLM_CLIENT_SETTINGS, RATE_LIMITS, LLM_DISPATCH_SETTINGS
+from cpu_stage import count_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; waiters are served in arrival order."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.available = per_minute
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.capacity / 60)
+        self.updated_at = now
+
+    async def acquire(self, amount: float):
+        # A request larger than the whole budget waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) * 60 / self.capacity)
+                self._refill()
+            self.available -= amount
+
+    def penalize(self):
+        """Empty the bucket after the provider reported a rate limit our budget did not predict."""
+        self._refill()
+        self.available = 0
+
+
+def _status_code(error: Exception):
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        # Google API errors carry the HTTP status in `code`
+        status = getattr(error, 'code', None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying."""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(error).__name__
+    return any(marker in name for marker in ('Timeout', 'Connection', 'RateLimit', 'ServiceUnavailable', 'ResourceExhausted'))
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, 'response', None)
+    value = getattr(response, 'headers', {}).get('retry-after') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMDispatcher:
+    """
+    Runs provider calls through an asyncio loop on a background thread. Each
+    call first reserves one request and its pre-counted tokens from the
+    model's RPM and TPM buckets (RATE_LIMITS), then runs on a worker thread,
+    and is retried with jittered exponential backoff on 429s, 5xx responses
+    and connection errors.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._executor = None
+        self._buckets = {}
+        self._waiting = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._executor = ThreadPoolExecutor(max_workers=LLM_CLIENT_SETTINGS["pool_size"], thread_name_prefix='llm')
+                threading.Thread(target=self._loop.run_forever, name='llm-dispatcher', daemon=True).start()
+            return self._loop
+
+    def _bucket_pair(self, model: str):
+        if model not in self._buckets:
+            limits = RATE_LIMITS.get(model, RATE_LIMITS["default"])
+            self._buckets[model] = (TokenBucket(limits["rpm"]), TokenBucket(limits["tpm"]))
+        return self._buckets[model]
+
+    def _track(self, counter: Dict, model: str, delta: int):
+        with self._lock:
+            counter[model] = counter.get(model, 0) + delta
+
+    def queue_depth(self) -> Dict[str, Dict[str, int]]:
+        """Calls waiting for rate-limit capacity and calls in flight, per model."""
+        with self._lock:
+            models = set(self._waiting) | set(self._in_flight)
+            return {model: {'waiting': self._waiting.get(model, 0), 'in_flight': self._in_flight.get(model, 0)}
+                    for model in models}
+
+    async def acall(self, model: str, tokens: int, request: Callable[[], Any]) -> Any:
+        """Reserve capacity for `tokens` and run the blocking `request`, retrying transient failures."""
+        requests_bucket, tokens_bucket = self._bucket_pair(model)
+        attempts = LLM_DISPATCH_SETTINGS["max_attempts"]
+        for attempt in range(1, attempts + 1):
+            self._track(self._waiting, model, 1)
+            started = time.monotonic()
+            try:
+                await requests_bucket.acquire(1)
+                await tokens_bucket.acquire(tokens)
+                waited = time.monotonic() - started
+                if waited >= LLM_DISPATCH_SETTINGS["log_wait_seconds"]:
+                    depth = self.queue_depth().get(model, {})
+                    logger.info(f"{model} call waited {waited:.1f}s for rate-limit capacity "
+                                f"({depth.get('waiting', 0)} waiting, {depth.get('in_flight', 0)} in flight)")
+            finally:
+                self._track(self._waiting, model, -1)
+
+            self._track(self._in_flight, model, 1)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, request)
+            except Exception as e:
+                if attempt == attempts or not is_retryable(e):
+                    raise
+                if _status_code(e) == 429:
+                    requests_bucket.penalize()
+                    tokens_bucket.penalize()
+                delay = _retry_after(e) or min(LLM_DISPATCH_SETTINGS["max_delay"], LLM_DISPATCH_SETTINGS["base_delay"] * 2 ** (attempt - 1))
+                delay = random.uniform(delay / 2, delay)
+                logger.warning(f"{model} call failed ({type(e).__name__}: {e}), retry {attempt}/{attempts - 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            finally:
+                self._track(self._in_flight, model, -1)
+
+    def call(self, model: str, prompt: str, request: Callable[[], Any]) -> Any:
+        """
+        Blocking entry point for the scraping threads. `prompt` is the text sent
+        to the model; its tiktoken count plus an allowance for the answer is
+        reserved from the TPM budget.
+        """
+        tokens = count_tokens(prompt, model) + LLM_DISPATCH_SETTINGS["output_token_allowance"]
+        future = asyncio.run_coroutine_threadsafe(self.acall(model, tokens, request), self._ensure_loop())
+        return future.result()
+
+
+dispatcher = LLMDispatcher()
@@ -0,0 +1,72 @@
+# local_llm.py
+
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Type
+
+from pydantic import BaseModel
+
+from assets import LOCAL_LLM_SETTINGS, LLAMA_MODEL_FULLNAME
+from llm_clients import providers
+from llm_dispatcher import dispatcher
+
+logger = logging.getLogger(__name__)
+
+# Name of the local backend in PRICING, RATE_LIMITS and the model selection
+LOCAL_MODEL = "Llama3.1 8B (local)"
+
+# One slot per request the server decodes in parallel; more would only queue up server-side
+_slots = threading.BoundedSemaphore(LOCAL_LLM_SETTINGS["parallel_requests"])
+
+
+def json_schema_format(container: Type[BaseModel]) -> Dict:
+    """`response_format` asking an OpenAI-compatible server for JSON matching a listings container model."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "listings", "schema": container.model_json_schema(), "strict": False},
+    }
+
+
+def chat(messages: List[Dict], response_format: Dict = None):
+    """Run one chat completion on the local server, waiting for a free parallel slot."""
+    extra = {'response_format': response_format} if response_format and LOCAL_LLM_SETTINGS["json_schema"] else {}
+    client = providers.local()
+
+    def request():
+        with _slots:
+            return client.chat.completions.create(model=LLAMA_MODEL_FULLNAME, messages=messages, temperature=0, **extra)
+
+    prompt = ''.join(message['content'] for message in messages)
+    return dispatcher.call(LOCAL_MODEL, prompt, request)
+
+
+def parse_listings(content: str) -> Dict:
+    """Parse the model's JSON answer into the {"listings": [...]} shape format_data returns."""
+    parsed = json.loads(content)
+    if isinstance(parsed, list):
+        return {"listings": parsed}
+    if isinstance(parsed, dict):
+        return parsed if "listings" in parsed else {"listings": [parsed]}
+    raise ValueError(f"Unexpected response type: {type(parsed)}")
+
+
+def run_requests(lines: List[Dict]) -> Dict[str, Dict]:
+    """
+    Run Batch API request lines (see batch_extraction.build_requests) against
+    the local server, `parallel_requests` at a time so it can batch them on
+    the GPU/CPU. Returns entries shaped like Batch API output lines, by custom_id.
+    """
+    def run(line):
+        body = line['body']
+        try:
+            completion = chat(body['messages'], body.get('response_format'))
+            return {'custom_id': line['custom_id'], 'response': {'status_code': 200, 'body': completion.model_dump()}}
+        except Exception as e:
+            logger.error(f"Local request {line['custom_id']} failed: {e}")
+            return {'custom_id': line['custom_id'], 'response': None, 'error': {'message': str(e)}}
+
+    with ThreadPoolExecutor(max_workers=LOCAL_LLM_SETTINGS["parallel_requests"], thread_name_prefix='local-llm') as pool:
+        entries = list(pool.map(run, lines))
+    return {entry['custom_id']: entry for entry in entries}
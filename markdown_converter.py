@@ -0,0 +1,482 @@
+# markdown_converter.py
+
+import re
+import time
+from typing import IO, Iterable, Iterator, List, Optional, Union
+from urllib.parse import urljoin
+
+import html2text
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from assets import LISTING_REGION_SETTINGS, MARKDOWN_SETTINGS
+from listing_region import context_header, find_listing_regions, find_pagination_elements
+
+# Elements dropped together with their content
+SKIP_TAGS = {'head', 'script', 'style', 'noscript', 'template', 'svg', 'iframe', 'object', 'canvas', 'header', 'footer'}
+
+# Block elements followed by a blank line; other block elements only start a new line
+PARAGRAPH_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'table', 'blockquote', 'pre', 'dl', 'hr'}
+LINE_TAGS = {
+    'div', 'section', 'article', 'main', 'aside', 'nav', 'form', 'fieldset', 'address', 'figure',
+    'figcaption', 'dt', 'dd', 'tr', 'li', 'ul', 'ol', 'details', 'summary', 'caption', 'center',
+}
+
+WHITESPACE = re.compile(r'\s+')
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>', re.IGNORECASE)
+
+
+class _MarkdownWriter:
+    """Accumulates markdown output, collapsing whitespace and block separators."""
+
+    def __init__(self):
+        self.parts = []
+        self.pending_newlines = 0
+        self.at_line_start = True
+        self.prefix = ''
+        self.written = False
+        self.length = 0
+
+    def block(self, newlines: int):
+        self.pending_newlines = max(self.pending_newlines, newlines)
+
+    def write(self, text: str, preformatted: bool = False):
+        if not preformatted:
+            text = WHITESPACE.sub(' ', text)
+            if self.at_line_start or self.pending_newlines or (self.parts and self.parts[-1].endswith(' ')):
+                text = text.lstrip()
+        if not text:
+            return
+        if self.pending_newlines and self.written:
+            self._append('\n' * self.pending_newlines)
+            self.at_line_start = True
+        self.pending_newlines = 0
+        if self.at_line_start and self.prefix:
+            self._append(self.prefix)
+        self._append(text)
+        self.at_line_start = text.endswith('\n')
+        self.written = True
+
+    def _append(self, text: str):
+        self.parts.append(text)
+        self.length += len(text)
+
+    def trim_trailing_space(self):
+        while self.parts and not self.pending_newlines:
+            trimmed = self.parts[-1].rstrip(' ')
+            self.length -= len(self.parts[-1]) - len(trimmed)
+            if trimmed:
+                self.parts[-1] = trimmed
+                break
+            self.parts.pop()
+
+    def markup(self, text: str):
+        """Write markdown syntax, which is never whitespace-collapsed."""
+        self.write(text, preformatted=True)
+
+    def buffered(self) -> int:
+        return sum(len(part) for part in self.parts)
+
+    def getvalue(self) -> str:
+        markdown = ''.join(self.parts)
+        markdown = re.sub(r'[ \t]+\n', '\n', markdown)
+        markdown = re.sub(r'\n{3,}', '\n\n', markdown)
+        # Leading spaces are kept: they are the indent of a nested first list item
+        return markdown.lstrip('\n').rstrip() + '\n'
+
+    def drain(self) -> str:
+        """Return and forget the markdown buffered so far, keeping the state needed to continue."""
+        markdown = ''.join(self.parts)
+        self.parts = []
+        markdown = re.sub(r'[ \t]+\n', '\n', markdown)
+        markdown = re.sub(r'\n{3,}', '\n\n', markdown)
+        return markdown.rstrip(' \t')
+
+
+class _Converter:
+    """Walks an lxml tree once, absolutizing links and emitting markdown as it goes."""
+
+    def __init__(self, base_url: Optional[str]):
+        self.base_url = base_url
+        self.out = _MarkdownWriter()
+        self.list_stack = []
+        self.table_stack = []
+        self.pre_depth = 0
+
+    def convert(self, element) -> str:
+        self._visit(element)
+        return self.out.getvalue()
+
+    def _text(self, text: Optional[str]):
+        if text:
+            self.out.write(text, preformatted=self.pre_depth > 0)
+
+    def _visit(self, element):
+        tag = element.tag if isinstance(element.tag, str) else None
+        if tag is None or tag.lower() in SKIP_TAGS:
+            return
+        tag = tag.lower()
+
+        closing = self._open(tag, element)
+        self._text(element.text)
+        for child in element:
+            self._visit(child)
+            self._text(child.tail)
+        self._close(tag, closing)
+
+    def _open(self, tag: str, element):
+        """Emit an element's opening markup and return what has to run when it closes."""
+        handler = getattr(self, f'_start_{tag}', None)
+        closing = handler(element) if handler else None
+        if handler is None:
+            if tag in PARAGRAPH_TAGS:
+                self.out.block(2)
+            elif tag in LINE_TAGS:
+                self.out.block(1)
+        return closing
+
+    def _close(self, tag: str, closing):
+        if closing:
+            closing()
+        if tag in PARAGRAPH_TAGS:
+            self.out.block(2)
+        elif tag in LINE_TAGS:
+            self.out.block(1)
+
+    # Element handlers return an optional callable run after the element's children
+
+    def _heading(self, element, level: int):
+        self.out.block(2)
+        self.out.markup('#' * level + ' ')
+
+    def _start_h1(self, element): self._heading(element, 1)
+    def _start_h2(self, element): self._heading(element, 2)
+    def _start_h3(self, element): self._heading(element, 3)
+    def _start_h4(self, element): self._heading(element, 4)
+    def _start_h5(self, element): self._heading(element, 5)
+    def _start_h6(self, element): self._heading(element, 6)
+
+    def _start_br(self, element):
+        self.out.block(1)
+
+    def _start_hr(self, element):
+        self.out.block(2)
+        self.out.markup('* * *')
+        self.out.block(2)
+
+    def _start_a(self, element):
+        href = (element.get('href') or '').strip()
+        if not href or href.startswith('#') or href.lower().startswith(('javascript:', 'mailto:')):
+            return None
+        if self.base_url:
+            href = urljoin(self.base_url, href)
+        self.out.markup('[')
+        # Decided on close, so the streaming converter does not need the link's content up front
+        length = self.out.length
+
+        def close():
+            self.out.trim_trailing_space()
+            if self.out.length == length:
+                self.out.markup('link')
+            self.out.markup(f']({href})')
+        return close
+
+    def _emphasis(self, marker: str):
+        self.out.markup(marker)
+        return lambda: self.out.markup(marker)
+
+    def _start_strong(self, element): return self._emphasis('**')
+    def _start_b(self, element): return self._emphasis('**')
+    def _start_em(self, element): return self._emphasis('_')
+    def _start_i(self, element): return self._emphasis('_')
+
+    def _start_code(self, element):
+        return None if self.pre_depth else self._emphasis('`')
+
+    def _start_pre(self, element):
+        self.out.block(2)
+        self.out.markup('```\n')
+        self.pre_depth += 1
+
+        def close():
+            self.pre_depth -= 1
+            self.out.markup('\n```')
+        return close
+
+    def _start_blockquote(self, element):
+        self.out.block(2)
+        previous = self.out.prefix
+        self.out.prefix = previous + '> '
+
+        def close():
+            self.out.prefix = previous
+        return close
+
+    def _list(self, ordered: bool):
+        self.out.block(1 if self.list_stack else 2)
+        self.list_stack.append([ordered, 0])
+
+        def close():
+            self.list_stack.pop()
+            self.out.block(1 if self.list_stack else 2)
+        return close
+
+    def _start_ul(self, element): return self._list(False)
+    def _start_ol(self, element): return self._list(True)
+
+    def _start_li(self, element):
+        self.out.block(1)
+        indent = '  ' * len(self.list_stack)
+        if self.list_stack and self.list_stack[-1][0]:
+            self.list_stack[-1][1] += 1
+            self.out.markup(f"{indent}{self.list_stack[-1][1]}. ")
+        else:
+            self.out.markup(f"{indent}* ")
+
+    def _start_table(self, element):
+        self.out.block(2)
+        self.table_stack.append({'rows': 0, 'cells': 0})
+
+        def close():
+            self.table_stack.pop()
+        return close
+
+    def _start_tr(self, element):
+        self.out.block(1)
+        if not self.table_stack:
+            return None
+        table = self.table_stack[-1]
+        table['cells'] = 0
+
+        def close():
+            table['rows'] += 1
+            # Emit the header separator after the first row, as html2text does
+            if table['rows'] == 1 and table['cells']:
+                self.out.block(1)
+                self.out.markup('|'.join(['---'] * table['cells']))
+        return close
+
+    def _cell(self, element):
+        if self.table_stack:
+            table = self.table_stack[-1]
+            if table['cells']:
+                self.out.markup(' | ')
+            table['cells'] += 1
+        return None
+
+    def _start_td(self, element): return self._cell(element)
+    def _start_th(self, element): return self._cell(element)
+
+    def _start_img(self, element):
+        # Images are not useful to the LLM; keep their alt text only
+        alt = (element.get('alt') or '').strip()
+        if alt:
+            self._text(alt + ' ')
+
+
+def parse_html(html: str):
+    """Parse HTML into an lxml tree, or return None for empty documents."""
+    if isinstance(html, str):
+        html = XML_DECLARATION.sub('', html, count=1)
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+
+def html_to_markdown(html: str, base_url: Optional[str] = None, listing_only: bool = False) -> str:
+    """
+    Convert HTML to markdown in a single parse and a single traversal: header and
+    footer removal, URL absolutization and markdown emission all happen while
+    walking the lxml tree once.
+
+    With `listing_only`, only the page's repeated listing regions, its pagination
+    controls and a title header are converted; pages without a recognisable
+    listing are converted whole.
+    """
+    root = parse_html(html)
+    if root is None:
+        return ''
+    if listing_only:
+        regions = find_listing_regions(root)
+        if regions:
+            return listing_regions_to_markdown(root, regions, base_url)
+    return _Converter(base_url).convert(root)
+
+
+def listing_regions_to_markdown(root, regions: List, base_url: Optional[str] = None) -> str:
+    """Convert the given listing regions plus the page's title and pagination controls."""
+    blocks = context_header(root)
+    blocks.extend(_Converter(base_url).convert(region).strip() for region in regions)
+    for pagination in find_pagination_elements(root):
+        if not any(pagination is region or region in pagination.iterancestors() or pagination in region.iterancestors()
+                   for region in regions):
+            blocks.append(_Converter(base_url).convert(pagination).strip())
+    return '\n\n'.join(block for block in blocks if block) + '\n'
+
+
+class _StreamingConverter(_Converter):
+    """
+    Converts parser events as they arrive instead of walking a finished tree.
+    Elements are cleared once their text and tail have been written, so only
+    the chain of currently open elements stays in memory.
+    """
+
+    def __init__(self, base_url: Optional[str]):
+        super().__init__(base_url)
+        self.open_elements = []
+        self.skip_depth = 0
+        # The last event's element, whose text (after start) or tail (after end) is not complete yet
+        self.last = None
+
+    def _flush_last(self):
+        if self.last is None:
+            return
+        event, element = self.last
+        self.last = None
+        if event == 'start':
+            if not self.skip_depth:
+                self._text(element.text)
+            return
+        if not self.skip_depth:
+            self._text(element.tail)
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+    def handle(self, event: str, element):
+        self._flush_last()
+        if event == 'start':
+            tag = element.tag.lower() if isinstance(element.tag, str) else None
+            if self.skip_depth or tag is None or tag in SKIP_TAGS:
+                self.skip_depth += 1
+            else:
+                self.open_elements.append((tag, self._open(tag, element)))
+        elif event == 'end':
+            if self.skip_depth:
+                self.skip_depth -= 1
+            else:
+                self._close(*self.open_elements.pop())
+        # Comments only contribute their tail
+        self.last = ('end', element) if event == 'comment' else (event, element)
+
+
+def _iter_source(source: Union[str, bytes, IO, Iterable], size: int) -> Iterator:
+    if isinstance(source, (str, bytes)):
+        source = XML_DECLARATION.sub('', source, count=1) if isinstance(source, str) else source
+        for start in range(0, len(source), size):
+            yield source[start:start + size]
+    elif hasattr(source, 'read'):
+        for data in iter(lambda: source.read(size), source.read(0)):
+            yield data
+    else:
+        yield from source
+
+
+def iter_markdown(source: Union[str, bytes, IO, Iterable], base_url: Optional[str] = None,
+                  chunk_chars: Optional[int] = None) -> Iterator[str]:
+    """
+    Convert HTML to markdown incrementally, yielding chunks of about
+    `chunk_chars` characters at block boundaries. `source` may be a string, an
+    open file or any iterable of HTML pieces (e.g. a streamed HTTP response);
+    memory use stays roughly constant whatever the page size. Chunks joined
+    together give the same markdown as `html_to_markdown` up to blank lines.
+    """
+    chunk_chars = chunk_chars or MARKDOWN_SETTINGS["stream_chunk_chars"]
+    parser = etree.HTMLPullParser(events=('start', 'end', 'comment'))
+    converter = _StreamingConverter(base_url)
+    out = converter.out
+
+    def convert_events():
+        for event, element in parser.read_events():
+            converter.handle(event, element)
+            if event == 'end' and out.pending_newlines and out.buffered() >= chunk_chars:
+                yield out.drain()
+
+    yielded = False
+    for data in _iter_source(source, MARKDOWN_SETTINGS["stream_feed_chars"]):
+        parser.feed(data)
+        for chunk in convert_events():
+            if chunk:
+                yielded = True
+                yield chunk
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        pass
+    for chunk in convert_events():
+        if chunk:
+            yielded = True
+            yield chunk
+    converter._flush_last()
+    final = out.drain().rstrip()
+    # The document ends with a newline like html_to_markdown's, even when the last chunk was already yielded
+    if final.strip():
+        yield final + '\n'
+    elif yielded:
+        yield '\n'
+
+
+def convert_html(html: str, base_url: Optional[str] = None) -> str:
+    """Convert a fetched page to markdown with the converter selected in MARKDOWN_SETTINGS."""
+    if MARKDOWN_SETTINGS["converter"] != "lxml":
+        return html_to_markdown_legacy(html, base_url)
+    # Very large pages are converted incrementally so the full lxml tree is never built. The chunks are
+    # joined here because the page cache, snapshots and chunked extraction all work on the whole markdown
+    if len(html) > MARKDOWN_SETTINGS["stream_threshold_chars"]:
+        return ''.join(iter_markdown(html, base_url))
+    # Only the listing rows/cards are kept when a listing region is found, to shrink the LLM input
+    return html_to_markdown(html, base_url, listing_only=LISTING_REGION_SETTINGS["enabled"])
+
+
+def html_to_markdown_legacy(html: str, base_url: Optional[str] = None) -> str:
+    """The previous BeautifulSoup + html2text path, kept for benchmarking and as a fallback."""
+    soup = BeautifulSoup(html, 'html.parser')
+    if base_url:
+        for tag in soup.find_all(['a', 'link'], href=True):
+            tag['href'] = urljoin(base_url, tag['href'])
+    cleaned = BeautifulSoup(str(soup), 'html.parser')
+    for element in cleaned.find_all(['header', 'footer']):
+        element.decompose()
+
+    markdown_converter = html2text.HTML2Text()
+    markdown_converter.ignore_links = False
+    markdown_converter.wrap_links = False
+    return markdown_converter.handle(str(cleaned))
+
+
+def benchmark(paths: List[str], repeat: int = 3, base_url: Optional[str] = None):
+    """Time the single-parse converter against the legacy path on saved HTML files."""
+    print(f"{'file':<40} {'size KB':>8} {'legacy s':>9} {'lxml s':>8} {'speedup':>8} {'legacy chars':>13} {'lxml chars':>11}")
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            html = f.read()
+        timings = {}
+        outputs = {}
+        for name, convert in (('legacy', html_to_markdown_legacy), ('lxml', html_to_markdown)):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                outputs[name] = convert(html, base_url)
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best
+        print(f"{path[-40:]:<40} {len(html) / 1024:>8.0f} {timings['legacy']:>9.3f} {timings['lxml']:>8.3f} "
+              f"{timings['legacy'] / max(timings['lxml'], 1e-9):>7.1f}x {len(outputs['legacy']):>13} {len(outputs['lxml']):>11}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark HTML-to-markdown conversion on saved HTML files.")
+    parser.add_argument('html_files', nargs='+', help='Paths to HTML files.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per file; the best time is reported.')
+    parser.add_argument('--base-url', default=None, help='Base URL used to absolutize links.')
+
+    args = parser.parse_args()
+
+    benchmark(args.html_files, args.repeat, args.base_url)
@@ -0,0 +1,146 @@
+# page_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+from assets import PAGE_CACHE_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|_gl|gclid|fbclid|mc_cid|mc_eid)$', re.IGNORECASE)
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL for use as a cache key: lowercase scheme and host, drop
+    default ports, tracking parameters and text-fragment anchors, sort the query.
+    Other fragments are kept because single-page apps route on them.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and not ((scheme == 'http' and parsed.port == 80) or (scheme == 'https' and parsed.port == 443)):
+        host = f"{host}:{parsed.port}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.match(k)))
+    fragment = '' if parsed.fragment.startswith(':~:') else parsed.fragment
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, query, fragment))
+
+
+def content_hash(markdown: str) -> str:
+    """Hash the cleaned markdown, ignoring whitespace-only differences."""
+    return hashlib.sha256(' '.join(markdown.split()).encode('utf-8')).hexdigest()
+
+
+def fields_key(fields: List[str]) -> str:
+    return json.dumps(sorted(fields))
+
+
+def _connect() -> sqlite3.Connection:
+    path = PAGE_CACHE_SETTINGS["db_path"]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS page_cache (
+        url_key TEXT PRIMARY KEY,
+        url TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        content_hash TEXT,
+        fields_key TEXT,
+        model TEXT,
+        raw_path TEXT,
+        result_path TEXT,
+        updated_at REAL
+    )
+    """)
+    return conn
+
+
+def get_entry(url: str) -> Optional[Dict]:
+    """Return the cache entry for a URL, or None if it has never been scraped."""
+    with closing(_connect()) as conn, conn:
+        row = conn.execute("SELECT * FROM page_cache WHERE url_key = ?", (normalize_url(url),)).fetchone()
+    return dict(row) if row else None
+
+
+def _upsert(url: str, values: Dict):
+    values = dict(values, url_key=normalize_url(url), url=url, updated_at=time.time())
+    columns = ', '.join(values)
+    placeholders = ', '.join('?' for _ in values)
+    updates = ', '.join(f"{column} = excluded.{column}" for column in values if column != 'url_key')
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            f"INSERT INTO page_cache ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT(url_key) DO UPDATE SET {updates}",
+            list(values.values()),
+        )
+
+
+def conditional_headers(entry: Optional[Dict]) -> Dict:
+    """Build If-None-Match / If-Modified-Since headers from a cache entry."""
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def record_validators(url: str, markdown: str, etag: Optional[str], last_modified: Optional[str]):
+    """
+    Store the HTTP validators returned for a URL. They are only kept when the
+    page content matches the cached markdown, so a later 304 can safely reuse it.
+    """
+    entry = get_entry(url)
+    if entry and entry['content_hash'] == content_hash(markdown) and (etag or last_modified):
+        _upsert(url, {'etag': etag, 'last_modified': last_modified})
+
+
+def load_cached_markdown(entry: Optional[Dict]) -> Optional[str]:
+    """Return the markdown saved on the last run, if the file still exists."""
+    if not entry or not entry.get('raw_path') or not os.path.exists(entry['raw_path']):
+        return None
+    with open(entry['raw_path'], 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def load_cached_result(url: str, markdown: str, fields: List[str], model: str):
+    """
+    Return the formatted data from the last run if the page content, field list
+    and model are all unchanged, otherwise None.
+    """
+    if not PAGE_CACHE_SETTINGS["enabled"]:
+        return None
+    entry = get_entry(url)
+    if (not entry or entry['content_hash'] != content_hash(markdown)
+            or entry['fields_key'] != fields_key(fields) or entry['model'] != model
+            or not entry['result_path'] or not os.path.exists(entry['result_path'])):
+        return None
+    try:
+        with open(entry['result_path'], 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable cached result {entry['result_path']}: {e}")
+        return None
+
+
+def store_result(url: str, markdown: str, fields: List[str], model: str, raw_path: str, result_path: str):
+    """Remember the content hash and result files of a successful extraction."""
+    _upsert(url, {
+        'content_hash': content_hash(markdown),
+        'fields_key': fields_key(fields),
+        'model': model,
+        'raw_path': os.path.abspath(raw_path),
+        'result_path': os.path.abspath(result_path),
+    })
@@ -0,0 +1,95 @@
+# page_readiness.py
+
+import logging
+import re
+from typing import Optional
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from assets import TIMEOUT_SETTINGS, READINESS_SETTINGS, LISTING_SELECTORS
+
+logger = logging.getLogger(__name__)
+
+# Resolves once the DOM has stopped mutating and no new network resources have
+# been recorded for `quietMs`, or after `maxMs` at the latest.
+QUIESCENCE_SCRIPT = """
+const quietMs = arguments[0], maxMs = arguments[1], pollMs = arguments[2];
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+let lastActivity = start;
+let resourceCount = performance.getEntriesByType('resource').length;
+const observer = new MutationObserver(() => { lastActivity = performance.now(); });
+observer.observe(document.documentElement || document, {childList: true, subtree: true, characterData: true});
+(function check() {
+    const now = performance.now();
+    const count = performance.getEntriesByType('resource').length;
+    if (count !== resourceCount) { resourceCount = count; lastActivity = now; }
+    if (document.readyState === 'complete' && now - lastActivity >= quietMs) {
+        observer.disconnect(); done('quiet'); return;
+    }
+    if (now - start >= maxMs) { observer.disconnect(); done('timeout'); return; }
+    setTimeout(check, pollMs);
+})();
+"""
+
+
+def apply_timeouts(driver):
+    """Apply the configured page-load and script timeouts to a WebDriver."""
+    driver.set_page_load_timeout(TIMEOUT_SETTINGS["page_load"])
+    driver.set_script_timeout(TIMEOUT_SETTINGS["script"])
+
+
+def get_listing_selector(url: str) -> Optional[str]:
+    """Return the CSS selector that marks a rendered listing for this site, if one is configured."""
+    host = re.sub(r'^www\.', '', urlparse(url).netloc.lower())
+    for site, selector in LISTING_SELECTORS.items():
+        if host == site or host.endswith('.' + site):
+            return selector
+    return None
+
+
+def wait_for_listing_selector(driver, selector: str) -> bool:
+    """Wait until the site's listing selector is present. Returns False on timeout."""
+    try:
+        WebDriverWait(driver, TIMEOUT_SETTINGS["page_load"]).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+        )
+        return True
+    except TimeoutException:
+        logger.warning(f"Listing selector '{selector}' did not appear within {TIMEOUT_SETTINGS['page_load']}s")
+        return False
+
+
+def wait_for_quiescence(driver) -> str:
+    """
+    Wait until the network and DOM have been idle for the configured quiet period.
+    Returns 'quiet', 'timeout', or 'error' if the script could not run.
+    """
+    # Leave headroom so the in-page deadline fires before Selenium's script timeout
+    max_ms = max(TIMEOUT_SETTINGS["script"] * 1000 - 500, READINESS_SETTINGS["quiet_period_ms"])
+    try:
+        return driver.execute_async_script(
+            QUIESCENCE_SCRIPT,
+            READINESS_SETTINGS["quiet_period_ms"],
+            max_ms,
+            READINESS_SETTINGS["poll_interval_ms"],
+        )
+    except (TimeoutException, WebDriverException) as e:
+        logger.debug(f"Quiescence wait failed: {e}")
+        return 'error'
+
+
+def wait_for_page_ready(driver, url: str) -> str:
+    """
+    Block until the page at `url` is ready to be captured: the per-site listing
+    selector is present (when configured) and the page has gone quiet.
+    Fast static pages return after a single quiet period.
+    """
+    selector = get_listing_selector(url)
+    if selector:
+        wait_for_listing_selector(driver, selector)
+    return wait_for_quiescence(driver)
@@ -1,6 +1,5 @@
 # pagination_detector.py
 
-import os
 import json
 import re
 from typing import List, Dict, Tuple, Union
@@ -9,10 +8,9 @@ from pydantic import BaseModel, Field, ValidationError
 import tiktoken
 from dotenv import load_dotenv
 
-from openai import OpenAI
-import google.generativeai as genai
-from groq import Groq
-
+from llm_clients import providers
+from llm_dispatcher import dispatcher
+import local_llm
 from assets import PROMPT_PAGINATION, PRICING, LLAMA_MODEL_FULLNAME, GROQ_LLAMA_MODEL_FULLNAME
 
 load_dotenv()
@@ -71,15 +69,15 @@ def detect_pagination_elements(url: str, indications: str, selected_model: str,
             
         if selected_model in ["gpt-4o-mini", "gpt-4o-2024-08-06"]:
             # Use OpenAI API
-            client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-            completion = client.beta.chat.completions.parse(
+            client = providers.openai()
+            completion = dispatcher.call(selected_model, prompt_pagination + markdown_content, lambda: client.beta.chat.completions.parse(
                 model=selected_model,
                 messages=[
                     {"role": "system", "content": prompt_pagination},
                     {"role": "user", "content": markdown_content},
                 ],
                 response_format=PaginationData
-            )
+            ))
 
             # Extract the parsed response
             parsed_response = completion.choices[0].message.parsed
@@ -106,8 +104,7 @@ def detect_pagination_elements(url: str, indications: str, selected_model: str,
 
         elif selected_model == "gemini-1.5-flash":
             # Use Google Gemini API
-            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-            model = genai.GenerativeModel(
+            model = providers.gemini(
                 'gemini-1.5-flash',
                 generation_config={
                     "response_mime_type": "application/json",
@@ -117,7 +114,7 @@ def detect_pagination_elements(url: str, indications: str, selected_model: str,
             prompt = f"{prompt_pagination}\n{markdown_content}"
             # Count input tokens using Gemini's method
             input_tokens = model.count_tokens(prompt)
-            completion = model.generate_content(prompt)
+            completion = dispatcher.call(selected_model, prompt, lambda: model.generate_content(prompt))
             # Extract token counts from usage_metadata
             usage_metadata = completion.usage_metadata
             token_counts = {
@@ -150,14 +147,14 @@ def detect_pagination_elements(url: str, indications: str, selected_model: str,
 
         elif selected_model == "Groq Llama3.1 70b":
             # Use Groq client
-            client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-            response = client.chat.completions.create(
+            client = providers.groq()
+            response = dispatcher.call(selected_model, prompt_pagination + markdown_content, lambda: client.chat.completions.create(
                 model=GROQ_LLAMA_MODEL_FULLNAME,
                 messages=[
                     {"role": "system", "content": prompt_pagination},
                     {"role": "user", "content": markdown_content},
                 ],
-            )
+            ))
             response_content = response.choices[0].message.content.strip()
             # Try to parse the JSON
             try:
@@ -180,6 +177,28 @@ def detect_pagination_elements(url: str, indications: str, selected_model: str,
 
             return pagination_data, token_counts, pagination_price
 
+        elif selected_model == local_llm.LOCAL_MODEL:
+            # OpenAI-compatible local server, constrained to the PaginationData schema
+            response = local_llm.chat(
+                [
+                    {"role": "system", "content": prompt_pagination},
+                    {"role": "user", "content": markdown_content},
+                ],
+                {"type": "json_schema", "json_schema": {"name": "pagination", "schema": PaginationData.model_json_schema()}},
+            )
+            try:
+                pagination_data = PaginationData(**json.loads(response.choices[0].message.content))
+            except (ValueError, TypeError):
+                logging.error("Failed to parse local model response as pagination JSON")
+                pagination_data = PaginationData(page_urls=[])
+            token_counts = {
+                "input_tokens": getattr(response.usage, 'prompt_tokens', 0),
+                "output_tokens": getattr(response.usage, 'completion_tokens', 0)
+            }
+            pagination_price = calculate_pagination_price(token_counts, selected_model)
+
+            return pagination_data, token_counts, pagination_price
+
         else:
             raise ValueError(f"Unsupported model: {selected_model}")
 
@@ -189,15 +208,12 @@ def detect_pagination_elements(url: str, indications: str, selected_model: str,
         return PaginationData(page_urls=[]), {"input_tokens": 0, "output_tokens": 0}, 0.0
 
 def extract_load_more_urls(markdown_content: str) -> List[str]:
-    """Extract URLs for 'load more' or infinite scrolling from the markdown content."""
-    # Example regex pattern to find "load more" links
-    load_more_pattern = r'href=["\'](.*?)["\'].*?>\s*load more\s*</a>'
+    """
+    Extract 'load more' link URLs from the markdown content. Markdown has no raw
+    attributes left, so this matches markdown links; content behind JavaScript
+    "load more" buttons and infinite scrolling is collected while fetching
+    (see scroll_harvester.py).
+    """
+    load_more_pattern = r'\[\s*(?:load|show|view|see) more[^\]]*\]\(\s*<?([^)\s>]+)'
     matches = re.findall(load_more_pattern, markdown_content, re.IGNORECASE)
-
-    # Example logic for infinite scrolling detection
-    # This could be more complex depending on the structure of the content
-    infinite_scroll_pattern = r'data-url=["\'](.*?)["\']'
-    infinite_scroll_matches = re.findall(infinite_scroll_pattern, markdown_content)
-
-    # Combine both lists of URLs
-    return list(set(matches + infinite_scroll_matches))  # Remove duplicates
\ No newline at end of file
+    return list(set(match for match in matches if not match.lower().startswith(('#', 'javascript'))))
\ No newline at end of file
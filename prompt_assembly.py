@@ -0,0 +1,97 @@
+# prompt_assembly.py
+
+import threading
+from typing import Dict, List, Type
+
+from pydantic import BaseModel
+
+from assets import GEMINI_FILTER_MESSAGE, SYSTEM_MESSAGE, USER_MESSAGE
+from local_llm import LOCAL_MODEL
+
+# Models whose schema is enforced through response_format, so the system text needs no schema
+SCHEMA_ENFORCED_MODELS = {"gpt-4o-mini", "gpt-4o-2024-08-06", LOCAL_MODEL}
+
+_system_prompts = {}
+_lock = threading.Lock()
+
+
+def _field_type(field_info: Dict) -> str:
+    if 'type' in field_info:
+        return field_info['type']
+    # Optional fields are written as anyOf [<type>, null]
+    types = [option.get('type') for option in field_info.get('anyOf', []) if option.get('type') not in (None, 'null')]
+    return types[0] if types else 'string'
+
+
+def schema_message(listing_model: Type[BaseModel]) -> str:
+    """System message describing the listing schema, for models without structured output."""
+    schema_info = listing_model.model_json_schema()
+    schema_structure = ",\n".join(f'"{name}": "{_field_type(info)}"' for name, info in schema_info["properties"].items())
+
+    return f"""
+     You are an intelligent text extraction and conversion assistant. Your task is to extract structured information from the given
+     text and convert it into a pure JSON format. Focus specifically on procurement opportunities related to software and IT solutions, including custom software development,
+     ERP systems (financial, HR, supply chain), IT consulting and advisory services, digital skills training, and capacity building.
+     Additionally, include government and enterprise solutions such as Public Financial Management (budgeting, treasury, revenue), Identity Management (national ID, biometrics),
+     Tax/Customs platforms (revenue collection, debt recovery),Robotics Process Automation, Business Process Outsourcing services, and related technical services like system integration, cloud solutions, and data management.
+     Only extract information that explicitly mentions these areas or related keywords such as 'software', 'IT', 'cloud', 'data management', 'cybersecurity', and 'system integration'.
+     If you encounter any content that is not in English, translate it into English before extracting the relevant information.
+     Provide output in pure JSON format with no additional commentary, and ensure the output strictly follows this schema:
+
+     {{
+         "listings": [
+             {{
+                 {schema_structure}
+             }}
+         ]
+     }} """
+
+
+def system_prompt(listing_model: Type[BaseModel], selected_model: str) -> str:
+    """
+    The static system text for a field set and model, built once and reused so
+    every call starts with a byte-identical prefix that providers can cache.
+    """
+    key = (tuple(listing_model.model_fields), selected_model)
+    prompt = _system_prompts.get(key)
+    if prompt is None:
+        if selected_model in SCHEMA_ENFORCED_MODELS:
+            prompt = SYSTEM_MESSAGE
+        elif selected_model == "gemini-1.5-flash":
+            prompt = f"{schema_message(listing_model)}\n\n{GEMINI_FILTER_MESSAGE}"
+        else:
+            prompt = schema_message(listing_model)
+        with _lock:
+            prompt = _system_prompts.setdefault(key, prompt)
+    return prompt
+
+
+def build_messages(listing_model: Type[BaseModel], selected_model: str, data: str) -> List[Dict]:
+    """Chat messages with the static text first and the page content last."""
+    return [
+        {"role": "system", "content": system_prompt(listing_model, selected_model)},
+        {"role": "user", "content": USER_MESSAGE + data},
+    ]
+
+
+def _get(value, name):
+    return value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+
+
+def usage_counts(usage) -> Dict:
+    """Token counts from an OpenAI-compatible `usage`, including prompt tokens served from the provider's cache."""
+    details = _get(usage, 'prompt_tokens_details')
+    return {
+        "input_tokens": _get(usage, 'prompt_tokens') or 0,
+        "output_tokens": _get(usage, 'completion_tokens') or 0,
+        "cached_input_tokens": (_get(details, 'cached_tokens') if details is not None else 0) or 0,
+    }
+
+
+def gemini_usage_counts(usage_metadata) -> Dict:
+    """Token counts from Gemini's `usage_metadata`, including cached content tokens."""
+    return {
+        "input_tokens": getattr(usage_metadata, 'prompt_token_count', 0) or 0,
+        "output_tokens": getattr(usage_metadata, 'candidates_token_count', 0) or 0,
+        "cached_input_tokens": getattr(usage_metadata, 'cached_content_token_count', 0) or 0,
+    }
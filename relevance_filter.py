@@ -0,0 +1,208 @@
+# relevance_filter.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+from assets import IT_KEYWORDS, NON_IT_KEYWORDS, RELEVANCE_FILTER_SETTINGS
+from chunked_extraction import split_units
+
+logger = logging.getLogger(__name__)
+
+
+def _compile_matcher(keywords: List[str]) -> re.Pattern:
+    """
+    One precompiled alternation over all keywords, longest first, so a block is
+    scanned once however many keywords there are. Keywords match at the start
+    of a word ("cyber" finds "cybersecurity"); short ones are acronyms ("IT",
+    "API") and must be whole, upper-case words.
+    """
+    patterns = []
+    for keyword in sorted(set(keywords), key=len, reverse=True):
+        if len(keyword) <= 3:
+            patterns.append(r'(?-i:' + re.escape(keyword.upper()) + r')(?!\w)')
+        else:
+            patterns.append(re.escape(keyword))
+    return re.compile(r'(?<!\w)(?:' + '|'.join(patterns) + ')', re.IGNORECASE)
+
+
+KEYWORD_MATCHER = _compile_matcher(IT_KEYWORDS)
+NON_IT_MATCHER = _compile_matcher(NON_IT_KEYWORDS)
+
+_classifier = None
+# Time and history file size of the last training attempt
+_trained_at = None
+_lock = threading.Lock()
+
+
+def keyword_hits(text: str) -> int:
+    return sum(1 for _ in KEYWORD_MATCHER.finditer(text))
+
+
+def _clearly_not_it(text: str) -> bool:
+    return NON_IT_MATCHER.search(text) is not None
+
+
+def _load_history() -> Tuple[List[str], List[int]]:
+    path = RELEVANCE_FILTER_SETTINGS["history_file"]
+    if not os.path.exists(path):
+        return [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = deque(f, maxlen=RELEVANCE_FILTER_SETTINGS["max_history"])
+    texts, labels = [], []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        texts.append(entry['text'])
+        labels.append(entry['relevant'])
+    return texts, labels
+
+
+def _train_classifier():
+    """
+    Train a TF-IDF + logistic regression model on the recorded history, or
+    return None when scikit-learn is missing or there are too few examples.
+    """
+    try:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+    except ImportError:
+        logger.info("scikit-learn is not installed, relevance filter uses keywords only")
+        return None
+
+    texts, labels = _load_history()
+    if min(labels.count(0), labels.count(1)) < RELEVANCE_FILTER_SETTINGS["min_examples"]:
+        return None
+    # Character n-grams cope with the multilingual pages and inflected words
+    model = make_pipeline(
+        TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), min_df=2, sublinear_tf=True, max_features=50000),
+        LogisticRegression(max_iter=1000, class_weight='balanced'),
+    )
+    model.fit(texts, labels)
+    logger.info(f"Trained relevance classifier on {len(texts)} blocks")
+    return model
+
+
+def _history_size() -> int:
+    try:
+        return os.path.getsize(RELEVANCE_FILTER_SETTINGS["history_file"])
+    except OSError:
+        return 0
+
+
+def get_classifier():
+    """
+    The classifier trained on the history, or None. Long-running processes
+    retrain it, or retry when there were too few examples, once the history
+    has grown and retrain_seconds have passed since the last attempt.
+    """
+    global _classifier, _trained_at
+    if not RELEVANCE_FILTER_SETTINGS["classifier"]:
+        return None
+    with _lock:
+        size = _history_size()
+        if _trained_at is None or (size != _trained_at[1]
+                                   and time.time() - _trained_at[0] >= RELEVANCE_FILTER_SETTINGS["retrain_seconds"]):
+            _trained_at = (time.time(), size)
+            model = _train_classifier()
+            if model is not None:
+                _classifier = model
+    return _classifier
+
+
+def _explored(unit: str) -> bool:
+    """A fixed share of blocks is sent even when the filter would drop them, so their outcome keeps training the classifier."""
+    bucket = int(hashlib.sha1(unit.encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+    return bucket < RELEVANCE_FILTER_SETTINGS["explore_share"]
+
+
+def filter_blocks(markdown: str) -> Tuple[str, List[str]]:
+    """
+    Split markdown into listing blocks (table rows, list items, paragraphs) and
+    drop the ones that are clearly not IT procurement: no IT keyword and a low
+    relevance probability from the classifier. Until a classifier has been
+    trained only blocks naming a non-IT category (works, fuel, furniture, ...)
+    are dropped. Short blocks and the headers of kept table rows stay. The
+    classifier is not consulted on pages without a single IT keyword, as they
+    are probably in a language the keywords miss.
+    Returns the filtered markdown (empty when every block was dropped) and the
+    candidate blocks that were kept.
+    """
+    units = split_units(markdown)
+    min_chars = RELEVANCE_FILTER_SETTINGS["min_block_chars"]
+    candidates = [i for i, (_, unit, _) in enumerate(units) if len(unit) >= min_chars]
+    hits = {i: keyword_hits(units[i][1]) for i in candidates}
+    unmatched = [i for i in candidates if not hits[i] and not _explored(units[i][1])]
+    classifier = get_classifier() if unmatched and any(hits.values()) else None
+    if classifier is None:
+        # The IT keywords miss part of the scope, so without a classifier only clear non-IT blocks go
+        dropped = {i for i in unmatched if _clearly_not_it(units[i][1])}
+    else:
+        probabilities = classifier.predict_proba([units[i][1] for i in unmatched])[:, 1]
+        dropped = {i for i, p in zip(unmatched, probabilities) if p < RELEVANCE_FILTER_SETTINGS["keep_probability"]}
+    if not dropped:
+        return markdown, [units[i][1] for i in candidates]
+    if len(dropped) == len(candidates):
+        logger.info(f"Relevance filter dropped all {len(candidates)} blocks")
+        return '', []
+
+    kept_headers = {header for i, (_, _, header) in enumerate(units) if header and i not in dropped}
+    headers = {header for _, _, header in units if header}
+    parts, block_break = [], False
+    for i, (separator, unit, _) in enumerate(units):
+        # A table header is kept only while one of its rows is
+        if i in dropped or (unit in headers and unit not in kept_headers):
+            # The next kept unit starts a new block if this one did
+            block_break = block_break or separator == '\n\n'
+            continue
+        if parts:
+            parts.append(('\n\n' if block_break else separator) + unit)
+        else:
+            parts.append(unit)
+        block_break = False
+    logger.info(f"Relevance filter dropped {len(dropped)} of {len(candidates)} blocks")
+    return ''.join(parts), [units[i][1] for i in candidates if i not in dropped]
+
+
+def filter_listings(listings: List[Dict]) -> List[Dict]:
+    """
+    Keep the listings that look like IT procurement: an IT keyword in their
+    values or, once the classifier is trained, a relevance probability of at
+    least keep_probability. For listings no LLM has judged, e.g. the output of
+    a learned extraction rule.
+    """
+    texts = [' '.join(str(value) for value in listing.values() if value) for listing in listings]
+    unmatched = [i for i, text in enumerate(texts) if not keyword_hits(text)]
+    classifier = get_classifier() if unmatched else None
+    kept = set(range(len(listings))) - set(unmatched)
+    if classifier is not None:
+        probabilities = classifier.predict_proba([texts[i] for i in unmatched])[:, 1]
+        kept |= {i for i, p in zip(unmatched, probabilities) if p >= RELEVANCE_FILTER_SETTINGS["keep_probability"]}
+    return [listing for i, listing in enumerate(listings) if i in kept]
+
+
+def record_outcome(blocks: List[str], formatted_data: Dict):
+    """
+    Label the blocks sent to the LLM by whether a listing was extracted from
+    them (one of its values appears in the block) and append them to the
+    training history of the classifier.
+    """
+    listings = [listing for listing in (formatted_data or {}).get('listings', []) if isinstance(listing, dict)]
+    values = {' '.join(str(value).split()).lower() for listing in listings for value in listing.values()
+              if isinstance(value, str) and len(value) >= RELEVANCE_FILTER_SETTINGS["min_block_chars"] // 2}
+    path = RELEVANCE_FILTER_SETTINGS["history_file"]
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with _lock, open(path, 'a', encoding='utf-8') as f:
+        for block in blocks:
+            text = ' '.join(block.split()).lower()
+            relevant = int(any(value in text for value in values))
+            f.write(json.dumps({'text': block[:1000], 'relevant': relevant}, ensure_ascii=False) + '\n')
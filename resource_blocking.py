@@ -0,0 +1,48 @@
+# resource_blocking.py
+
+import logging
+import re
+from typing import List
+from urllib.parse import urlparse
+
+from assets import RESOURCE_BLOCKING_SETTINGS, BLOCKED_RESOURCE_TYPES, BLOCKED_URL_PATTERNS, RESOURCE_BLOCKING_ALLOWLIST
+
+logger = logging.getLogger(__name__)
+
+
+def get_allowlist(url: str) -> List[str]:
+    """Return the resource types and URL patterns that must not be blocked for this site."""
+    host = re.sub(r'^www\.', '', urlparse(url).netloc.lower())
+    allowed = []
+    for site, entries in RESOURCE_BLOCKING_ALLOWLIST.items():
+        if host == site or host.endswith('.' + site):
+            allowed.extend(entries)
+    return allowed
+
+
+def get_blocked_patterns(url: str) -> List[str]:
+    """
+    Build the list of URL patterns to block while loading `url`. Allowlist
+    entries may name a whole resource type (e.g. "font") or a single pattern.
+    """
+    allowed = set(get_allowlist(url))
+    patterns = []
+    for resource_type in RESOURCE_BLOCKING_SETTINGS["resource_types"]:
+        if resource_type not in allowed:
+            patterns.extend(BLOCKED_RESOURCE_TYPES.get(resource_type, []))
+    patterns.extend(BLOCKED_URL_PATTERNS)
+    return [pattern for pattern in patterns if pattern not in allowed]
+
+
+def apply_resource_blocking(driver, url: str):
+    """
+    Tell Chrome, through the DevTools Protocol, to drop requests for images,
+    fonts, media and trackers before navigating to `url`. The block list is
+    reset on every call so pooled drivers pick up each site's allowlist.
+    """
+    patterns = get_blocked_patterns(url) if RESOURCE_BLOCKING_SETTINGS["enabled"] else []
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        logger.debug(f"Could not apply resource blocking: {e}")
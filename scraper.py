@@ -1,33 +1,42 @@
 import os
 import random
-import time
 import re
 import json
 from datetime import datetime
 from typing import List, Dict, Type
 
 import pandas as pd
-from bs4 import BeautifulSoup
 from pydantic import BaseModel, Field, create_model
-import html2text
-import tiktoken
 
 from dotenv import load_dotenv
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from typing import Optional
-from urllib.parse import urljoin
 
-from openai import OpenAI
-import google.generativeai as genai
-from groq import Groq
-
-from assets import USER_AGENTS,PRICING,HEADLESS_OPTIONS,SYSTEM_MESSAGE,USER_MESSAGE,LLAMA_MODEL_FULLNAME,GROQ_LLAMA_MODEL_FULLNAME
+from driver_pool import get_driver_pool
+from fetch_engine import run_pipeline
+from fetch_strategy import fetch_with_strategy
+from page_readiness import apply_timeouts, wait_for_page_ready
+from resource_blocking import apply_resource_blocking
+from scroll_harvester import harvest_listing_fragments, append_fragments
+from chunked_extraction import ExtractedListings, extract_in_chunks, split_into_chunks
+from cpu_stage import convert_html_in_pool
+from llm_clients import providers
+from llm_dispatcher import dispatcher
+from prompt_assembly import build_messages, gemini_usage_counts, system_prompt, usage_counts
+import local_llm
+from url_compaction import LINK_ID_INSTRUCTION, compact_urls, expand_urls
+from api_capture import enable_performance_logging, discard_performance_log, capture_listing_endpoint, remember_endpoint, fetch_api_listings
+import llm_cache
+import extraction_rules
+import listing_snapshots
+import relevance_filter
+import page_cache
+from site_store import SiteStore
+from assets import USER_AGENTS,PRICING,EXTRACTION_SETTINGS,URL_COMPACTION_SETTINGS,LLM_CACHE_SETTINGS,EXTRACTION_RULES_SETTINGS,LISTING_DIFF_SETTINGS,RELEVANCE_FILTER_SETTINGS,PAGE_CACHE_SETTINGS,API_CAPTURE_SETTINGS,COOKIE_CONSENT_SETTINGS,HEADLESS_OPTIONS,USER_MESSAGE,LLAMA_MODEL_FULLNAME,GROQ_LLAMA_MODEL_FULLNAME
 load_dotenv()
 
 # Set up the Chrome WebDriver options
@@ -43,54 +52,140 @@ def setup_selenium():
     for option in HEADLESS_OPTIONS:
         options.add_argument(option)
 
+    # Record network events so JSON listing APIs can be discovered
+    if API_CAPTURE_SETTINGS["enabled"]:
+        enable_performance_logging(options)
+
     # Specify the path to the ChromeDriver
     service = Service("C:/ScrapeMaster/chromedriver-win64/chromedriver.exe")  
 
     # Initialize the WebDriver
     driver = webdriver.Chrome(service=service, options=options)
+    apply_timeouts(driver)
     return driver
 
-def click_accept_cookies(driver):
+# Scores every visible clickable element as a cookie-consent button in one round-trip,
+# clicks the best candidate and returns a CSS selector for it (or null if none qualifies)
+COOKIE_CONSENT_SCRIPT = """
+const acceptTexts = arguments[0], minScore = arguments[1];
+const consentContainer = '[id*="cookie" i],[class*="cookie" i],[id*="consent" i],[class*="consent" i],' +
+    '[id*="gdpr" i],[class*="gdpr" i],[aria-label*="cookie" i],[role="dialog"],[aria-modal="true"]';
+
+function isVisible(el) {
+    const rect = el.getBoundingClientRect();
+    const style = getComputedStyle(el);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+function cssPath(el) {
+    const parts = [];
+    while (el && el.nodeType === 1 && el !== document.documentElement) {
+        if (el.id) { parts.unshift('#' + CSS.escape(el.id)); break; }
+        let part = el.tagName.toLowerCase();
+        const parent = el.parentElement;
+        if (parent) {
+            const siblings = Array.from(parent.children).filter(c => c.tagName === el.tagName);
+            if (siblings.length > 1) part += ':nth-of-type(' + (siblings.indexOf(el) + 1) + ')';
+        }
+        parts.unshift(part);
+        el = parent;
+    }
+    return parts.join(' > ');
+}
+
+let best = null, bestScore = 0;
+const candidates = document.querySelectorAll(
+    'button, a, [role="button"], input[type="button"], input[type="submit"], div[onclick], span[onclick]');
+for (const el of candidates) {
+    const label = (el.innerText || el.value || el.getAttribute('aria-label') || '').trim().toLowerCase();
+    if (!label || label.length > 40 || !isVisible(el)) continue;
+
+    let score = 0;
+    acceptTexts.forEach((text, i) => {
+        if (label === text) score = Math.max(score, 15 - i * 0.1);
+        else if (label.includes(text)) score = Math.max(score, 10 - i * 0.1);
+    });
+    if (!score) continue;
+
+    if (el.closest(consentContainer)) score += 20;
+    if (/cookie|consent|gdpr|accept/i.test(el.id + ' ' + el.className)) score += 10;
+    if (el.tagName === 'BUTTON') score += 2;
+    if (score > bestScore) { best = el; bestScore = score; }
+}
+
+if (!best || bestScore < minScore) return null;
+const selector = cssPath(best);
+const label = (best.innerText || best.value || best.getAttribute('aria-label') || '').trim().toLowerCase();
+best.click();
+return {selector: selector, label: label};
+"""
+
+# Clicks a remembered consent button only if it is still a visible consent control with the
+# same label; positional selectors can point at an ordinary link on another page of the site
+REMEMBERED_CONSENT_SCRIPT = """
+const el = document.querySelector(arguments[0]);
+if (!el) return false;
+const label = (el.innerText || el.value || el.getAttribute('aria-label') || '').trim().toLowerCase();
+const rect = el.getBoundingClientRect();
+const style = getComputedStyle(el);
+if (label !== arguments[1] || !(rect.width > 0 && rect.height > 0)
+        || style.visibility === 'hidden' || style.display === 'none') return false;
+const inBanner = el.closest('[id*="cookie" i],[class*="cookie" i],[id*="consent" i],[class*="consent" i],' +
+    '[id*="gdpr" i],[class*="gdpr" i],[aria-label*="cookie" i],[role="dialog"],[aria-modal="true"]');
+if (!inBanner && !/cookie|consent|gdpr|accept/i.test(el.id + ' ' + el.className)) return false;
+el.click();
+return true;
+"""
+
+_cookie_selectors = SiteStore(COOKIE_CONSENT_SETTINGS["cache_file"])
+
+def click_accept_cookies(driver, url=None):
     """
-    Tries to find and click on a cookie consent button. It looks for several common patterns.
+    Dismiss the cookie consent banner, if any. The button that worked for a
+    site is remembered so later visits click it directly, after checking it
+    still carries the same label inside a consent banner. Pages without a
+    banner are not remembered, as banners often just render late.
     """
+    url = url or driver.current_url
     try:
-        # Wait for cookie popup to load
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//button | //a | //div"))
+        remembered = _cookie_selectors.get(url, max_age=COOKIE_CONSENT_SETTINGS["remember_days"] * 86400)
+        if remembered is not None and remembered.get('selector') and remembered.get('label'):
+            clicked = driver.execute_script(REMEMBERED_CONSENT_SCRIPT, remembered['selector'], remembered['label'])
+            if clicked:
+                return remembered['selector']
+
+        found = driver.execute_script(
+            COOKIE_CONSENT_SCRIPT, COOKIE_CONSENT_SETTINGS["accept_texts"], COOKIE_CONSENT_SETTINGS["min_score"]
         )
-        
-        # Common text variations for cookie buttons
-        accept_text_variations = [
-            "accept", "agree", "allow", "consent", "continue", "ok", "I agree", "got it"
-        ]
-        
-        # Iterate through different element types and common text variations
-        for tag in ["button", "a", "div"]:
-            for text in accept_text_variations:
-                try:
-                    # Create an XPath to find the button by text
-                    element = driver.find_element(By.XPATH, f"//{tag}[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{text}')]" )
-                    if element:
-                        element.click()
-                        print(f"Clicked the '{text}' button.")
-                        return
-                except:
-                    continue
-
-        print("No 'Accept Cookies' button found.")
-    
+        if not found:
+            print("No 'Accept Cookies' button found.")
+            return None
+        print(f"Clicked cookie consent button '{found['selector']}'.")
+        _cookie_selectors.set(url, selector=found['selector'], label=found['label'])
+        return found['selector']
+
     except Exception as e:
         print(f"Error finding 'Accept Cookies' button: {e}")
+        return None
 
 def fetch_html_selenium(url):
-    driver = setup_selenium()
-    try:
-        driver.get(url)
-        
-        # Add random delays to mimic human behavior
-        time.sleep(random.uniform(1, 2))
+    # Borrow a warm driver from the pool instead of starting Chrome for every page
+    with get_driver_pool(setup_selenium).borrow(url) as driver:
+        # Skip images, fonts, media and trackers; only the HTML is kept
+        apply_resource_blocking(driver, url)
+        if API_CAPTURE_SETTINGS["enabled"]:
+            discard_performance_log(driver)
+        try:
+            driver.get(url)
+        except TimeoutException:
+            # Keep whatever has rendered once the page-load timeout is hit
+            print(f"Page load timed out for {url}, capturing partially loaded page.")
+            driver.execute_script("window.stop();")
         driver.maximize_window()
+
+        # Wait for the listing to render instead of sleeping a fixed amount
+        wait_for_page_ready(driver, url)
+        click_accept_cookies(driver, url)
         
         # Get the base URL for making relative URLs absolute
         base_url = driver.current_url
@@ -125,57 +220,72 @@ def fetch_html_selenium(url):
         }
         return findProcurementLinks();
         """
-        procurement_links = driver.execute_script(js_script)
         html = driver.page_source
+
+        # Collect listings that only appear after scrolling or clicking "load more"
+        fragments = harvest_listing_fragments(driver)
+        html = append_fragments(html, fragments)
+
+        procurement_links = driver.execute_script(js_script)
+
+        # Remember JSON endpoints that carry the listing so later runs can skip the browser
+        if API_CAPTURE_SETTINGS["enabled"]:
+            endpoint = capture_listing_endpoint(driver)
+            if endpoint:
+                remember_endpoint(url, endpoint)
         
         return {
             'html': html,
             'base_url': base_url,
             'procurement_links': procurement_links
         }
-    finally:
-        driver.quit()
 
-def clean_html(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Remove headers and footers based on common HTML tags or classes
-    for element in soup.find_all(['header', 'footer']):
-        element.decompose()  # Remove these tags and their content
-
-    return str(soup)
+def fetch_html(url, headers=None):
+    """
+    Fetch a page using the cheapest strategy that yields the listing: plain HTTP
+    first, falling back to fetch_html_selenium for pages that need a browser.
+    """
+    return fetch_with_strategy(url, fetch_html_selenium, headers)
 
+def fetch_page_markdown(url):
+    """
+    Fetch a page and convert it to markdown, reusing the markdown from the last
+    run when the server answers a conditional request with 304 Not Modified.
+    """
+    # Call a previously captured JSON listing API directly, skipping the browser and conversion
+    if API_CAPTURE_SETTINGS["enabled"]:
+        api_listings = fetch_api_listings(url)
+        if api_listings is not None:
+            print(f"Fetched listings for {url} from its captured JSON API.")
+            return {'markdown': api_listings, 'procurement_links': []}
+
+    entry = page_cache.get_entry(url) if PAGE_CACHE_SETTINGS["enabled"] else None
+    scraped_data = fetch_html(url, page_cache.conditional_headers(entry))
+
+    if scraped_data.get('not_modified'):
+        markdown = page_cache.load_cached_markdown(entry)
+        if markdown is not None:
+            print(f"{url} not modified since last run, reusing cached markdown.")
+            return {'markdown': markdown, 'procurement_links': []}
+        scraped_data = fetch_html(url)
+
+    markdown = html_to_markdown_with_readability(scraped_data['html'], base_url=scraped_data['base_url'])
+    if PAGE_CACHE_SETTINGS["enabled"]:
+        page_cache.record_validators(url, markdown, scraped_data.get('etag'), scraped_data.get('last_modified'))
+    # The HTML is kept for the learned extraction rules (see extraction_rules.py)
+    return {'markdown': markdown, 'procurement_links': scraped_data['procurement_links'],
+            'html': scraped_data['html'], 'base_url': scraped_data['base_url']}
 
 def html_to_markdown_with_readability(html_content, base_url=None):
     """Convert HTML to markdown while preserving URLs and making them absolute."""
     # Check if html_content is a tuple (from fetch_html_selenium)
     if isinstance(html_content, tuple):
-        html_string, base_url, procurement_links = html_content
+        html_string, base_url, _ = html_content
     else:
         html_string = html_content
-        procurement_links = []
 
-    # Create BeautifulSoup object
-    soup = BeautifulSoup(html_string, 'html.parser')
-    
-    # Make all URLs absolute
-    if base_url:
-        for tag in soup.find_all(['a', 'link'], href=True):
-            tag['href'] = urljoin(base_url, tag['href'])
-    
-    # Add procurement links as data attribute if they exist
-    if procurement_links:
-        soup.body['data-procurement-links'] = json.dumps(procurement_links)
-    
-    cleaned_html = clean_html(str(soup))
-    
-    # Convert to markdown while preserving URLs
-    markdown_converter = html2text.HTML2Text()
-    markdown_converter.ignore_links = False
-    markdown_converter.wrap_links = False
-    markdown_content = markdown_converter.handle(cleaned_html)
-    
-    return markdown_content
+    # Conversion is CPU-bound, so large pages go to the worker process pool (see cpu_stage.py)
+    return convert_html_in_pool(html_string, base_url)
 
 
 def save_raw_data(raw_data: str, output_folder: str, file_name: str):
@@ -188,28 +298,6 @@ def save_raw_data(raw_data: str, output_folder: str, file_name: str):
     return raw_output_path
 
 
-def remove_urls_from_file(file_path):
-    # Regex pattern to find URLs
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'  
-
-    # Construct the new file name
-    base, ext = os.path.splitext(file_path)
-    new_file_path = f"{base}_cleaned{ext}"
-
-    # Read the original markdown content
-    with open(file_path, 'r', encoding='utf-8') as file:
-        markdown_content = file.read()
-
-    # Replace all found URLs with an empty string
-    cleaned_content = re.sub(url_pattern, '', markdown_content)
-
-    # Write the cleaned content to a new file
-    with open(new_file_path, 'w', encoding='utf-8') as file:
-        file.write(cleaned_content)
-    print(f"Cleaned file saved as: {new_file_path}")
-    return cleaned_content
-
-
 def create_dynamic_listing_model(fields: List[str]):
     """Creates a dynamic Pydantic model based on the provided fields."""
     field_definitions = {
@@ -234,167 +322,103 @@ def create_listings_container_model(listing_model: Type[BaseModel]) -> Type[Base
     return container_model
 
 
-def trim_to_token_limit(text, model, max_tokens=120000):
-    encoder = tiktoken.encoding_for_model(model)
-    tokens = encoder.encode(text)
-    if len(tokens) > max_tokens:
-        trimmed_text = encoder.decode(tokens[:max_tokens])
-        return trimmed_text
-    return text
-
-def generate_system_message(listing_model: BaseModel) -> str:
+def format_data(data, DynamicListingsContainer, DynamicListingModel, selected_model):
     """
-    Dynamically generate a system message based on the fields in the provided listing model.
+    Extract listings from markdown with the selected model. Links are sent as
+    short IDs (see url_compaction.py) and expanded back in the URL fields of the
+    result, which saves tokens and keeps long URLs from being mangled. Large
+    pages are extracted in chunks and merged (see chunked_extraction.py), and
+    results are cached on disk (see llm_cache.py). Blocks without IT relevance
+    are dropped first (see relevance_filter.py).
     """
-    # Use the model_json_schema() method to introspect the Pydantic model
-    schema_info = listing_model.model_json_schema()
-
-    # Extract field descriptions from the schema
-    field_descriptions = []
-    for field_name, field_info in schema_info["properties"].items():
-        # Get the field type from the schema info
-        field_type = field_info["type"]
-        field_descriptions.append(f'"{field_name}": "{field_type}"')
-
-    # Create the JSON schema structure for the listings
-    schema_structure = ",\n".join(field_descriptions)
-
-    # Generate the system message dynamically
-    system_message = f"""
-     You are an intelligent text extraction and conversion assistant. Your task is to extract structured information from the given 
-     text and convert it into a pure JSON format. Focus specifically on procurement opportunities related to software and IT solutions, including custom software development, 
-     ERP systems (financial, HR, supply chain), IT consulting and advisory services, digital skills training, and capacity building. 
-     Additionally, include government and enterprise solutions such as Public Financial Management (budgeting, treasury, revenue), Identity Management (national ID, biometrics), 
-     Tax/Customs platforms (revenue collection, debt recovery),Robotics Process Automation, Business Process Outsourcing services, and related technical services like system integration, cloud solutions, and data management. 
-     Only extract information that explicitly mentions these areas or related keywords such as 'software', 'IT', 'cloud', 'data management', 'cybersecurity', and 'system integration'. 
-     If you encounter any content that is not in English, translate it into English before extracting the relevant information. 
-     Provide output in pure JSON format with no additional commentary, and ensure the output strictly follows this schema:
- 
-     {{
-         "listings": [
-             {{
-                 {schema_structure}
-             }}
-         ]
-     }} """
-
-    return system_message
+    # Drop blocks that are clearly not IT procurement before paying to extract them
+    sent_blocks = None
+    if RELEVANCE_FILTER_SETTINGS["enabled"]:
+        data, sent_blocks = relevance_filter.filter_blocks(data)
+        if not data.strip():
+            print("No relevant listing blocks left after the relevance filter, skipping the LLM.")
+            return ExtractedListings({"listings": []}), {"input_tokens": 0, "output_tokens": 0}
+
+    # Reuse the stored result of an identical extraction (same content, schema, model and prompt)
+    if LLM_CACHE_SETTINGS["enabled"]:
+        key = llm_cache.cache_key(data, DynamicListingModel.model_json_schema(), selected_model,
+                                  system_prompt(DynamicListingModel, selected_model) + USER_MESSAGE + LINK_ID_INSTRUCTION)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            cached_data, cached_counts = cached
+            print("Reusing cached LLM result for identical input.")
+            # Nothing is billed for a cache hit; the original call's counts are kept for reference
+            return ExtractedListings(cached_data), {"input_tokens": 0, "output_tokens": 0, "llm_cache": cached_counts}
+
+    url_table = {}
+    if URL_COMPACTION_SETTINGS["enabled"]:
+        data, url_table = compact_urls(data)
+    instruction = LINK_ID_INSTRUCTION if url_table else ''
+
+    def extract(chunk):
+        return format_data_with_model(instruction + chunk, DynamicListingsContainer, DynamicListingModel, selected_model)
+
+    # Pages over the chunk budget are split between listings and the chunks extracted in parallel
+    chunks = split_into_chunks(data, selected_model, EXTRACTION_SETTINGS["model_chunk_tokens"].get(selected_model))
+    if len(chunks) == 1:
+        formatted_data, token_counts = extract(data)
+    else:
+        print(f"Splitting input into {len(chunks)} chunks for extraction.")
+        formatted_data, token_counts = extract_in_chunks(chunks, extract)
+    formatted_data = expand_urls(formatted_data, url_table)
 
+    # Blocks that did or did not yield a listing become training data for the relevance classifier
+    if sent_blocks and formatted_data is not None and not getattr(formatted_data, 'failed_chunks', 0):
+        relevance_filter.record_outcome(sent_blocks, formatted_data.to_dict())
 
-def format_data(data, DynamicListingsContainer, DynamicListingModel, selected_model):
+    # Failed, empty (error fallbacks return no listings) and partial results are not cached
+    if LLM_CACHE_SETTINGS["enabled"] and formatted_data is not None and not getattr(formatted_data, 'failed_chunks', 0):
+        result = formatted_data.to_dict()
+        if result.get('listings'):
+            llm_cache.put(key, selected_model, result, token_counts)
+    return formatted_data, token_counts
+
+
+def format_data_with_model(data, DynamicListingsContainer, DynamicListingModel, selected_model):
     token_counts = {}
     
     if selected_model in ["gpt-4o-mini", "gpt-4o-2024-08-06"]:
         # Use OpenAI API
-        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        completion = client.beta.chat.completions.parse(
+        client = providers.openai()
+        # Static system text first and the page last, so OpenAI can serve the prefix from its prompt cache
+        messages = build_messages(DynamicListingModel, selected_model, data)
+        completion = dispatcher.call(selected_model, messages[0]["content"] + messages[1]["content"], lambda: client.beta.chat.completions.parse(
             model=selected_model,
-            messages=[
-                {"role": "system", "content": SYSTEM_MESSAGE},
-                {"role": "user", "content": USER_MESSAGE + data},
-            ],
+            messages=messages,
             response_format=DynamicListingsContainer
-        )
-        # Calculate tokens using tiktoken
-        encoder = tiktoken.encoding_for_model(selected_model)
-        input_token_count = len(encoder.encode(USER_MESSAGE + data))
-        output_token_count = len(encoder.encode(json.dumps(completion.choices[0].message.parsed.dict())))
-        token_counts = {
-            "input_tokens": input_token_count,
-            "output_tokens": output_token_count
-        }
+        ))
+        # Billed token counts, including the prompt tokens read from the cache
+        token_counts = usage_counts(completion.usage)
         return completion.choices[0].message.parsed, token_counts
 
     elif selected_model == "gemini-1.5-flash":
         try:
-            # Configure Gemini
-            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-            model = genai.GenerativeModel('gemini-1.5-flash',
+            # Shared Gemini model object (configured once per process); the schema and filtering
+            # rules go in as its system instruction so every request shares the same prefix
+            model = providers.gemini('gemini-1.5-flash',
                     generation_config={
                         "temperature": 0.2,
                         "top_p": 0.7,
                         "top_k": 20,
-                        "max_output_tokens": 2048,
-                    })
-
-            # Enhanced system message with explicit filtering instructions and translation capability
-            base_sys_message = generate_system_message(DynamicListingModel)
-            enhanced_sys_message = f"""
-            {base_sys_message}
-
-            IMPORTANT EXTRACTION AND TRANSLATION RULES:
-            1. LANGUAGE HANDLING:
-               - Process content in ANY language
-               - Translate all extracted information to English
-               - Maintain the original meaning and technical terminology
-               - Include the original language version of the title in a new field 'original_title'
-               - If the listing is not in English, add a field 'source_language' specifying the original language
-
-            2. ONLY extract information about opportunities that EXPLICITLY mention:
-               - Software development or IT solutions
-               - ERP systems (financial, HR, supply chain)
-               - IT consulting and advisory services
-               - Digital skills training
-               - Government technology solutions
-               - System integration
-               - Cloud solutions
-               - Data management
-               - Cybersecurity
-               - Digital transformation
-
-            3. SKIP any opportunity that:
-               - Does not explicitly mention technology or IT services
-               - Is purely about physical goods or non-IT services
-               - Is ambiguous about IT involvement
-
-            4. For each extracted opportunity, you MUST be able to point to specific text that confirms it's IT/software related.
-
-            FORMAT: Provide output in pure JSON following the schema exactly. Do not include explanatory text.
-            For non-English listings, include:
-            - 'original_title': The title in original language
-            - 'source_language': The language code (e.g., 'es', 'fr', 'de')
-
-            BEFORE INCLUDING ANY LISTING, ASK:
-            - Does it explicitly mention IT/software services?
-            - Is it clearly a technology procurement?
-            - Can I point to specific IT-related keywords in the text?
-            - Have I accurately translated all relevant information to English?
-            - Have I preserved the original title for non-English listings?
-
-            Only include listings that pass these checks.
-            """
+                        "max_output_tokens": 8192,
+                    },
+                    system_instruction=system_prompt(DynamicListingModel, selected_model))
 
             # Function to validate if a response meets IT criteria
             def validate_it_relevance(response_dict):
                 if not isinstance(response_dict, dict) or "listings" not in response_dict:
                     return response_dict
                 
-                it_keywords = {
-                    'software', 'it ', 'ict', 'technology', 'digital', 'system', 
-                    'cloud', 'cyber', 'erp', 'data', 'integration', 'platform',
-                    'application', 'network', 'security', 'automation', 'api',
-                    'development', 'database', 'infrastructure', 'computing'
-                }
-                
-                # Add common IT keywords in other languages
-                multilingual_it_keywords = {
-                    # Spanish
-                    'informática', 'desarrollo', 'tecnología', 'sistema', 'nube',
-                    # French
-                    'informatique', 'développement', 'technologie', 'système', 'nuage',
-                    # German
-                    'informatik', 'entwicklung', 'technologie', 'system', 'cloud',
-                    # Add more languages as needed
-                }
-                
-                it_keywords.update(multilingual_it_keywords)
-                
                 filtered_listings = []
                 for listing in response_dict["listings"]:
-                    # Convert all text fields to lowercase for checking
-                    listing_text = ' '.join(str(v).lower() for v in listing.values())
-                    # Check if any IT keyword is present
-                    if any(keyword in listing_text for keyword in it_keywords):
+                    listing_text = ' '.join(str(v) for v in listing.values())
+                    # Check if any IT keyword is present (assets.IT_KEYWORDS, shared with the relevance filter)
+                    if relevance_filter.keyword_hits(listing_text):
                         # Ensure required translation fields are present for non-English listings
                         if 'source_language' in listing and listing['source_language'] != 'en':
                             if 'original_title' not in listing:
@@ -403,12 +427,12 @@ def format_data(data, DynamicListingsContainer, DynamicListingModel, selected_mo
                 
                 return {"listings": filtered_listings}
 
-            prompt = f"{enhanced_sys_message}\n\n{USER_MESSAGE}{data}"
-            input_token_count = model.count_tokens(prompt).total_tokens
-            
+            prompt = USER_MESSAGE + data
+
             # Generate completion with additional logging
             print("Sending request to Gemini...")
-            completion = model.generate_content(prompt)
+            completion = dispatcher.call(selected_model, system_prompt(DynamicListingModel, selected_model) + prompt,
+                                         lambda: model.generate_content(prompt))
             print(f"Received response from Gemini. Response type: {type(completion)}")
             
             if not completion or not completion.text:
@@ -431,56 +455,36 @@ def format_data(data, DynamicListingsContainer, DynamicListingModel, selected_mo
             except json.JSONDecodeError as je:
                 print(f"JSON parsing error: {str(je)}")
                 print(f"Problematic content: {response_content}")
-                # Attempt to provide a valid fallback response
-                parsed_response = {"listings": []}
+                raise ValueError(f"Invalid JSON response: {je}")
             # Apply IT relevance filtering
             filtered_response = validate_it_relevance(parsed_response)
             
-            # Create response object with the filtered data
-            class FormattedResponse:
-                def __init__(self, data):
-                    self.data = data
-                def to_dict(self):
-                    return self.data
-                def dict(self):
-                    return self.data
-
-            try:
-                output_token_count = model.count_tokens(json.dumps(filtered_response)).total_tokens
-            except:
-                output_token_count = len(json.dumps(filtered_response)) // 4
+            # Billed token counts from the response, including tokens served from Gemini's cache
+            token_counts = gemini_usage_counts(completion.usage_metadata)
 
-            token_counts = {
-                "input_tokens": input_token_count,
-                "output_tokens": output_token_count
-            }
-
-            return FormattedResponse(filtered_response), token_counts
+            return ExtractedListings(filtered_response), token_counts
 
         except Exception as e:
             print(f"Error processing Gemini model: {str(e)}")
-        print(f"Full error details:")
-        import traceback
-        print(traceback.format_exc())
-        # Return a valid but empty response instead of None
-        return FormattedResponse({"listings": []}), {"input_tokens": 0, "output_tokens": 0}
+            print(f"Full error details:")
+            import traceback
+            print(traceback.format_exc())
+            # Like the other providers, signal the failure so chunked extraction counts the chunk as failed
+            return None, None
     
     elif selected_model == "Groq Llama3.1 70b":
         try:
-            # Dynamically generate the system message based on the schema
-            sys_message = generate_system_message(DynamicListingModel)
+            # Schema-describing system message (memoized per field set) followed by the page
+            messages = build_messages(DynamicListingModel, selected_model, data)
 
-            # Initialize Groq client
-            client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+            # Shared Groq client
+            client = providers.groq()
 
             # Generate the completion response
-            completion = client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": sys_message},
-                    {"role": "user", "content": USER_MESSAGE + data}
-                ],
+            completion = dispatcher.call(selected_model, messages[0]["content"] + messages[1]["content"], lambda: client.chat.completions.create(
+                messages=messages,
                 model=GROQ_LLAMA_MODEL_FULLNAME
-            )
+            ))
 
             # Validate response
             if not completion or not completion.choices:
@@ -508,10 +512,7 @@ def format_data(data, DynamicListingsContainer, DynamicListingModel, selected_mo
                 raise ValueError(f"Invalid JSON response: {response_content}")
 
             # Extract token usage
-            token_counts = {
-                "input_tokens": getattr(completion.usage, 'prompt_tokens', 0),
-                "output_tokens": getattr(completion.usage, 'completion_tokens', 0)
-            }
+            token_counts = usage_counts(completion.usage)
 
             # Create a dict-like object with to_dict method
             class FormattedResponse:
@@ -528,6 +529,24 @@ def format_data(data, DynamicListingsContainer, DynamicListingModel, selected_mo
             print(traceback.format_exc())
             return None, None
 
+    elif selected_model == local_llm.LOCAL_MODEL:
+        try:
+            # OpenAI-compatible local server (LM Studio, llama.cpp server, vLLM), constrained to the listing schema
+            completion = local_llm.chat(
+                build_messages(DynamicListingModel, selected_model, data),
+                local_llm.json_schema_format(DynamicListingsContainer),
+            )
+            if not completion or not completion.choices:
+                raise ValueError("Empty or malformed response from the local model server")
+
+            formatted_data = local_llm.parse_listings(completion.choices[0].message.content)
+            token_counts = usage_counts(completion.usage)
+            return ExtractedListings(formatted_data), token_counts
+
+        except Exception as e:
+            print(f"Error processing local model: {str(e)}")
+            return None, None
+
 def save_formatted_data(formatted_data, output_folder: str, json_file_name: str, excel_file_name: str):
     """Save formatted data as JSON and Excel in the specified output folder."""
     os.makedirs(output_folder, exist_ok=True)
@@ -605,9 +624,12 @@ def scrape_url(url: str, fields: List[str], selected_model: str, output_folder:
 def calculate_price(token_counts, model):
     input_token_count = token_counts.get("input_tokens", 0)
     output_token_count = token_counts.get("output_tokens", 0)
+    # Prompt tokens served from the provider's cache are part of input_tokens but billed at the cached rate
+    cached_token_count = min(token_counts.get("cached_input_tokens", 0), input_token_count)
     
     # Calculate the costs
-    input_cost = input_token_count * PRICING[model]["input"]
+    input_cost = ((input_token_count - cached_token_count) * PRICING[model]["input"]
+                  + cached_token_count * PRICING[model].get("cached_input", PRICING[model]["input"]))
     output_cost = output_token_count * PRICING[model]["output"]
     total_cost = input_cost + output_cost
     
@@ -628,15 +650,22 @@ def scrape_multiple_urls(urls, fields, selected_model):
     total_output_tokens = 0
     total_cost = 0
     all_data = []
-    markdown = None  # We'll store the markdown for the first (or only) URL
-    
-    for i, url in enumerate(urls, start=1):
-        raw_html = fetch_html_selenium(url)
-        current_markdown = html_to_markdown_with_readability(raw_html)
-        if i == 1:
-            markdown = current_markdown  # Store markdown for the first URL
-        
-        input_tokens, output_tokens, cost, formatted_data = scrape_url(url, fields, selected_model, output_folder, i, current_markdown)
+
+    def process(index, url, page):
+        # The pipeline keeps fetched pages until the end, so release the HTML once it has been used
+        html = page.pop('html', None)
+        return scrape_url(url, fields, selected_model, output_folder, index + 1, page['markdown'],
+                          html=html, base_url=page.get('base_url'))
+
+    # Fetch pages concurrently while earlier pages are already in the LLM stage
+    results = run_pipeline(urls, fetch_page_markdown, process)
+    markdown = results[0]['fetched']['markdown'] if results and results[0]['fetched'] else None  # Markdown for the first (or only) URL
+
+    for item in results:
+        if item['result'] is None:
+            all_data.append(None)
+            continue
+        input_tokens, output_tokens, cost, formatted_data = item['result']
         total_input_tokens += input_tokens
         total_output_tokens += output_tokens
         total_cost += cost
@@ -644,11 +673,39 @@ def scrape_multiple_urls(urls, fields, selected_model):
     
     return output_folder, total_input_tokens, total_output_tokens, total_cost, all_data, markdown
 
-def scrape_url(url: str, fields: List[str], selected_model: str, output_folder: str, file_number: int, markdown: str):
-    """Scrape a single URL and save the results."""
+def scrape_url(url: str, fields: List[str], selected_model: str, output_folder: str, file_number: int, markdown: str,
+               html: str = None, base_url: str = None):
+    """
+    Scrape a single URL and save the results. When the page HTML is given, the
+    site's learned extraction rule is tried before the LLM and relearned from
+    the LLM result. Pages seen before only send their new or changed blocks.
+    """
     try:
         # Save raw data
-        save_raw_data(markdown, output_folder, f'rawData_{file_number}.md')
+        raw_path = save_raw_data(markdown, output_folder, f'rawData_{file_number}.md')
+        page_url = url['url'] if isinstance(url, dict) else url
+        json_file_name = f'sorted_data_{file_number}.json'
+
+        # Reuse the previous result when the page content has not changed
+        cached_data = page_cache.load_cached_result(page_url, markdown, fields, selected_model)
+        if cached_data is not None:
+            print(f"Content of {page_url} unchanged since last run, reusing previous result.")
+            llm_cache.count_hit()
+            save_formatted_data(cached_data, output_folder, json_file_name, f'sorted_data_{file_number}.xlsx')
+            page_cache.store_result(page_url, markdown, fields, selected_model, raw_path, os.path.join(output_folder, json_file_name))
+            return 0, 0, 0, cached_data
+
+        # Extract with the site's learned rule, skipping the LLM when its output validates
+        if EXTRACTION_RULES_SETTINGS["enabled"] and html:
+            rule_data = extraction_rules.extract_with_rule(page_url, html, base_url or page_url, fields)
+            if rule_data is not None:
+                print(f"Extracted {len(rule_data['listings'])} listings from {page_url} with the learned extraction rule.")
+                save_formatted_data(rule_data, output_folder, json_file_name, f'sorted_data_{file_number}.xlsx')
+                if LISTING_DIFF_SETTINGS["enabled"]:
+                    listing_snapshots.save_snapshot(page_url, markdown, fields, selected_model, rule_data)
+                if PAGE_CACHE_SETTINGS["enabled"] and rule_data['listings']:
+                    page_cache.store_result(page_url, markdown, fields, selected_model, raw_path, os.path.join(output_folder, json_file_name))
+                return 0, 0, 0, rule_data
 
         # Create the dynamic listing model
         DynamicListingModel = create_dynamic_listing_model(fields)
@@ -656,11 +713,39 @@ def scrape_url(url: str, fields: List[str], selected_model: str, output_folder:
         # Create the container model that holds a list of the dynamic listing models
         DynamicListingsContainer = create_listings_container_model(DynamicListingModel)
         
+        # Send only the blocks that are new since the last run and merge with the previous listings
+        formatted_data = None
+        diff = listing_snapshots.diff_blocks(page_url, markdown, fields, selected_model) if LISTING_DIFF_SETTINGS["enabled"] else None
+        if diff is not None:
+            new_markdown, previous_listings = diff
+            if new_markdown:
+                new_data, token_counts = format_data(new_markdown, DynamicListingsContainer, DynamicListingModel, selected_model)
+            else:
+                new_data, token_counts = ExtractedListings({"listings": []}), {"input_tokens": 0, "output_tokens": 0}
+            if new_data is not None:
+                new_listings = new_data.to_dict().get('listings', [])
+                print(f"Extracted {len(new_markdown)} characters of new or changed blocks from {page_url} ({len(new_listings)} listings).")
+                merged = listing_snapshots.merge_with_previous(previous_listings, new_listings, markdown, fields)
+                formatted_data = ExtractedListings(merged, getattr(new_data, 'failed_chunks', 0))
+
         # Format data
-        formatted_data, token_counts = format_data(markdown, DynamicListingsContainer, DynamicListingModel, selected_model)
+        if formatted_data is None:
+            formatted_data, token_counts = format_data(markdown, DynamicListingsContainer, DynamicListingModel, selected_model)
         
         # Save formatted data
-        save_formatted_data(formatted_data, output_folder, f'sorted_data_{file_number}.json', f'sorted_data_{file_number}.xlsx')
+        save_formatted_data(formatted_data, output_folder, json_file_name, f'sorted_data_{file_number}.xlsx')
+        # Partial (failed chunks) and empty results are not reused, like in llm_cache
+        complete = not getattr(formatted_data, 'failed_chunks', 0)
+        has_listings = bool(formatted_data.to_dict().get('listings'))
+        if LISTING_DIFF_SETTINGS["enabled"] and complete:
+            listing_snapshots.save_snapshot(page_url, markdown, fields, selected_model, formatted_data.to_dict())
+        if EXTRACTION_RULES_SETTINGS["enabled"] and html and complete:
+            try:
+                extraction_rules.learn_rule(page_url, html, base_url or page_url, fields, formatted_data.to_dict())
+            except Exception as e:
+                print(f"Could not learn an extraction rule for {page_url}: {e}")
+        if PAGE_CACHE_SETTINGS["enabled"] and complete and has_listings:
+            page_cache.store_result(page_url, markdown, fields, selected_model, raw_path, os.path.join(output_folder, json_file_name))
 
         # Calculate and return token usage and cost
         input_tokens, output_tokens, total_cost = calculate_price(token_counts, selected_model)
@@ -0,0 +1,100 @@
+# scroll_harvester.py
+
+import logging
+from typing import List
+
+from assets import HARVEST_SETTINGS
+from page_readiness import wait_for_quiescence
+
+logger = logging.getLogger(__name__)
+
+# Records every element added to the page from now on
+INSTALL_OBSERVER_SCRIPT = """
+if (!window.__harvestObserver) {
+    window.__harvest = [];
+    window.__harvestObserver = new MutationObserver(records => {
+        for (const record of records) {
+            for (const node of record.addedNodes) {
+                if (node.nodeType === 1) window.__harvest.push(node);
+            }
+        }
+    });
+    window.__harvestObserver.observe(document.body, {childList: true, subtree: true});
+}
+"""
+
+# Clicks a visible "load more" control that does not navigate away, otherwise scrolls to the bottom
+ADVANCE_SCRIPT = """
+const texts = arguments[0];
+const candidates = document.querySelectorAll('button, a, [role="button"], input[type="button"]');
+for (const el of candidates) {
+    const label = (el.innerText || el.value || '').trim().toLowerCase();
+    if (!label || label.length > 40 || !texts.some(t => label.includes(t))) continue;
+    const href = el.tagName === 'A' ? (el.getAttribute('href') || '') : '';
+    if (href && !href.startsWith('#') && !href.toLowerCase().startsWith('javascript')) continue;
+    const rect = el.getBoundingClientRect();
+    if (!rect.width || !rect.height) continue;
+    el.scrollIntoView({block: 'center'});
+    el.click();
+    return 'clicked';
+}
+window.scrollTo(0, document.body.scrollHeight);
+return 'scrolled';
+"""
+
+# Returns the outer HTML of the outermost elements added since the last call
+DRAIN_SCRIPT = """
+const minChars = arguments[0];
+const skipTags = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'LINK', 'META', 'IFRAME', 'svg']);
+const nodes = (window.__harvest || []).filter(n => n.isConnected && !skipTags.has(n.tagName));
+window.__harvest = [];
+const added = new Set(nodes);
+const roots = nodes.filter(n => {
+    for (let p = n.parentElement; p; p = p.parentElement) { if (added.has(p)) return false; }
+    return true;
+});
+return Array.from(new Set(roots))
+    .filter(n => (n.textContent || '').trim().length >= minChars)
+    .map(n => n.outerHTML);
+"""
+
+STOP_OBSERVER_SCRIPT = """
+if (window.__harvestObserver) { window.__harvestObserver.disconnect(); }
+window.__harvestObserver = null;
+window.__harvest = [];
+"""
+
+
+def harvest_listing_fragments(driver, max_rounds: int = None) -> List[str]:
+    """
+    Scroll or click "load more" until no new listing content appears or
+    `max_rounds` is reached. Returns only the HTML fragments added along the
+    way, so the full page does not have to be re-serialized after each round.
+    """
+    max_rounds = HARVEST_SETTINGS["max_rounds"] if max_rounds is None else max_rounds
+    fragments = []
+    try:
+        driver.execute_script(INSTALL_OBSERVER_SCRIPT)
+        for round_number in range(1, max_rounds + 1):
+            action = driver.execute_script(ADVANCE_SCRIPT, HARVEST_SETTINGS["load_more_texts"])
+            wait_for_quiescence(driver)
+            new_fragments = driver.execute_script(DRAIN_SCRIPT, HARVEST_SETTINGS["min_fragment_chars"])
+            if not new_fragments:
+                logger.debug(f"No new listing content after round {round_number} ({action}), stopping")
+                break
+            fragments.extend(new_fragments)
+        driver.execute_script(STOP_OBSERVER_SCRIPT)
+    except Exception as e:
+        logger.warning(f"Scroll harvesting stopped early: {e}")
+    return fragments
+
+
+def append_fragments(html: str, fragments: List[str]) -> str:
+    """Append harvested fragments to the page HTML captured before scrolling."""
+    if not fragments:
+        return html
+    section = '<section data-harvested="true">' + ''.join(fragments) + '</section>'
+    index = html.lower().rfind('</body>')
+    if index == -1:
+        return html + section
+    return html[:index] + section + html[index:]
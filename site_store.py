@@ -0,0 +1,78 @@
+# site_store.py
+
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+
+def site_key(url: str) -> str:
+    """Return the host of a URL without a leading 'www.', used as the per-site key."""
+    return re.sub(r'^www\.', '', urlparse(url).netloc.lower())
+
+
+class SiteStore:
+    """
+    Small SQLite table of per-site facts learned while scraping (fetch strategy,
+    cookie banner selector, ...). Each value is stored with an 'updated_at' time.
+    SQLite's locking makes the store safe to share between the threads and the
+    worker processes of a sweep.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS site_store (
+            site TEXT PRIMARY KEY,
+            entry TEXT,
+            updated_at REAL
+        )
+        """)
+        return conn
+
+    @staticmethod
+    def _read(conn: sqlite3.Connection, site: str) -> Optional[Dict]:
+        row = conn.execute("SELECT entry, updated_at FROM site_store WHERE site = ?", (site,)).fetchone()
+        if row is None:
+            return None
+        return dict(json.loads(row[0]), updated_at=row[1])
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, site: str, values: Dict):
+        values = {key: value for key, value in values.items() if key != 'updated_at'}
+        conn.execute("INSERT OR REPLACE INTO site_store (site, entry, updated_at) VALUES (?, ?, ?)",
+                     (site, json.dumps(values), time.time()))
+
+    def get(self, url: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """Return the entry for the URL's site, or None if missing or older than `max_age` seconds."""
+        with closing(self._connect()) as conn, conn:
+            entry = self._read(conn, site_key(url))
+        if entry is None:
+            return None
+        if max_age is not None and time.time() - entry["updated_at"] > max_age:
+            return None
+        return entry
+
+    def set(self, url: str, **values: Any):
+        """Replace the entry for the URL's site."""
+        with closing(self._connect()) as conn, conn:
+            self._write(conn, site_key(url), values)
+
+    def update(self, url: str, change: Callable[[Dict], Dict]):
+        """
+        Replace the entry for the URL's site with `change(entry)`, where entry is
+        {} when missing. The read and the write happen in one transaction, so
+        concurrent updates from other processes are not lost.
+        """
+        site = site_key(url)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write(conn, site, change(self._read(conn, site) or {}))
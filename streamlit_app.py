@@ -4,9 +4,11 @@ import pandas as pd
 import json
 import logging
 from datetime import datetime
-from scraper import fetch_html_selenium, save_raw_data, format_data, save_formatted_data, calculate_price, html_to_markdown_with_readability, create_dynamic_listing_model, create_listings_container_model, scrape_url
+from scraper import fetch_page_markdown, fetch_html_selenium, save_raw_data, format_data, save_formatted_data, calculate_price, html_to_markdown_with_readability, create_dynamic_listing_model, create_listings_container_model, scrape_url
 from pagination_detector import detect_pagination_elements, PaginationData
-from assets import PRICING
+from fetch_engine import run_pipeline
+import llm_cache
+from assets import PRICING, WEBSITE_URLS, UNIVERSAL_LABELS, PREDEFINED_TAGS
 import os
 from pydantic import BaseModel
 from urllib.parse import urlparse
@@ -42,173 +44,6 @@ if 'results' not in st.session_state:
 if 'perform_scrape' not in st.session_state:
     st.session_state['perform_scrape'] = False
 
-# Mapping of website names to URLs
-WEBSITE_URLS = {
-    # "PPIP": "https://tenders.go.ke/tenders",
-    # "UNGM": "https://www.ungm.org/Public/Notice",
-    "IOM": "https://www.iom.int/procurement-opportunities",
-    #"Malawi": "https://www.ppda.mw/tenders",
-    "UNDP": "https://procurement-notices.undp.org/#:~:text=RFP/JSB-AC/2409/52%20Develop%20a%20national%20e-procurement",
-    "AFDB": "https://www.afdb.org/en/projects-and-operations/procurement#:~:text=Procurement%20procedures%20must%20offer%20equal%20opportunities%20to",
-    #"KRA": "https://www.kra.go.ke/tenders#:~:text=E%20-%20Procurement%20We%20are%20always%20working%20closely%20with%20our",
-    "Swaziland": "https://esppra.co.sz/sppra/tender.php",
-    #"Nigeria": "https://www.publicprocurement.ng/#:~:text=ministry%20for%20local%20government%20and%20chieftaincy%20affairs,%20yobe",
-    "Uganda": "https://gpp.ppda.go.ug/public/bid-invitations",
-    #"EC": "https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/calls-for-tenders?keywords=software&isExactMatch=true&order=DESC&pageNumber=1&pageSize=50&sortBy=startDate",
-    #"Georgia": "https://ssl.doas.state.ga.us/gpr/",
-    #"EIB": "https://www.eib.org/en/about/procurement/all/index.htm?q=&sortColumn=configuration.contentStart&sortDir=desc&pageNumber=0&itemPerPage=25&pageable=true&la=EN&deLa=EN&yearTo=&orYearTo=true&yearFrom=&orYearFrom=true&procurementStatus=&or_g_procurementInformations_type=true",
-    "UN": "https://www.un.org/Depts/ptd/eoi",
-    "DepEd": "https://depedpines.com/procurement-notices/",
-    #"GeBiz": "https://www.gebiz.gov.sg/ptn/opportunity/BOListing.xhtml",
-    "Mauritius": "https://publicprocurement.govmu.org/publicprocurement/?page_id=720",
-    "Bermuda": "https://www.gov.bm/procurement-notices",
-    "Caribbean Bank": "https://www.caribank.org/work-with-us/procurement/general-procurement-notices",
-    "Hong Kong": "https://pcms2.gld.gov.hk/iprod/#/sta00305?lang-setting=en-US&results_pageNo=1",
-    "Aus Tender": "https://www.tenders.gov.au/atm",
-    "Sri Lanka": "https://www.slcgmel.org/procurement-notices/",
-    "ADB": "https://www.adb.org/projects/tenders/group/goods",
-    # "HANDS": "https://hands.ehawaii.gov/hands/opportunities",
-    "GoC": "https://canadabuys.canada.ca/en/tender-opportunities",
-    "Scotland": "https://www.publiccontractsscotland.gov.uk/Search/Search_MainPage.aspx",
-    "NRA": "https://www.nra.co.za/sanral-tenders/list/open-tenders",
-    # "IADB": "https://projectprocurement.iadb.org/en/procurement-notices",
-    "USAID": "https://www.usaid.gov/procurement-announcements",
-    #"AIIB": "https://www.aiib.org/en/opportunities/business/project-procurement/list.html",
-    "EEAS": "https://www.eeas.europa.eu/eeas/tenders_en",
-    "UNIDO": "https://www.unido.org/get-involved-procurement/procurement-opportunities",
-    #"CBK": "https://www.centralbank.go.ke/tenders/",
-    "DevAID": "https://www.developmentaid.org/tenders/search?sectors=70",
-    "Save the Children": "https://www.savethechildren.net/tenders",
-    "TradeMarkAfrica": "https://www.trademarkafrica.com/procurement/",
-    "IUCN": "https://iucn.org/procurement/currently-running-tenders",
-    "KRA": "https://krc.co.ke/tenders/",
-    "Enable": "https://www.enabel.be/fr/marches-publics/?in_category%5B%5D=all&in_country=all&is_status=0&_gl=1*arq3h4*_up*MQ..*_ga*NDM0NDQ0NTkxLjE2NzM1MzI2MzU.*_ga_9KW9PQQN9K*MTY3MzUzMjYzNC4xLjAuMTY3MzUzMjYzNC4wLjAuMA..#news",
-    "Toronto": "https://www.toronto.ca/business-economy/doing-business-with-the-city/searching-bidding-on-city-contracts/toronto-bids-portal/#all",
-    "India": "https://eprocure.gov.in/eprocure/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=SaNQkFYrq2Ejxc9TMUtutTtS0Fec7wUuNy1YFXyqSerE%3D",
-    "Arizona": "https://app.az.gov/page.aspx/en/rfp/request_browse_public",
-    "Texas": "https://www.txsmartbuy.gov/esbd?page=1&keyword=software",
-    "AU": "https://au.int/en/bids",
-    "West Bengal": "https://www.wbsedcl.in/irj/go/km/docs/internet/new_website/TenderBids.html",
-    "Gov-UK": "https://www.contractsfinder.service.gov.uk/Search/Results",
-    "PPRA": "https://www.ppra.org.pk/dad_tenders.asp",
-    "St. Vin": "https://procurement.gov.vc/eprocure/index.php/current-bids" ,
-    "OSCE": "https://procurement.osce.org/tenders",
-    "Bank of India": "https://bankofindia.co.in/tender",
-    "Canara Bank": "https://canarabank.com/tenders",
-    "E-Tender": "https://etenders.gov.in/eprocure/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=SpUU0rj42FI3UoCfR2Ztdaw%3D%3D",
-    "IICB": "https://iicb.res.in/tenders?status=active",
-    "NUS": "https://www.nus.edu.sg/suppliers/business-opportunities",
-    "Civic Info": "https://www.civicinfo.bc.ca/bids",
-    "UNHCR Syria": "https://www.unhcr.org/sy/tender-announcements",   
-    "Meghalaya" : "https://meghalaya.gov.in/tenders",
-    "Uganda2": "https://egpuganda.go.ug/bid-notices",
-    "H. Pradesh": "https://hptenders.gov.in/nicgep/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=Su%2Bzb384sa%2FwA6xudXbBwXNS0Fec7wUuNy1YFXyqSerE%3D",
-    "NGO-Proc": "https://procurement.ngojobsite.com/",
-    "TB": "https://www.tenderboard.gov.bh/tenders/public%20tenders/",
-    "KPPRA": "http://www.kppra.gov.pk/kppra/activetenders",
-    "New India": "https://www.newindia.co.in/tender-notice",
-    "Vic": "https://www.tenders.vic.gov.au/tender/search?preset=open",
-    "AIIMS": "https://www.aiims.edu/index.php/en/tenders/aiims-tender",
-    "Nepal": "https://bolpatra.gov.np/egp/searchOpportunity",
-    "PSHD": "https://pshealthpunjab.gov.pk/Home/Tenders",
-    "Mahapreit": "https://mahapreit.in/page/tender",
-    "Prasarb": "https://prasarbharati.gov.in/pbtenders/",
-    "Durban": "https://www.durban.gov.za/pages/business/procurement",
-    "NCCF": "https://nccf-india.com/tenders/",
-    "IOB": "https://www.iob.in/TenderDetails.aspx?Tendertype=Tender",
-    "Punjab": "https://pitb.gov.pk/tendernotices",
-    "Bangladesh": "https://cptu.gov.bd/advertisement-notices/advertisement-services.html",
-    "KSEB": "https://kseb.in/tenders",
-    "CPPP India": "https://eprocure.gov.in/cppp/latestactivetendersnew/cpppdata#",
-    "Madya Pradesh": "https://mptenders.gov.in/nicgep/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=S%2Bt7ylexecXeEINPR4PWtnw%3D%3D",
-    
-}
-
-UNIVERSAL_LABELS = [
-    "Title", "Description", "Date Posted", "Deadline", "Reference Number",
-    "Category", "Location", "Language", "Contact", "Budget", "Type"
-]
-
-# Predefined tags for each website (can include both universal and specific labels)
-PREDEFINED_TAGS = {
-    # "https://tenders.go.ke/tenders": ["Tender No", "Description", "Category", "Deadline", "Location"],
-    # "https://www.ungm.org/Public/Notice": ["Title", "Category", "Date Posted", "Deadline", "Type", "Location"],
-    "https://www.iom.int/procurement-opportunities": ["Title", "Category", "Date Posted", "Deadline", "Type", "Location"],
-    #"https://www.ppda.mw/tenders": ["Title", "Category", "Date Posted", "Deadline", "Reference Number"],
-    "https://procurement-notices.undp.org/#:~:text=RFP/JSB-AC/2409/52%20Develop%20a%20national%20e-procurement": ["Title", "Ref No", "Date Posted", "Deadline", "Type", "Location"],
-    "https://www.afdb.org/en/projects-and-operations/procurement#:~:text=Procurement%20procedures%20must%20offer%20equal%20opportunities%20to": ["Title", "Date Posted", "Type"],
-    #"https://www.kra.go.ke/tenders#:~:text=E%20-%20Procurement%20We%20are%20always%20working%20closely%20with%20our": ["Title", "Date Posted", "Deadline"],
-    "https://esppra.co.sz/sppra/tender.php": ["Title", "Ref No", "Deadline", "Date Posted"],
-    #"https://www.publicprocurement.ng/#:~:text=ministry%20for%20local%20government%20and%20chieftaincy%20affairs,%20yobe": ["Description", "Date Added", "Deadline", "Type"],
-    "https://gpp.ppda.go.ug/public/bid-invitations": ["Title", "Deadline", "Type"],
-    #"https://ec.europa.eu/info/funding-tenders/opportunities/portal/screen/opportunities/calls-for-tenders?keywords=software&isExactMatch=true&order=DESC&pageNumber=1&pageSize=50&sortBy=startDate": ["Title", "Deadline", "Type", "Status", "Date Posted"],
-    #"https://ssl.doas.state.ga.us/gpr/": ["Title", "Ref No", "Status", "Deadline", "Date Posted"],
-    #"https://www.eib.org/en/about/procurement/all/index.htm?q=&sortColumn=configuration.contentStart&sortDir=desc&pageNumber=0&itemPerPage=25&pageable=true&la=EN&deLa=EN&yearTo=&orYearTo=true&yearFrom=&orYearFrom=true&procurementStatus=&or_g_procurementInformations_type=true": ["Title", "Type", "Status", "Date Posted"],
-    "https://www.un.org/Depts/ptd/eoi": ["Title", "Date Posted", "Deadline", "Reference Number"],
-    "https://depedpines.com/procurement-notices/": ["Title", "Date Posted", "Deadline"],
-    #"https://www.gebiz.gov.sg/ptn/opportunity/BOListing.xhtml?origin=menu": ["Ref No", "Title", "Date Posted", "Deadline", "Cartegory", "Status"],
-    "https://publicprocurement.govmu.org/publicprocurement/?page_id=720": ["Description", "Reference Number", "Deadline", "Cartegory"],
-    "https://www.gov.bm/procurement-notices": ["Title", "Date Posted", "Deadline", "Ref No"],
-    "https://www.caribank.org/work-with-us/procurement/general-procurement-notices": ["Title", "Cartegory", "Location"],
-    "https://pcms2.gld.gov.hk/iprod/#/sta00305?lang-setting=en-US&results_pageNo=1": ["Description", "Deadline", "Ref No", "Cartegory"],
-    "https://www.tenders.gov.au/atm": ["Description", "Deadline", "Cartegory", "Ref No"],
-    "https://www.slcgmel.org/procurement-notices/": ["Title", "Date Posted", "Type"],
-    "https://www.adb.org/projects/tenders/group/goods": ["Title", "Date Posted", "Deadline", "Type", "Ref No", "Status"],
-    # "https://hands.ehawaii.gov/hands/opportunities": ["Title", "Location", "Deadline", "Cartegory", "Ref No", "Status", "Date Posted"],
-    "https://canadabuys.canada.ca/en/tender-opportunities": ["Title", "Cartegory", "Deadline", "Date Posted"],
-    "https://www.publiccontractsscotland.gov.uk/Search/Search_MainPage.aspx": ["Title", "Ref No", "Deadline", "Date Posted", "Type"],
-    "https://www.nra.co.za/sanral-tenders/list/open-tenders": ["Description", "Ref No", "Deadline", "Location", "Type"],
-    # "https://projectprocurement.iadb.org/en/procurement-notices": ["Title", "Ref No", "Deadline", "Type", "Location", "Date Posted"],
-    "https://www.usaid.gov/procurement-announcements": ["Title", "Date Posted"],
-    #"https://www.aiib.org/en/opportunities/business/project-procurement/list.html": ["Cartegory", "Date Posted", "Title", "Type", "Location"],
-    "https://www.eeas.europa.eu/eeas/tenders_en": ["Title", "Deadline", "Budget", "Type"],
-    "https://www.unido.org/get-involved-procurement/procurement-opportunities": ["Title", "Deadline", "Type", "Location", "Ref No"],
-    #"https://www.centralbank.go.ke/tenders/": ["Title", "Date Posted", "Deadline", "Ref No", "Status"],
-    "https://www.developmentaid.org/tenders/search?sectors=70": ["Title", "Deadline", "Type", "Location", "Status", "Budget", "Cartegory"],
-    "https://www.savethechildren.net/tenders": ["Title", "Description", "Date Posted", "Location", "Deadline"],
-    "https://www.trademarkafrica.com/procurement/": ["Title", "Ref No", "Deadline"],
-    "https://iucn.org/procurement/currently-running-tenders": ["Title", "Deadline", "Location", "Budget"],
-    "https://krc.co.ke/tenders/": ["Title", "Deadline", "Ref No", "Status"],
-    "https://www.enabel.be/fr/marches-publics/?in_category%5B%5D=all&in_country=all&is_status=0&_gl=1*arq3h4*_up*MQ..*_ga*NDM0NDQ0NTkxLjE2NzM1MzI2MzU.*_ga_9KW9PQQN9K*MTY3MzUzMjYzNC4xLjAuMTY3MzUzMjYzNC4wLjAuMA..#news": ["Title", "Deadline", "Ref No", "Location"],
-    "https://www.toronto.ca/business-economy/doing-business-with-the-city/searching-bidding-on-city-contracts/toronto-bids-portal/#all":  ["Title", "Deadline", "Ref No", "Date Posted", "Cartegory", "Type"],
-    "https://eprocure.gov.in/eprocure/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=SaNQkFYrq2Ejxc9TMUtutTtS0Fec7wUuNy1YFXyqSerE%3D":  ["Title", "Deadline", "Ref No", "Date Posted"],
-    "https://app.az.gov/page.aspx/en/rfp/request_browse_public": ["Title", "Deadline", "Ref No", "Date Posted", "Cartegory", "Status"],
-    "https://www.txsmartbuy.gov/esbd?page=1&keyword=software": ["Title", "Deadline", "Ref No", "Date Posted", ],
-    "https://au.int/en/bids":  ["Title", "Deadline", "Ref No", "Type"],
-    "https://www.wbsedcl.in/irj/go/km/docs/internet/new_website/TenderBids.html": ["Title", "Deadline", "Ref No", "Date Posted", "Budget"],
-    "https://www.contractsfinder.service.gov.uk/Search/Results" : ["Title", "Deadline", "Budget", "Date Posted", "Cartegory", "Location"],
-    "https://www.ppra.org.pk/dad_tenders.asp": ["Title", "Deadline", "Ref No", "Date Posted",],
-    "https://procurement.gov.vc/eprocure/index.php/current-bids":  ["Description", "Ref No", "Deadline", "Type"],
-    "https://procurement.osce.org/tenders": ["Title", "Deadline", "Date Posted",],
-    "https://bankofindia.co.in/tender" : ["Title", "Deadline", "Ref No", "Date Posted"],
-    "https://etenders.gov.in/eprocure/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=SpUU0rj42FI3UoCfR2Ztdaw%3D%3D": ["Title", "Deadline", "Ref No", "Date Posted"],
-    "https://iicb.res.in/tenders?status=active": ["Description", "Deadline", "Ref No", "Date Posted"],
-    "https://www.nus.edu.sg/suppliers/business-opportunities": ["Description", "Deadline", "Ref No", "Date Posted", "Status"],
-    "https://www.civicinfo.bc.ca/bids": ["Title", "Deadline", "Type", "Date Posted", "Location"],
-    "https://www.unhcr.org/sy/tender-announcements": ["Title", "Date Posted"],
-    "https://meghalaya.gov.in/tenders":  ["Title", "Deadline", "Date Posted"],
-    "https://egpuganda.go.ug/bid-notices" : ["Title", "Deadline", "Date Posted", "Type", "Location", "Ref No"],
-    "https://hptenders.gov.in/nicgep/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=Su%2Bzb384sa%2FwA6xudXbBwXNS0Fec7wUuNy1YFXyqSerE%3D": ["Title", "Deadline", "Ref No", "Date Posted"],
-    "https://procurement.ngojobsite.com/": ["Title", "Date Posted", "Type",],
-    "https://www.tenderboard.gov.bh/tenders/public%20tenders/": ["Title", "Deadline", "Date Posted", "Type", "Cartegory"],
-    "http://www.kppra.gov.pk/kppra/activetenders": ["Description", "Deadline", "Date Posted", "Ref No"],
-    "https://www.newindia.co.in/tender-notice": ["Title", "Deadline", "Date Posted", "Location"],
-    "https://www.tenders.vic.gov.au/tender/search?preset=open": ["Title", "Deadline", "Date Posted", "Type", "Status", "Ref No"],
-    "https://www.aiims.edu/index.php/en/tenders/aiims-tender" : ["Title", "Deadline", "Date Posted", "Cartegory"],
-    "https://bolpatra.gov.np/egp/searchOpportunity": ["Title", "Deadline", "Date Posted", "Type", "Ref No"],
-    "https://pshealthpunjab.gov.pk/Home/Tenders": ["Title",  "Date Posted",],
-    "https://mahapreit.in/page/tender": ["Title", "Cartegory", "Date Posted", "Type", "Ref No"],
-    "https://www.durban.gov.za/pages/business/procurement": ["Title", "Deadline", "Cartegory", "Type", "Ref No"],
-    "https://nccf-india.com/tenders/": ["Title", "Date Posted"],
-    "https://www.iob.in/TenderDetails.aspx?Tendertype=Tender":  ["Description", "Deadline", "Date Posted",],
-    "https://pitb.gov.pk/tendernotices": ["Title", "Deadline", "Date Posted"],
-    "https://cptu.gov.bd/advertisement-notices/advertisement-services.html":  ["Title", "Ref No", "Deadline", "Date Posted", "Cartegory", "Location"],
-    "https://kseb.in/tenders": ["Title", "Date Posted", "Ref No"],
-    "https://eprocure.gov.in/cppp/latestactivetendersnew/cpppdata#": ["Title", "Deadline", "Date Posted", "Ref No"],
-    "https://mptenders.gov.in/nicgep/app?component=%24DirectLink&page=FrontEndTendersByOrganisation&service=direct&sp=S%2Bt7ylexecXeEINPR4PWtnw%3D%3D": ["Title", "Deadline", "Ref No", "Date Posted"],
-    
-}
-
 def generate_unique_folder_name(url):
     timestamp = datetime.now().strftime('%Y_%m_%d__%H_%M_%S')
     parsed_url = urlparse(url)
@@ -228,30 +63,38 @@ def scrape_multiple_urls(urls, fields, selected_model):
     first_url_markdown = None
     
     start_time = time.time()
-    
-    for i, url in enumerate(urls, start=1):
-        # Get the HTML and related data
-        scraped_data = fetch_html_selenium(url)
-        
-        # Convert to markdown with the base URL for absolute links
-        markdown = html_to_markdown_with_readability(
-            scraped_data['html'], 
-            base_url=scraped_data['base_url']
-        )
-        
-        if i == 1:
-            first_url_markdown = markdown
+
+    def fetch(url):
+        # Get the page as markdown (with absolute links) and the procurement links
+        page = fetch_page_markdown(url)
+        return page['markdown'], page['procurement_links'], page.get('html'), page.get('base_url')
+
+    def process(index, url, fetched):
+        markdown, procurement_links, html, base_url = fetched
         
         # Add the procurement links to the context
         context = {
             'url': url,
-            'procurement_links': scraped_data['procurement_links']
+            'procurement_links': procurement_links
         }
         
-        input_tokens, output_tokens, cost, formatted_data = scrape_url(
-            context, fields, selected_model, output_folder, i, markdown
+        return scrape_url(
+            context, fields, selected_model, output_folder, index + 1, markdown, html=html, base_url=base_url
         )
-        
+
+    # Pages are fetched in parallel (with per-domain limits) while earlier ones are in the LLM stage
+    results = run_pipeline(urls, fetch, process)
+
+    for i, item in enumerate(results, start=1):
+        if item['error'] is not None:
+            logger.error(f"Failed to scrape {item['url']}: {item['error']}")
+        if i == 1 and item['fetched'] is not None:
+            first_url_markdown = item['fetched'][0]
+        if item['result'] is None:
+            all_data.append(None)
+            continue
+
+        input_tokens, output_tokens, cost, formatted_data = item['result']
         total_input_tokens += input_tokens
         total_output_tokens += output_tokens
         total_cost += cost
@@ -372,6 +215,7 @@ if st.sidebar.button("Scrape"):
             urls = url_input.split()
             field_list = selected_labels
             # Perform the scraping operation
+            llm_cache.reset_stats()
             output_folder, total_input_tokens, total_output_tokens, total_cost, all_data, first_url_markdown, scraping_time = scrape_multiple_urls(urls, field_list, model_selection)
             
             # Handle pagination if enabled and there is only one URL
@@ -423,6 +267,7 @@ if st.sidebar.button("Scrape"):
             
             # Update session state with all results, including pagination information
             st.session_state['results'] = (all_data, first_url_markdown, total_input_tokens, total_output_tokens, total_cost, output_folder, pagination_info, scraping_time)
+            st.session_state['llm_cache_stats'] = llm_cache.cache_stats()
             st.session_state['perform_scrape'] = True
 
         except Exception as e:
@@ -468,6 +313,10 @@ if st.session_state['perform_scrape']:
             st.sidebar.markdown(f"*Input Tokens:* {input_tokens}")
             st.sidebar.markdown(f"*Output Tokens:* {output_tokens}")
             st.sidebar.markdown(f"**Total Cost:** :green-background[**${total_cost:.4f}**]")
+            cache_stats = st.session_state.get('llm_cache_stats')
+            if cache_stats and cache_stats['hit_rate'] is not None:
+                st.sidebar.markdown(f"*LLM Cache:* {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                                    f"({cache_stats['hit_rate']:.0%} hit rate)")
 
             st.subheader("Scraped/Parsed Data")
             for i, data in enumerate(all_data, start=1):
@@ -0,0 +1,87 @@
+# conftest.py
+
+import json
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_clients import providers
+
+
+class StubServer:
+    """
+    Local HTTP server standing in for a provider API. Routes map a method and
+    a path regex to a handler taking (match, headers, body) and returning
+    (status, payload); dict and list payloads are sent as JSON, str as text.
+    Every request is recorded in `requests`.
+    """
+
+    def __init__(self):
+        self.routes = []
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                path = self.path.split('?')[0]
+                stub.requests.append((self.command, path, body))
+                for method, pattern, handler in stub.routes:
+                    match = re.fullmatch(pattern, path)
+                    if method == self.command and match:
+                        status, payload = handler(match, self.headers, body)
+                        break
+                else:
+                    status, payload = 404, {"error": {"message": f"No route for {self.command} {path}"}}
+                if isinstance(payload, str):
+                    data, content_type = payload.encode('utf-8'), 'text/plain'
+                else:
+                    data, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def route(self, method, pattern, handler):
+        self.routes.append((method, pattern, handler))
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Run every test in its own folder with fresh provider clients, so caches and outputs stay out of the repository."""
+    monkeypatch.chdir(tmp_path)
+    providers.close()
+    yield
+    providers.close()
@@ -0,0 +1,218 @@
+# test_batch_extraction.py
+
+import email.parser
+import json
+import os
+
+import pytest
+
+import batch_extraction
+from assets import BATCH_SETTINGS
+
+FIELDS = ["title", "deadline"]
+
+PAGES = [
+    {
+        'website_name': 'Ministry',
+        'url': 'https://ministry.example/tenders',
+        'markdown': "| Title | Deadline |\n|---|---|\n| ERP upgrade | 2026-11-01 |\n"
+                    "<<chunk>>\n| Cloud hosting | 2026-11-05 | [View](https://ministry.example/t/2) |",
+    },
+    {
+        'website_name': 'Agency',
+        'url': 'https://agency.example/bids',
+        'markdown': "- Supply of laptops, closing 2026-12-01",
+    },
+]
+
+
+def _split_on_marker(text, model, max_tokens=None):
+    # Chunk boundaries fixed by the test data instead of the token budget
+    return text.split("<<chunk>>\n")
+
+
+def _answer(line):
+    """Batch output line answering one request, with listings taken from the chunk text."""
+    chunk = line['body']['messages'][-1]['content']
+    listings = []
+    for row in chunk.splitlines():
+        if row.startswith('| ') and '---' not in row and 'Title' not in row:
+            cells = [cell.strip() for cell in row.strip('|').split('|')]
+            link = cells[2].split('(')[-1].rstrip(')') if len(cells) > 2 else None
+            listings.append({"title": cells[0], "deadline": cells[1], "direct_url": link})
+        elif row.startswith('- '):
+            listings.append({"title": row[2:].split(',')[0], "deadline": "2026-12-01", "direct_url": None})
+    return {
+        "id": f"response-{line['custom_id']}",
+        "custom_id": line['custom_id'],
+        "response": {
+            "status_code": 200,
+            "body": {
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": json.dumps({"listings": listings})}}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+            },
+        },
+        "error": None,
+    }
+
+
+class FakeBatchAPI:
+    """Files and Batches endpoints of the OpenAI API, completing a batch after `polls_until_done` status checks."""
+
+    def __init__(self, server, failing_ids=(), polls_until_done=2, final_status='completed'):
+        self.server = server
+        self.failing_ids = set(failing_ids)
+        self.polls_until_done = polls_until_done
+        self.final_status = final_status
+        self.files = {}
+        self.batch = None
+        self.polls = 0
+        server.route('POST', r'/v1/files', self.create_file)
+        server.route('GET', r'/v1/files/([^/]+)/content', self.file_content)
+        server.route('POST', r'/v1/batches', self.create_batch)
+        server.route('GET', r'/v1/batches/([^/]+)', self.retrieve_batch)
+
+    def _store(self, file_id, content, purpose):
+        self.files[file_id] = content
+        return {"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                "filename": f"{file_id}.jsonl", "purpose": purpose, "status": "processed"}
+
+    def create_file(self, match, headers, body):
+        message = email.parser.BytesParser().parsebytes(
+            b'Content-Type: ' + headers['Content-Type'].encode() + b'\r\n\r\n' + body)
+        parts = {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+                 for part in message.get_payload()}
+        return 200, self._store('file-input', parts['file'].decode('utf-8'), parts['purpose'].decode())
+
+    def file_content(self, match, headers, body):
+        if match.group(1) not in self.files:
+            return 404, {"error": {"message": "No such file"}}
+        return 200, self.files[match.group(1)]
+
+    def requests_lines(self):
+        return [json.loads(line) for line in self.files['file-input'].splitlines() if line.strip()]
+
+    def create_batch(self, match, headers, body):
+        params = json.loads(body)
+        self.batch = {
+            "id": "batch_test", "object": "batch", "endpoint": params['endpoint'], "errors": None,
+            "input_file_id": params['input_file_id'], "completion_window": params['completion_window'],
+            "status": "validating", "output_file_id": None, "error_file_id": None, "created_at": 0,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0}, "metadata": params.get('metadata'),
+        }
+        return 200, self.batch
+
+    def retrieve_batch(self, match, headers, body):
+        if self.batch is None or match.group(1) != self.batch['id']:
+            return 404, {"error": {"message": "No such batch"}}
+        self.polls += 1
+        lines = self.requests_lines()
+        if self.polls < self.polls_until_done:
+            self.batch.update(status='in_progress', request_counts={"total": len(lines), "completed": 0, "failed": 0})
+            return 200, self.batch
+        if self.final_status != 'completed':
+            self.batch['status'] = self.final_status
+            return 200, self.batch
+
+        outputs = [_answer(line) for line in lines if line['custom_id'] not in self.failing_ids]
+        errors = [{"id": f"response-{line['custom_id']}", "custom_id": line['custom_id'],
+                   "response": {"status_code": 500, "body": {"error": {"message": "Internal error"}}}, "error": None}
+                  for line in lines if line['custom_id'] in self.failing_ids]
+        self._store('file-output', ''.join(json.dumps(entry) + '\n' for entry in outputs), 'batch_output')
+        self.batch.update(status='completed', output_file_id='file-output',
+                          request_counts={"total": len(lines), "completed": len(outputs), "failed": len(errors)})
+        if errors:
+            self._store('file-errors', ''.join(json.dumps(entry) + '\n' for entry in errors), 'batch_output')
+            self.batch['error_file_id'] = 'file-errors'
+        return 200, self.batch
+
+
+@pytest.fixture
+def sweep(stub_server, monkeypatch, tmp_path):
+    """Point the OpenAI client at the stub and replace page fetching with the fixed PAGES."""
+    monkeypatch.setenv('OPENAI_BASE_URL', stub_server.url + '/v1')
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setitem(BATCH_SETTINGS, 'poll_interval', 0)
+    monkeypatch.setattr(batch_extraction, 'split_into_chunks', _split_on_marker)
+
+    def fetch_pages(website_names=None):
+        folder = tmp_path / 'batches' / 'sweep'
+        pages = []
+        for index, page in enumerate(PAGES):
+            output_folder = folder / f"site_{index + 1}"
+            output_folder.mkdir(parents=True)
+            pages.append(dict(page, fields=FIELDS, output_folder=str(output_folder), raw_path=None))
+        return str(folder), pages
+
+    monkeypatch.setattr(batch_extraction, '_fetch_sweep_pages', fetch_pages)
+    return stub_server
+
+
+def test_submit_uploads_requests_and_creates_batch(sweep):
+    api = FakeBatchAPI(sweep)
+    batch_folder = batch_extraction.submit_sweep('gpt-4o-mini')
+
+    lines = api.requests_lines()
+    assert [line['custom_id'] for line in lines] == ['0-0', '0-1', '1-0']
+    assert all(line['url'] == '/v1/chat/completions' and line['body']['model'] == 'gpt-4o-mini' for line in lines)
+    # Links are sent as short IDs, with the instruction explaining them
+    assert 'L1' in lines[1]['body']['messages'][-1]['content']
+    assert 'https://ministry.example/t/2' not in lines[1]['body']['messages'][-1]['content']
+    assert lines[0]['body']['response_format']['type'] == 'json_schema'
+
+    assert api.batch['input_file_id'] == 'file-input'
+    assert api.batch['endpoint'] == '/v1/chat/completions'
+    assert api.batch['completion_window'] == BATCH_SETTINGS['completion_window']
+
+    with open(os.path.join(batch_folder, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['batch_id'] == 'batch_test'
+    assert [page['chunk_count'] for page in manifest['pages']] == [2, 1]
+    assert all('markdown' not in page for page in manifest['pages'])
+
+
+def test_wait_for_batch_polls_until_final_status(sweep):
+    api = FakeBatchAPI(sweep, polls_until_done=3)
+    batch_extraction.submit_sweep('gpt-4o-mini')
+
+    batch = batch_extraction.wait_for_batch('batch_test')
+    assert batch.status == 'completed'
+    assert api.polls == 3
+
+
+def test_collect_merges_chunks_and_expands_links(sweep):
+    FakeBatchAPI(sweep)
+    batch_folder = batch_extraction.submit_sweep('gpt-4o-mini')
+
+    totals = batch_extraction.collect_batch(batch_folder, push_to_db=False)
+    assert totals['input_tokens'] == 300 and totals['output_tokens'] == 60
+    assert totals['cost'] == pytest.approx(batch_extraction.calculate_batch_price(totals, 'gpt-4o-mini'))
+
+    with open(os.path.join(batch_folder, 'site_1', 'sorted_data_1.json'), encoding='utf-8') as f:
+        listings = json.load(f)['listings']
+    assert [listing['title'] for listing in listings] == ['ERP upgrade', 'Cloud hosting']
+    assert listings[1]['direct_url'] == 'https://ministry.example/t/2'
+    assert os.path.exists(os.path.join(batch_folder, 'site_2', 'scraped_data.json'))
+
+
+def test_collect_skips_error_lines(sweep):
+    FakeBatchAPI(sweep, failing_ids={'0-1', '1-0'})
+    batch_folder = batch_extraction.submit_sweep('gpt-4o-mini')
+
+    totals = batch_extraction.collect_batch(batch_folder, push_to_db=False)
+    # Only the successful chunk is billed and saved
+    assert totals['input_tokens'] == 100
+
+    with open(os.path.join(batch_folder, 'site_1', 'sorted_data_1.json'), encoding='utf-8') as f:
+        listings = json.load(f)['listings']
+    assert [listing['title'] for listing in listings] == ['ERP upgrade']
+    # A page whose only chunk failed is not saved at all
+    assert not os.path.exists(os.path.join(batch_folder, 'site_2', 'sorted_data_1.json'))
+
+
+def test_collect_raises_for_failed_batch(sweep):
+    FakeBatchAPI(sweep, polls_until_done=1, final_status='failed')
+    batch_folder = batch_extraction.submit_sweep('gpt-4o-mini')
+
+    with pytest.raises(RuntimeError, match='failed'):
+        batch_extraction.collect_batch(batch_folder, push_to_db=False)
@@ -0,0 +1,130 @@
+# test_local_llm.py
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import llm_dispatcher
+import local_llm
+from assets import LLAMA_MODEL_FULLNAME, LOCAL_LLM_SETTINGS
+
+
+class FakeLocalServer:
+    """OpenAI-compatible chat completions endpoint that records the requests it is decoding at once."""
+
+    def __init__(self, server, delay=0.0):
+        self.delay = delay
+        self.bodies = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        server.route('POST', r'/v1/chat/completions', self.complete)
+
+    def complete(self, match, headers, body):
+        params = json.loads(body)
+        with self.lock:
+            self.bodies.append(params)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+        prompt = params['messages'][-1]['content']
+        if 'FAIL' in prompt:
+            return 400, {"error": {"message": "context length exceeded", "type": "invalid_request_error"}}
+        content = json.dumps({"listings": [{"title": prompt.split(':')[-1].strip()}]})
+        return 200, {
+            "id": "chatcmpl-local", "object": "chat.completion", "created": 0, "model": params['model'],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 10, "total_tokens": 60},
+        }
+
+
+@pytest.fixture
+def local_server(stub_server, monkeypatch):
+    monkeypatch.setenv('LOCAL_LLM_BASE_URL', stub_server.url + '/v1')
+    # Token counting would download tiktoken's encodings; a rough estimate is enough for the rate limiter
+    monkeypatch.setattr(llm_dispatcher, 'count_tokens', lambda text, model: len(text) // 4)
+    return stub_server
+
+
+def _messages(title):
+    return [{"role": "system", "content": "Extract listings."}, {"role": "user", "content": f"Page: {title}"}]
+
+
+def _line(custom_id, title):
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions",
+            "body": {"model": local_llm.LOCAL_MODEL, "messages": _messages(title)}}
+
+
+def test_chat_sends_model_and_schema(local_server):
+    server = FakeLocalServer(local_server)
+    response_format = {"type": "json_schema", "json_schema": {"name": "listings", "schema": {"type": "object"}}}
+
+    completion = local_llm.chat(_messages("ERP upgrade"), response_format)
+
+    assert json.loads(completion.choices[0].message.content) == {"listings": [{"title": "ERP upgrade"}]}
+    assert completion.usage.prompt_tokens == 50
+    assert server.bodies[0]['model'] == LLAMA_MODEL_FULLNAME
+    assert server.bodies[0]['response_format'] == response_format
+    assert server.bodies[0]['temperature'] == 0
+
+
+def test_chat_omits_schema_when_disabled(local_server, monkeypatch):
+    server = FakeLocalServer(local_server)
+    monkeypatch.setitem(LOCAL_LLM_SETTINGS, 'json_schema', False)
+
+    local_llm.chat(_messages("ERP upgrade"), {"type": "json_schema", "json_schema": {}})
+
+    assert 'response_format' not in server.bodies[0]
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('{"listings": [{"title": "A"}]}', {"listings": [{"title": "A"}]}),
+    ('[{"title": "A"}, {"title": "B"}]', {"listings": [{"title": "A"}, {"title": "B"}]}),
+    ('{"title": "A"}', {"listings": [{"title": "A"}]}),
+])
+def test_parse_listings_normalizes_shapes(content, expected):
+    assert local_llm.parse_listings(content) == expected
+
+
+def test_parse_listings_rejects_other_json():
+    with pytest.raises(ValueError):
+        local_llm.parse_listings('"just text"')
+    with pytest.raises(ValueError):
+        local_llm.parse_listings('not json')
+
+
+def test_chat_waits_for_a_free_slot(local_server):
+    server = FakeLocalServer(local_server, delay=0.2)
+    calls = LOCAL_LLM_SETTINGS["parallel_requests"] * 2 + 1
+
+    # More callers than slots, as when several scraping threads use the local model at once
+    with ThreadPoolExecutor(max_workers=calls) as pool:
+        list(pool.map(lambda i: local_llm.chat(_messages(f"Tender {i}")), range(calls)))
+
+    assert len(server.bodies) == calls
+    assert server.max_active == LOCAL_LLM_SETTINGS["parallel_requests"]
+
+
+def test_run_requests_returns_batch_entries_with_errors(local_server):
+    FakeLocalServer(local_server, delay=0.05)
+    lines = [_line(f"0-{i}", f"Tender {i}") for i in range(6)] + [_line("1-0", "FAIL")]
+
+    entries = local_llm.run_requests(lines)
+
+    assert set(entries) == {line['custom_id'] for line in lines}
+    ok = entries["0-3"]
+    assert ok['response']['status_code'] == 200
+    assert json.loads(ok['response']['body']['choices'][0]['message']['content']) == {"listings": [{"title": "Tender 3"}]}
+    assert ok['response']['body']['usage']['completion_tokens'] == 10
+
+    failed = entries["1-0"]
+    assert failed['response'] is None
+    assert 'context length exceeded' in failed['error']['message']
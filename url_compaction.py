@@ -0,0 +1,76 @@
+# url_compaction.py
+
+import re
+from typing import Dict, Tuple
+
+URL_PATTERN = re.compile(r'https?://[^\s()<>\[\]"\'`]+')
+LINK_ID_PATTERN = re.compile(r'(?:^|/)(L\d+)$')
+
+LINK_ID_INSTRUCTION = (
+    "Links in the text below are written as short IDs such as L1 or L27. "
+    "For URL fields such as direct_url, copy the ID of the relevant link exactly as written, "
+    "without adding a domain or path.\n\n"
+)
+
+
+def compact_urls(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Replace every URL in `text` with a short ID (L1, L2, ...), the same URL
+    always getting the same ID. Returns the compacted text and the ID -> URL table.
+    """
+    ids = {}
+
+    def replace(match):
+        url = match.group(0).rstrip('.,;:!?')
+        if url not in ids:
+            ids[url] = f"L{len(ids) + 1}"
+        return ids[url] + match.group(0)[len(url):]
+
+    compacted = URL_PATTERN.sub(replace, text)
+    return compacted, {link_id: url for url, link_id in ids.items()}
+
+
+def _is_url_field(name: str) -> bool:
+    name = name.lower()
+    return 'url' in name or 'link' in name
+
+
+def expand_value(value, table: Dict[str, str]):
+    """Turn a link ID written by the model (possibly wrapped or prefixed with a path) back into its URL."""
+    if not isinstance(value, str):
+        return value
+    match = LINK_ID_PATTERN.search(value.strip(' \t\n()[]<>"\''))
+    if match and match.group(1) in table:
+        return table[match.group(1)]
+    return value
+
+
+def _expand_listing(listing, table: Dict[str, str]):
+    if isinstance(listing, dict):
+        for field, value in listing.items():
+            if _is_url_field(field):
+                listing[field] = expand_value(value, table)
+    elif hasattr(type(listing), 'model_fields'):
+        for field in type(listing).model_fields:
+            if _is_url_field(field):
+                setattr(listing, field, expand_value(getattr(listing, field), table))
+
+
+def expand_urls(formatted_data, table: Dict[str, str]):
+    """
+    Restore URLs in the URL fields of formatted listings, in place. Accepts the
+    Pydantic container, the FormattedResponse wrappers and plain dicts/lists
+    that `format_data` can return.
+    """
+    if not table or formatted_data is None:
+        return formatted_data
+
+    if hasattr(formatted_data, 'listings'):
+        listings = formatted_data.listings
+    else:
+        data = getattr(formatted_data, 'data', formatted_data)
+        listings = data.get('listings', [data]) if isinstance(data, dict) else data
+    if isinstance(listings, list):
+        for listing in listings:
+            _expand_listing(listing, table)
+    return formatted_data